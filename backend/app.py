@@ -1,16 +1,50 @@
 import os
+import time
+
+_IMPORTS_STARTED = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
+from flask_jwt_extended import JWTManager, jwt_required
 
 from config import config
 from models import db
+from authz import teacher_required
 from auth_routes import auth_bp
-from quiz_routes import quiz_bp, load_questions
+from quiz_routes import quiz_bp
 from teacher_routes import teacher_bp
 from graph_routes import graph_bp
-from preguntas_loader_simple import Preguntas, get_question_html
+from startup_profile import StartupProfile, lazy_import
+
+_IMPORTS_SECONDS = time.perf_counter() - _IMPORTS_STARTED
+
+
+def _warmup(app, profile):
+    """
+    STARTUP_MODE='eager': carga por adelantado lo que el modo lazy difiere
+    (banco, graph_engine/simulation/quiz_sampler, catálogo y grafo). Pensado para
+    gunicorn --preload, donde se paga una sola vez antes del fork.
+    """
+    with profile.phase('bank'):
+        import preguntas_loader_simple
+        preguntas_loader_simple.Preguntas
+    with profile.phase('heavy_imports'):
+        lazy_import('graph_engine')
+        lazy_import('simulation')
+        lazy_import('quiz_sampler')
+    with profile.phase('db_init'):
+        try:
+            with app.app_context():
+                from question_catalog import get_catalog
+                from graph_engine import quiz_graph
+                from models import Question
+                get_catalog()
+                quiz_graph.load(db, Question)
+                # No heredar conexiones abiertas a los workers tras el fork
+                db.engine.dispose()
+        except Exception as e:
+            print(f"Warmup skipped DB init: {str(e).splitlines()[0]}")
+
 
 def create_app(config_name='development'):
     """Application factory"""
@@ -18,8 +52,13 @@ def create_app(config_name='development'):
     
     # Load configuration
     app.config.from_object(config[config_name])
+
+    profile = StartupProfile(mode=app.config.get('STARTUP_MODE', 'lazy'))
+    profile.record('imports', _IMPORTS_SECONDS)
+    app.extensions['startup_profile'] = profile
     
     # Initialize extensions
+    extensions_started = time.perf_counter()
     db.init_app(app)
     
     # Configure CORS — allow frontend URL from config (dev: localhost:3000, prod: pp-bot.com)
@@ -34,7 +73,12 @@ def create_app(config_name='development'):
          max_age=3600)
     
     jwt = JWTManager(app)
-    Migrate(app, db)
+
+    # Flask-Migrate arrastra alembic (~0.4 s de import) y solo lo usa el CLI
+    # 'flask db': en modo lazy se omite salvo al correr bajo el CLI de Flask.
+    if profile.mode != 'lazy' or os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
     
     # JWT error handlers
     @jwt.expired_token_loader
@@ -49,34 +93,65 @@ def create_app(config_name='development'):
     def missing_token_callback(error):
         return {'error': 'Authorization token is missing'}, 401
     
+    profile.record('extensions', time.perf_counter() - extensions_started)
+
     # Register blueprints
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(quiz_bp)
-    app.register_blueprint(teacher_bp)
-    app.register_blueprint(graph_bp)
-    
-    # Load questions from Preguntas.tex using simple loader
-    with app.app_context():
-        questions_list = []
-        for qid, data in Preguntas.items():
-            questions_list.append({
-                'question_id': qid,
-                'theme': data['tema'],
-                'difficulty': data['dif'],
-                'correct_answer': data['res'][0] if data['res'] else 'a',
-                'week': data['week'],
-                'content': data  # Guardamos la data completa para conversión lazy
-            })
-        load_questions(questions_list)
-        print(f"✓ Loaded {len(questions_list)} questions from Preguntas.tex")
+    with profile.phase('blueprints'):
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(quiz_bp)
+        app.register_blueprint(teacher_bp)
+        app.register_blueprint(graph_bp)
+
+    # Las preguntas se sirven desde la BD (sincronizada por init_db.py);
+    # en modo lazy el banco y los módulos del grafo se cargan al primer uso.
+    if profile.mode == 'eager':
+        _warmup(app, profile)
     
-    # Health check endpoint
+    # Health check endpoint (público); las métricas por worker, solo teacher
     @app.route('/api/health', methods=['GET'])
     def health_check():
         return {'status': 'ok', 'message': 'Quiz App API is running'}, 200
-    
+
+    @app.route('/api/health/startup', methods=['GET'])
+    @jwt_required()
+    @teacher_required()
+    def startup_report():
+        """Tiempos de arranque por fase de este worker."""
+        return app.extensions['startup_profile'].report(), 200
+
+    @app.route('/api/health/render-cache', methods=['GET'])
+    @jwt_required()
+    @teacher_required()
+    def render_cache_stats():
+        """Hits/misses/evictions del cache LRU de HTML de este worker."""
+        from render_cache import render_cache
+        return render_cache.stats(), 200
+
+    @app.route('/api/health/password-hashing', methods=['GET'])
+    @jwt_required()
+    @teacher_required()
+    def password_hashing_stats():
+        """Cola y tiempos del pool de bcrypt de este worker."""
+        from password_hashing import hasher
+        return hasher.stats(), 200
+
+    print(profile.summary())
     return app
 
+
+def __getattr__(name):
+    """
+    For gunicorn 'app:app' (Dockerfile): the module-level app is created on
+    first access only, so importing this module (init_db.py, tests,
+    'app:create_app()') no longer builds a second application.
+    """
+    if name == 'app':
+        global app
+        app = create_app(os.getenv('FLASK_ENV', 'production'))
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     # Create app
     app = create_app(os.getenv('FLASK_ENV', 'development'))
@@ -103,11 +178,8 @@ if __name__ == '__main__':
         # Build graph from QuestionTransition table (populated by simulation)
         from graph_engine import quiz_graph
         from models import Question as Q
-        quiz_graph.build(db, Q)
+        quiz_graph.load(db, Q)
 
     # Run app
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
-
-# For gunicorn
-app = create_app(os.getenv('FLASK_ENV', 'production'))
@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from models import db, User
+from password_hashing import PasswordHashBusy
+from authz import role_claims
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+def _hashing_busy():
+    """503 when the bcrypt pool queue is full, instead of blocking the worker."""
+    response = jsonify({'error': 'Server busy, please retry in a moment'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -36,7 +44,7 @@ def register():
         db.session.commit()
         
         # Create access token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(identity=str(user.id), additional_claims=role_claims(user))
         
         return jsonify({
             'message': 'User registered successfully',
@@ -44,6 +52,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHashBusy:
+        db.session.rollback()
+        return _hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -63,9 +74,19 @@ def login():
         
         if not user or not user.check_password(data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
+
+        # BCRYPT_ROUNDS changed since this hash was made: rehash it now that
+        # we have the plain password (best effort, never blocks the login)
+        if user.password_needs_rehash():
+            try:
+                user.set_password(data['password'])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Password rehash skipped: {str(e)}")
         
         # Create access token
-        access_token = create_access_token(identity=str(user.id))
+        access_token = create_access_token(identity=str(user.id), additional_claims=role_claims(user))
 
         
         return jsonify({
@@ -74,6 +95,8 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PasswordHashBusy:
+        return _hashing_busy()
     except Exception as e:
         print(f"Login error: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -125,6 +148,9 @@ def change_password():
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except PasswordHashBusy:
+        db.session.rollback()
+        return _hashing_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,102 @@
+"""
+Autorización por rol sin ir a la BD en cada request.
+
+El rol viaja como claim firmado en el access token (auth_routes lo agrega
+con role_claims(user) al hacer login/register), así que
+@teacher_required solo lee el JWT ya verificado por @jwt_required. La
+identidad se resuelve una vez por request y queda en flask.g.
+
+    @bp.route('/x')
+    @jwt_required()
+    @teacher_required('Unauthorized - Teacher access only')
+    def x(): ...
+
+Tokens emitidos antes de este cambio no traen el claim: para ellos se lee
+el rol de la BD (una vez por request).
+
+Revocación opcional: con AUTHZ_REVALIDATE_TTL > 0 el rol del token se
+confirma contra la BD como máximo una vez cada TTL segundos por usuario y
+worker; un usuario borrado o degradado pierde el acceso en ese plazo en
+vez de al expirar el token (JWT_ACCESS_TOKEN_EXPIRES).
+"""
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import g, jsonify
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+AUTHZ_REVALIDATE_TTL = float(os.environ.get('AUTHZ_REVALIDATE_TTL', 0))
+
+ROLE_CLAIM = 'role'
+
+_revalidated = {}   # user_id → (rol en BD, cuándo se leyó)
+_revalidated_lock = threading.Lock()
+
+
+def role_claims(user):
+    """additional_claims para create_access_token."""
+    return {ROLE_CLAIM: user.role}
+
+
+def _db_role(user_id):
+    from models import db, User
+    return db.session.query(User.role).filter(User.id == user_id).scalar()
+
+
+def _revalidate(user_id, role):
+    """Rol confirmado contra la BD con cache TTL; None si ya no coincide."""
+    now = time.monotonic()
+    with _revalidated_lock:
+        cached = _revalidated.get(user_id)
+    if cached is None or now - cached[1] >= AUTHZ_REVALIDATE_TTL:
+        cached = (_db_role(user_id), now)
+        with _revalidated_lock:
+            _revalidated[user_id] = cached
+    return role if cached[0] == role else None
+
+
+def current_identity():
+    """{'user_id', 'role'} del request actual (cacheado en flask.g)."""
+    token = get_jwt()
+    cached = getattr(g, '_authz_identity', None)
+    # g vive en el app context, que puede abarcar varios requests (tests,
+    # CLI): el cache vale solo para el token ya decodificado de este request
+    if cached is not None and cached[0] is token:
+        return cached[1]
+
+    user_id = int(get_jwt_identity())
+    role = token.get(ROLE_CLAIM)
+    if role is None:
+        role = _db_role(user_id)          # token viejo, sin claim
+    elif AUTHZ_REVALIDATE_TTL > 0:
+        role = _revalidate(user_id, role)
+    identity = {'user_id': user_id, 'role': role}
+    g._authz_identity = (token, identity)
+    return identity
+
+
+def current_role():
+    return current_identity()['role']
+
+
+def role_required(role, error='Unauthorized'):
+    """Decorador: 403 {'error': error} si el usuario del JWT no tiene ese rol."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current_role() != role:
+                return jsonify({'error': error}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def teacher_required(error='Unauthorized'):
+    return role_required('teacher', error)
+
+
+def clear_revalidation_cache():
+    with _revalidated_lock:
+        _revalidated.clear()
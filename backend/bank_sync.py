@@ -0,0 +1,125 @@
+"""
+Sincronización incremental del banco de preguntas → tabla questions.
+
+En lugar de cargar el banco solo cuando la tabla está vacía, se compara el
+hash de cada pregunta parseada (preguntas_loader_simple.question_hash) con
+Question.content_hash y se aplican solo las diferencias:
+
+    - preguntas nuevas        → bulk INSERT
+    - preguntas modificadas   → bulk UPDATE (misma fila, mismo question_id)
+    - preguntas eliminadas    → bulk DELETE por question_id
+
+y se mantiene question_themes (una fila por pregunta y tema canónico) para
+las preguntas insertadas, modificadas o eliminadas, además de rellenarla
+para preguntas que aún no tengan filas (BDs anteriores a esa tabla).
+
+Answer guarda question_id sin foreign key, así que ninguna operación toca
+las respuestas de los estudiantes. Al terminar se registra el SHA-256 del
+.tex en AppState['bank_version'].
+"""
+import json
+
+from preguntas_loader_simple import question_hash
+from question_catalog import split_themes
+
+BANK_VERSION_KEY = 'bank_version'
+
+# Tamaño de los lotes de DELETE ... WHERE question_id IN (...)
+DELETE_CHUNK = 500
+
+
+def _question_row(qid, data, content_hash):
+    """Mapping de columnas de Question para una pregunta del banco."""
+    return {
+        'question_id': qid,
+        'theme': data['tema'],
+        'difficulty': data['dif'],
+        'correct_answer': data['res'][0] if data['res'] else 'a',
+        'week': data['week'],
+        'content': json.dumps(data),  # Store complete data as JSON
+        'content_hash': content_hash,
+    }
+
+
+def sync_questions(db, preguntas, bank_version=None):
+    """
+    Sincroniza la tabla questions con el banco `preguntas`
+    (dict question_id → data, como Preguntas). Idempotente.
+
+    Si `preguntas` está vacío no se borra nada: un .tex ausente o roto no
+    debe vaciar la base de datos.
+
+    Retorna dict con conteos: inserted, updated, deleted, unchanged.
+    """
+    from models import Question, QuestionTheme, AppState
+
+    stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    if not preguntas:
+        print("Warning: empty question bank, skipping sync")
+        return stats
+
+    # Solo (id, question_id, content_hash): no hace falta traer content.
+    existing = {
+        qid: (pk, h)
+        for pk, qid, h in db.session.query(
+            Question.id, Question.question_id, Question.content_hash
+        ).all()
+    }
+
+    inserts, updates = [], []
+    for qid, data in preguntas.items():
+        h = question_hash(data)
+        current = existing.pop(qid, None)
+        if current is None:
+            inserts.append(_question_row(qid, data, h))
+        elif current[1] != h:
+            updates.append({'id': current[0], **_question_row(qid, data, h)})
+        else:
+            stats['unchanged'] += 1
+
+    # Lo que queda en `existing` ya no está en el banco
+    removed = list(existing.keys())
+
+    # question_themes: reescribir las preguntas tocadas + rellenar faltantes
+    with_themes = {qid for (qid,) in db.session.query(QuestionTheme.question_id).distinct()}
+    rewrite = {m['question_id'] for m in inserts} | {m['question_id'] for m in updates}
+    rewrite |= {qid for qid in preguntas if qid not in with_themes}
+    stale_themes = (rewrite | set(removed)) & with_themes
+
+    if inserts:
+        db.session.bulk_insert_mappings(Question, inserts)
+    if updates:
+        db.session.bulk_update_mappings(Question, updates)
+    for i in range(0, len(removed), DELETE_CHUNK):
+        chunk = removed[i:i + DELETE_CHUNK]
+        Question.query.filter(Question.question_id.in_(chunk)) \
+                      .delete(synchronize_session=False)
+
+    stale_themes = list(stale_themes)
+    for i in range(0, len(stale_themes), DELETE_CHUNK):
+        chunk = stale_themes[i:i + DELETE_CHUNK]
+        QuestionTheme.query.filter(QuestionTheme.question_id.in_(chunk)) \
+                           .delete(synchronize_session=False)
+    theme_rows = [
+        {'question_id': qid, 'theme': t}
+        for qid in sorted(rewrite)
+        for t in split_themes(preguntas[qid]['tema'])
+    ]
+    if theme_rows:
+        db.session.bulk_insert_mappings(QuestionTheme, theme_rows)
+
+    stats['inserted'] = len(inserts)
+    stats['updated'] = len(updates)
+    stats['deleted'] = len(removed)
+
+    if bank_version is not None:
+        AppState.set_value(BANK_VERSION_KEY, bank_version)
+
+    db.session.commit()
+
+    # El catálogo en memoria de este worker queda obsoleto; los demás lo
+    # detectan por AppState['bank_version'] (ver question_catalog).
+    from question_catalog import invalidate_catalog
+    invalidate_catalog()
+
+    return stats
@@ -0,0 +1,123 @@
+"""
+Benchmark: simple_latex_to_html (cascada con patrones compilados y las
+matemáticas restauradas en un solo re.sub) vs la versión anterior.
+
+    python bench_latex_render.py [repeticiones]
+
+Renderiza todos los fragmentos del banco (enunciados y opciones) con ambas
+versiones, verifica que la salida sea idéntica y reporta el mejor tiempo
+de cada una. Además mide fragmentos sintéticos con miles de bloques $..$,
+donde la restauración con un str.replace por bloque era cuadrática, y con
+miles de comandos \\cmd{..}.
+
+legacy_latex_to_html es la implementación anterior, copiada tal cual para
+poder comparar.
+"""
+import re
+import sys
+import time
+
+
+def legacy_latex_to_html(latex_str: str) -> str:
+    """Versión anterior (cascada de re.sub), sin cambios."""
+    html = latex_str
+
+    # Convertir bloques de matemáticas \[ ... \] a $$ ... $$ para MathJax
+    html = re.sub(r'\\\[(.*?)\\\]', r'$$\1$$', html, flags=re.DOTALL)
+
+    # Convertir matemáticas inline \( ... \) a $ ... $ para MathJax
+    html = re.sub(r'\\\((.*?)\\\)', r'$\1$', html, flags=re.DOTALL)
+
+    # Reemplazos básicos de formato
+    html = re.sub(r'\\textbf\{([^}]*)\}', r'<strong>\1</strong>', html)
+    html = re.sub(r'\\textit\{([^}]*)\}', r'<em>\1</em>', html)
+    html = re.sub(r'\\emph\{([^}]*)\}', r'<em>\1</em>', html)
+
+    # Espaciado
+    html = re.sub(r'\\smallskip', '<br>', html)
+    html = re.sub(r'\\medskip', '<br>', html)
+    html = re.sub(r'\\bigskip', '<br><br>', html)
+
+    # Saltos de línea - IMPORTANTE: mantener \\ solo fuera de matemáticas
+    # Primero protegemos las matemáticas
+    math_blocks = []
+    def save_math(match):
+        math_blocks.append(match.group(0))
+        return f"__MATH_{len(math_blocks)-1}__"
+
+    html = re.sub(r'\$\$.*?\$\$', save_math, html, flags=re.DOTALL)
+    html = re.sub(r'\$.*?\$', save_math, html)
+
+    # Ahora convertimos \\ a <br> solo fuera de matemáticas
+    html = re.sub(r'\\\\', '<br>', html)
+
+    # Restauramos las matemáticas
+    for i, math in enumerate(math_blocks):
+        html = html.replace(f"__MATH_{i}__", math)
+
+    # Limpiar comandos LaTeX básicos no procesados
+    html = re.sub(r'\\[a-zA-Z]+(?:\[[^\]]*\])?\{([^}]*)\}', r'\1', html)
+
+    # Limpiar comandos sin argumentos
+    html = re.sub(r'\\[a-zA-Z]+\s*', ' ', html)
+
+    return html.strip()
+
+
+def bank_fragments(file_name="Preguntas.tex"):
+    """Enunciados y opciones del banco, tal como los recibe simple_latex_to_html."""
+    from preguntas_loader_simple import load_preguntas_from_latex
+    fragments = []
+    for data in load_preguntas_from_latex(file_name).values():
+        fragments.append(data["body_latex"])
+        fragments.extend(data["opts"].values())
+    return fragments
+
+
+def many_math_blocks(n):
+    """Fragmento con n bloques de matemáticas inline separados por \\\\."""
+    return " ".join(r"$x_{%d} \in A$ \\" % i for i in range(n))
+
+
+def many_commands(n):
+    """Fragmento con 2n comandos con argumento (cada uno busca su '}' de cierre)."""
+    return " ".join([r"\textbf{a} \frac{1}{2}"] * n)
+
+
+def _best_of(fn, fragments, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for frag in fragments:
+            fn(frag)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(repeat=5):
+    from preguntas_loader_simple import simple_latex_to_html
+
+    fragments = bank_fragments()
+    mismatches = sum(legacy_latex_to_html(f) != simple_latex_to_html(f) for f in fragments)
+
+    legacy = _best_of(legacy_latex_to_html, fragments, repeat)
+    current = _best_of(simple_latex_to_html, fragments, repeat)
+
+    print(f"{len(fragments)} fragmentos, {mismatches} con salida distinta")
+    print(f"  anterior : {legacy * 1000:8.1f} ms")
+    print(f"  actual   : {current * 1000:8.1f} ms")
+    print(f"  speedup  : {legacy / current:8.2f}x")
+
+    stress = [(f"{n:5d} bloques $..$", many_math_blocks(n)) for n in (500, 2000, 4000)]
+    stress += [(f"{n:5d} x \\textbf+\\frac", many_commands(n)) for n in (4000, 16000)]
+    for label, latex in stress:
+        mismatches += legacy_latex_to_html(latex) != simple_latex_to_html(latex)
+        legacy = _best_of(legacy_latex_to_html, [latex], 1)
+        current = _best_of(simple_latex_to_html, [latex], 1)
+        print(f"  {label}: anterior {legacy * 1000:7.1f} ms, "
+              f"actual {current * 1000:6.1f} ms ({legacy / current:.1f}x)")
+    return mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 5) else 0)
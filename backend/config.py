@@ -15,6 +15,9 @@ class Config:
     JWT_HEADER_TYPE = 'Bearer'
     JWT_COOKIE_CSRF_PROTECT = False  # Desactivar CSRF para desarrollo
     FRONTEND_URL = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
+    # 'lazy': banco, numpy/networkx y Flask-Migrate se cargan al primer uso.
+    # 'eager': se precargan en create_app (útil con gunicorn --preload).
+    STARTUP_MODE = os.environ.get('STARTUP_MODE', 'lazy')
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -18,8 +18,48 @@ Each directed edge  Y → X  carries:
 La selección actual (get_next_question) usa ε-greedy con un score derivado
 de p_transition y p_correct. La transición a selección por shortest-path
 sobre 'weight' es trabajo del Bloque B.
+
+Selección sobre CSR: build() deja, además del DiGraph de networkx (solo
+para analytics/visualización), la adyacencia en arrays NumPy:
+
+    node_ids[i]                  question_id del nodo denso i (ordenado)
+    indptr[i]:row_end[i]         aristas salientes del nodo i (hasta
+                                 indptr[i + 1] quedan huecos libres)
+    indices[e] / targets[e]      destino de la arista e (denso / question_id)
+    p_transition / p_correct / weight / n_transitions / n_correct [e]
+    score[e] = W_TRANS * p_transition + W_CORR * p_correct
+
+así get_next_question es un argmax enmascarado sobre la fila de last_qid,
+con las candidatas como bitset del catálogo (bit k = question_id k).
+
+Cada quiz completado no reconstruye el grafo: ingest_session arma un delta
+con las aristas que tocó y apply_delta lo aplica en el lugar (los huecos
+de cada fila absorben aristas nuevas) y sube `version`.
+
+Snapshot compartido entre workers: build() escribe los arrays (nodos, CSR
+y atributos de nodo) en GRAPH_SNAPSHOT_DIR/graph-<huella>.bin, donde la
+huella (graph_fingerprint) resume QuestionTransition y la versión del
+banco. load() y attach_snapshot() lo mapean con mmap en vez de
+reconstruir: todos los workers comparten las páginas del page cache y un
+worker nuevo sirve /next guiado por el grafo en milisegundos. El mapeo es
+copy-on-write (el archivo nunca se modifica): apply_delta solo copia las
+páginas que toca. El DiGraph de networkx se arma desde los arrays recién
+cuando un endpoint de analytics lo pide.
+
+Los threads de un worker (gunicorn gthread) comparten quiz_graph: todo lo
+que cambia la CSR (apply_delta, _grow, load_snapshot, el final de build)
+y todo lo que la lee (get_next_question, status y analytics) pasa por
+quiz_graph.lock (RLock), así nadie ve arrays a medio reemplazar. build()
+lee la BD y arma el DiGraph fuera del lock; solo el reemplazo lo toma.
 """
+import functools
+import hashlib
+import json
+import os
 import random
+import tempfile
+import threading
+import time
 import numpy as np
 from collections import defaultdict
 
@@ -43,13 +83,298 @@ EPSILON = 0.15
 W_TRANS = 0.70
 W_CORR  = 0.30
 
+# Directorio local de snapshots ('' los desactiva) y cada cuánto reintenta
+# /next cargar uno en un worker sin grafo
+GRAPH_SNAPSHOT_DIR = os.environ.get(
+    'GRAPH_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'quiz_graph'))
+GRAPH_SNAPSHOT_RETRY = float(os.environ.get('GRAPH_SNAPSHOT_RETRY', 30))
+
+SNAPSHOT_MAGIC = b'QGRAPH\x00\x01'
+SNAPSHOT_ALIGN = 64
+
+
+def _bool_mask(bits, size):
+    """Bitset → array bool indexable por question_id (largo >= size)."""
+    n_bytes = (max(bits.bit_length(), size) + 7) // 8
+    raw = np.frombuffer(bits.to_bytes(n_bytes, 'little'), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little').view(bool)
+
+
+# Huecos libres por nodo en la CSR para aristas nuevas de apply_delta
+# (max(CSR_MIN_SLACK, grado // 4)); si una fila se llena se reacomoda todo.
+CSR_MIN_SLACK = 4
+
+# Arrays por arista de la CSR (mismo largo, indexados por slot)
+EDGE_ARRAYS = ('indices', 'targets', 'p_transition', 'p_correct', 'weight',
+               'score', 'n_transitions', 'n_correct')
+_EDGE_DTYPES = {'indices': np.int32, 'targets': np.int64, 'p_transition': np.float32,
+                'p_correct': np.float32, 'weight': np.float64, 'score': np.float64,
+                'n_transitions': np.int32, 'n_correct': np.int32}
+
+# Arrays por nodo denso; atributos ausentes = -1 (node_theme indexa `themes`)
+NODE_ARRAYS = ('node_ids', 'indptr', 'row_end', 'node_theme', 'node_difficulty', 'node_week')
+
+
+def _slack(lengths):
+    return np.maximum(CSR_MIN_SLACK, lengths // 4)
+
+
+def _aligned(n):
+    return -(-n // SNAPSHOT_ALIGN) * SNAPSHOT_ALIGN
+
+
+def _locked(method):
+    """Corre el método con self.lock tomado (ver docstring del módulo)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def graph_fingerprint(db):
+    """Huella del estado del que sale el grafo (una query agregada + versión del banco)."""
+    from models import QuestionTransition as T
+    from question_catalog import _current_version
+    from sqlalchemy import func
+
+    counts = db.session.query(func.count(T.id), func.sum(T.total_transiciones),
+                              func.sum(T.total_correctas), func.max(T.id)).one()
+    raw = json.dumps([SNAPSHOT_MAGIC.hex(), MIN_TRANSITIONS, W_TRANS, W_CORR,
+                      _current_version(db), [int(c or 0) for c in counts]])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def snapshot_path(fingerprint):
+    return os.path.join(GRAPH_SNAPSHOT_DIR, f'graph-{fingerprint}.bin')
+
 
 class QuizGraph:
     def __init__(self):
-        self.G = None
+        self.lock = threading.RLock()
+        self._G = None
+        self.version = 0
+        self.db_version = None      # AppState['graph_version'] que refleja (graph_sync)
         self._node_count = 0
         self._edge_count = 0
         self._transition_rows_used = 0
+        self.snapshot = None
+        self._snapshot_checked_at = None
+        self._clear_csr()
+
+    def _clear_csr(self):
+        self.node_index = {}
+        self.themes = []
+        for name in NODE_ARRAYS + EDGE_ARRAYS:
+            setattr(self, name, None)
+        self._mask_size = 0
+
+    @_locked
+    def invalidate(self):
+        """Descarta el grafo cargado; se reconstruye en el próximo get_graph()."""
+        self._G = None
+        self.snapshot = None
+        self.db_version = None
+        self._snapshot_checked_at = None
+        self._clear_csr()
+
+    @property
+    def built(self):
+        return self.indptr is not None
+
+    @property
+    def G(self):
+        """DiGraph de networkx (analytics); tras un load() se arma al primer uso."""
+        with self.lock:
+            if self._G is None and self.built and NETWORKX_AVAILABLE:
+                self._G = self._to_networkx()
+            return self._G
+
+    @G.setter
+    def G(self, value):
+        with self.lock:
+            self._G = value
+            if value is None:
+                self._clear_csr()
+
+    def _to_networkx(self):
+        G = nx.DiGraph()
+        for qid, t, d, w in zip(self.node_ids.tolist(), self.node_theme.tolist(),
+                                self.node_difficulty.tolist(), self.node_week.tolist()):
+            G.add_node(qid, tema=self.themes[t] if t >= 0 else None,
+                       dificultad=d if d >= 0 else None, semana=w if w >= 0 else None)
+
+        capacity = np.diff(self.indptr)
+        row_of_slot = np.repeat(np.arange(len(self.node_ids)), capacity)
+        live = np.flatnonzero(np.arange(len(row_of_slot)) < self.row_end[row_of_slot])
+        G.add_edges_from(
+            (y, x, {'weight': w, 'n_transitions': n, 'n_correct': c,
+                    'p_transition': round(pt, 4), 'p_correct': round(pc, 4)})
+            for y, x, w, n, c, pt, pc in zip(
+                self.node_ids[row_of_slot[live]].tolist(), self.targets[live].tolist(),
+                self.weight[live].tolist(), self.n_transitions[live].tolist(),
+                self.n_correct[live].tolist(), self.p_transition[live].tolist(),
+                self.p_correct[live].tolist())
+        )
+        return G
+
+    def set_node_attributes(self, attributes):
+        """attributes: {question_id: (tema, dificultad, semana)} → arrays por nodo denso."""
+        themes = {}
+        theme_idx, difficulty, week = [], [], []
+        for qid in self.node_ids.tolist():
+            t, d, w = attributes.get(qid, (None, None, None))
+            theme_idx.append(-1 if t is None else themes.setdefault(t, len(themes)))
+            difficulty.append(-1 if d is None else d)
+            week.append(-1 if w is None else w)
+        self.themes = list(themes)
+        self.node_theme = np.array(theme_idx, dtype=np.int32)
+        self.node_difficulty = np.array(difficulty, dtype=np.int64)
+        self.node_week = np.array(week, dtype=np.int64)
+
+    @_locked
+    def set_csr(self, node_ids, src, dst, p_transition, p_correct, weight,
+                n_transitions=None, n_correct=None):
+        """
+        Arma la CSR a partir de listas de aristas (question_ids de origen y
+        destino). El orden de las aristas de cada nodo se conserva: ante
+        empate de score gana la primera, como el sort estable anterior.
+        """
+        node_ids = np.asarray(sorted(node_ids), dtype=np.int64)
+        rows = np.searchsorted(node_ids, np.asarray(src, dtype=np.int64))
+        dst = np.searchsorted(node_ids, np.asarray(dst, dtype=np.int64))
+        n_edges = len(rows)
+        p_t = np.asarray(p_transition, dtype=np.float64)
+        p_c = np.asarray(p_correct, dtype=np.float64)
+        edges = {
+            'indices': dst,
+            'targets': node_ids[dst],
+            'p_transition': p_t,
+            'p_correct': p_c,
+            'weight': np.asarray(weight, dtype=np.float64),
+            'score': W_TRANS * p_t + W_CORR * p_c,
+            'n_transitions': np.zeros(n_edges) if n_transitions is None else n_transitions,
+            'n_correct': np.zeros(n_edges) if n_correct is None else n_correct,
+        }
+        self.node_ids = node_ids
+        self.node_index = {qid: i for i, qid in enumerate(node_ids.tolist())}
+        self._mask_size = int(node_ids[-1]) + 1 if len(node_ids) else 0
+        self._layout(rows, edges)
+        self.set_node_attributes({})
+
+    def _layout(self, rows, edges, reserve=None):
+        """
+        Ubica las aristas (rows = nodo denso de origen de cada una) en filas
+        contiguas con huecos libres al final de cada fila:
+        indptr[i]:row_end[i] son las aristas de i, row_end[i]:indptr[i + 1]
+        los huecos. La fila `reserve` queda con al menos un hueco.
+        """
+        n_nodes = len(self.node_ids)
+        order = np.argsort(rows, kind='stable')
+        rows = rows[order]
+        lengths = np.bincount(rows, minlength=n_nodes)
+        capacity = lengths + _slack(lengths)
+        if reserve is not None:
+            capacity[reserve] = max(capacity[reserve], lengths[reserve] + 1)
+        self.indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(capacity, out=self.indptr[1:])
+        self.row_end = self.indptr[:-1] + lengths
+
+        tight = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(lengths, out=tight[1:])
+        slots = self.indptr[rows] + (np.arange(len(rows)) - tight[rows])
+        for name in EDGE_ARRAYS:
+            fill = -np.inf if name == 'score' else 0
+            array = np.full(int(self.indptr[-1]), fill, dtype=_EDGE_DTYPES[name])
+            array[slots] = np.asarray(edges[name])[order]
+            setattr(self, name, array)
+
+    def _grow(self, row):
+        """Reacomoda la CSR con huecos nuevos (cuando la fila `row` se llenó)."""
+        n_nodes = len(self.node_ids)
+        capacity = np.diff(self.indptr)
+        row_of_slot = np.repeat(np.arange(n_nodes), capacity)
+        live = np.arange(len(row_of_slot)) < self.row_end[row_of_slot]
+        self._layout(row_of_slot[live],
+                     {name: getattr(self, name)[live] for name in EDGE_ARRAYS},
+                     reserve=row)
+
+    # ------------------------------------------------------------------
+    # Incremental updates (graph_pipeline.ingest_session)
+    # ------------------------------------------------------------------
+
+    @_locked
+    def apply_delta(self, delta):
+        """
+        Aplica en el lugar el delta de una ingesta (ver
+        graph_pipeline.ingest_session):
+
+            {'edges':     [[y, x, n_transitions, n_correct, peso], ...],
+             'out_stats': {y: total_salidas}}
+
+        Las aristas tocadas se actualizan o agregan (CSR, y G si ya está
+        armado) y p_transition
+        se recalcula en las filas de los y de out_stats: O(aristas de esos
+        nodos). Retorna False, sin cambiar nada, si no hay grafo cargado o el
+        delta menciona preguntas que no son nodos (hace falta un build()).
+        """
+        if not self.built:
+            return False
+        index = self.node_index
+        edges = delta.get('edges', [])
+        out_stats = {int(y): total for y, total in delta.get('out_stats', {}).items()}
+        if any(y not in index or x not in index for y, x, *_ in edges) \
+                or any(y not in index for y in out_stats):
+            return False
+
+        for y, x, n, c, peso in edges:
+            i, j = index[y], index[x]
+            lo, hi = self.indptr[i], self.row_end[i]
+            found = np.flatnonzero(self.indices[lo:hi] == j)
+            if len(found):
+                e = lo + int(found[0])
+            else:
+                if hi == self.indptr[i + 1]:
+                    self._grow(i)
+                    hi = self.row_end[i]
+                e = int(hi)
+                self.row_end[i] += 1
+                self.indices[e] = j
+                self.targets[e] = x
+                self.p_transition[e] = 0.0
+                self._edge_count += 1
+                self._transition_rows_used += 1
+            self.n_transitions[e] = n
+            self.n_correct[e] = c
+            self.weight[e] = peso
+            if self._G is not None:
+                self._G.add_edge(y, x, weight=peso, n_transitions=n, n_correct=c)
+
+        # Filas tocadas: p_correct de sus aristas y p_transition con el
+        # total_salidas nuevo (o el actual si el delta no lo trae)
+        for y in {y for y, *_ in edges} | set(out_stats):
+            i = index[y]
+            lo, hi = self.indptr[i], self.row_end[i]
+            targets = self.targets[lo:hi].tolist()
+            counts = self.n_transitions[lo:hi].tolist()
+            corrects = self.n_correct[lo:hi].tolist()
+            total = out_stats.get(y)
+            if total is None:
+                p_t = [round(p, 4) for p in self.p_transition[lo:hi].tolist()]
+            else:
+                p_t = [round(n / total, 4) if total > 0 else 0.0 for n in counts]
+            p_c = [round(c / n, 4) if n > 0 else 0.0 for n, c in zip(counts, corrects)]
+
+            self.p_transition[lo:hi] = p_t
+            self.p_correct[lo:hi] = p_c
+            self.score[lo:hi] = W_TRANS * np.asarray(p_t) + W_CORR * np.asarray(p_c)
+            if self._G is not None:
+                for x, pt, pc in zip(targets, p_t, p_c):
+                    self._G[y][x]['p_transition'] = pt
+                    self._G[y][x]['p_correct'] = pc
+
+        self.version += 1
+        return True
 
     # ------------------------------------------------------------------
     # Build
@@ -68,6 +393,14 @@ class QuizGraph:
 
         from models import QuestionTransition, QuestionOutStats
 
+        from graph_sync import current_version
+
+        # Antes de leer: si entra una ingesta durante el build, el grafo
+        # queda etiquetado con la versión/huella anterior, y reaplicar ese
+        # delta (conteos absolutos) no cambia nada
+        db_version = current_version(db)
+        fingerprint = graph_fingerprint(db) if GRAPH_SNAPSHOT_DIR else None
+
         transitions = QuestionTransition.query.all()
         if len(transitions) < MIN_TRANSITIONS:
             print(f"Not enough transition data ({len(transitions)} rows, "
@@ -80,14 +413,16 @@ class QuizGraph:
             for row in QuestionOutStats.query.all()
         }
 
-        # Load question metadata for node attributes
-        questions = {q.question_id: q for q in Question.query.all()}
+        # Load question metadata for node attributes (only the needed columns)
+        questions = db.session.query(Question.question_id, Question.theme,
+                                     Question.difficulty, Question.week).all()
 
         G = nx.DiGraph()
-        for qid, q in questions.items():
-            G.add_node(qid, tema=q.theme, dificultad=q.difficulty, semana=q.week)
+        for qid, theme, difficulty, week in questions:
+            G.add_node(qid, tema=theme, dificultad=difficulty, semana=week)
 
         edges_added = 0
+        src, dst, p_trans, p_corr, weights, n_trans, n_corr = [], [], [], [], [], [], []
         for t in transitions:
             if t.total_transiciones < MIN_TRANSITIONS:
                 continue
@@ -112,64 +447,218 @@ class QuizGraph:
             )
             edges_added += 1
 
-        self.G = G
-        self._node_count = G.number_of_nodes()
-        self._edge_count = G.number_of_edges()
-        self._transition_rows_used = len(transitions)
-        print(f"Graph built: {self._node_count} nodes, {self._edge_count} edges "
-              f"from {self._transition_rows_used} transition rows.")
+        # La CSR sale del DiGraph (una arista por par, la última fila gana,
+        # en el orden de inserción de networkx)
+        for y, x, d in G.edges(data=True):
+            src.append(y)
+            dst.append(x)
+            p_trans.append(d['p_transition'])
+            p_corr.append(d['p_correct'])
+            weights.append(d['weight'])
+            n_trans.append(d['n_transitions'])
+            n_corr.append(d['n_correct'])
+        with self.lock:
+            self.set_csr(G.nodes(), src, dst, p_trans, p_corr, weights, n_trans, n_corr)
+            self.set_node_attributes({qid: (theme, difficulty, week)
+                                      for qid, theme, difficulty, week in questions})
+
+            self._G = G
+            self.version += 1
+            self.db_version = db_version
+            self.snapshot = None
+            self._node_count = G.number_of_nodes()
+            self._edge_count = G.number_of_edges()
+            self._transition_rows_used = len(transitions)
+            print(f"Graph built: {self._node_count} nodes, {self._edge_count} edges "
+                  f"from {self._transition_rows_used} transition rows.")
+
+            if fingerprint:
+                try:
+                    self.save_snapshot(snapshot_path(fingerprint), fingerprint)
+                except OSError as e:
+                    print(f"[graph_engine] snapshot not written: {e}")
+        return True
+
+    # ------------------------------------------------------------------
+    # Snapshot (mmap compartido entre workers)
+    # ------------------------------------------------------------------
+
+    def save_snapshot(self, path, fingerprint):
+        """
+        Escribe el grafo en `path` (atómico: tmp + rename) y borra los
+        snapshots anteriores del directorio. Formato: MAGIC, largo del
+        header (uint64), header JSON y los arrays alineados a 64 bytes.
+        """
+        arrays = {name: np.ascontiguousarray(getattr(self, name))
+                  for name in NODE_ARRAYS + EDGE_ARRAYS}
+        layout, offset = {}, 0
+        for name, array in arrays.items():
+            layout[name] = [array.dtype.str, len(array), offset]
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps({
+            'fingerprint': fingerprint,
+            'db_version': self.db_version,
+            'themes': self.themes,
+            'counts': [self._node_count, self._edge_count, self._transition_rows_used],
+            'arrays': layout,
+        }).encode('utf-8')
+        start = _aligned(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + len(header).to_bytes(8, 'little') + header)
+            for name, array in arrays.items():
+                f.seek(start + layout[name][2])
+                f.write(array.tobytes())
+            f.truncate(start + offset)
+        os.replace(tmp, path)
+
+        # Los workers que mapearon un snapshot viejo lo conservan al borrarlo
+        for entry in os.scandir(directory):
+            if entry.name.startswith('graph-') and entry.name.endswith('.bin') \
+                    and entry.path != path:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        self.snapshot = path
+
+    @_locked
+    def load_snapshot(self, path):
+        """Mapea un snapshot (copy-on-write); ValueError si no es válido."""
+        buf = np.memmap(path, dtype=np.uint8, mode='c')
+        if bytes(buf[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError(f'{path} is not a graph snapshot')
+        pos = len(SNAPSHOT_MAGIC)
+        size = int.from_bytes(bytes(buf[pos:pos + 8]), 'little')
+        header = json.loads(bytes(buf[pos + 8:pos + 8 + size]))
+        start = _aligned(pos + 8 + size)
+
+        self.invalidate()
+        for name, (dtype, length, offset) in header['arrays'].items():
+            dtype = np.dtype(dtype)
+            begin = start + offset
+            setattr(self, name, buf[begin:begin + length * dtype.itemsize].view(dtype))
+        self.themes = header['themes']
+        self.db_version = header.get('db_version')
+        self._node_count, self._edge_count, self._transition_rows_used = header['counts']
+        self.node_index = {qid: i for i, qid in enumerate(self.node_ids.tolist())}
+        self._mask_size = int(self.node_ids[-1]) + 1 if len(self.node_ids) else 0
+        self.version += 1
+        self.snapshot = path
+        return header['fingerprint']
+
+    def _load_current_snapshot(self, db):
+        """
+        El snapshot de la huella actual o, si no hay, el más nuevo puesto
+        al día con los deltas de graph_deltas (graph_sync.catch_up).
+        """
+        from graph_sync import catch_up
+
+        path = snapshot_path(graph_fingerprint(db))
+        replay = not os.path.exists(path)
+        if replay:
+            snapshots = [e for e in os.scandir(GRAPH_SNAPSHOT_DIR)
+                         if e.name.startswith('graph-') and e.name.endswith('.bin')]
+            if not snapshots:
+                return False
+            path = max(snapshots, key=lambda e: e.stat().st_mtime).path
+        try:
+            self.load_snapshot(path)
+        except (OSError, ValueError) as e:
+            print(f"[graph_engine] snapshot {path} unreadable: {e}")
+            return False
+        if replay and not catch_up(self, db):
+            self.invalidate()
+            return False
+        print(f"Graph loaded from snapshot: {self._node_count} nodes, "
+              f"{self._edge_count} edges ({path}).")
         return True
 
+    def load(self, db, Question):
+        """El grafo vigente: ya cargado, desde el snapshot o con build()."""
+        if self.built:
+            return True
+        if GRAPH_SNAPSHOT_DIR and self._load_current_snapshot(db):
+            return True
+        return self.build(db, Question)
+
+    def attach_snapshot(self, db):
+        """
+        Para /next en un worker sin grafo: carga el snapshot vigente si
+        existe, sin build(). Sin snapshots en el directorio no toca la BD;
+        con alguno, compara la huella como mucho cada GRAPH_SNAPSHOT_RETRY s.
+        """
+        if self.built:
+            return True
+        if not GRAPH_SNAPSHOT_DIR or not os.path.isdir(GRAPH_SNAPSHOT_DIR):
+            return False
+        now = time.monotonic()
+        if self._snapshot_checked_at is not None \
+                and now - self._snapshot_checked_at < GRAPH_SNAPSHOT_RETRY:
+            return False
+        if not any(name.endswith('.bin') for name in os.listdir(GRAPH_SNAPSHOT_DIR)):
+            return False
+        self._snapshot_checked_at = now
+        return self._load_current_snapshot(db)
+
     # ------------------------------------------------------------------
     # Next-question selection (no IRT)
     # ------------------------------------------------------------------
 
-    def get_next_question(self, last_qid, asked_ids, available_qids, performance=0.5):
+    @_locked
+    def get_next_question(self, last_qid, asked_ids, available_qids=None, performance=0.5,
+                          available_bits=None):
         """
         Select the next question to present.
 
+        Candidates are `available_bits` (catalog bitset) or `available_qids`,
+        minus asked_ids.
+
         Strategy:
           1. With probability EPSILON  → random choice (exploration)
           2. If last_qid has outgoing edges in the graph:
                score each candidate = W_TRANS * p_transition + W_CORR * p_correct
-               return the highest-scored candidate not yet asked
+               return the highest-scored candidate not yet asked (first on ties)
           3. Fallback → random choice from remaining questions
         """
-        asked_set = set(asked_ids)
-        remaining = [q for q in available_qids if q not in asked_set]
-        if not remaining:
+        from question_catalog import bits_of
+
+        if available_bits is None:
+            available_bits = bits_of(available_qids or ())
+        bits = available_bits & ~bits_of(asked_ids)
+        if not bits:
             return None
 
-        # Exploration
-        if random.random() < EPSILON or self.G is None:
-            return random.choice(remaining)
+        mask = _bool_mask(bits, self._mask_size)
 
-        # Graph-guided selection
-        if last_qid and last_qid in self.G:
-            successors = [
-                (v, data)
-                for _, v, data in self.G.out_edges(last_qid, data=True)
-                if v in remaining
-            ]
-            if successors:
-                scored = [
-                    (qid, W_TRANS * d.get('p_transition', 0.0)
-                          + W_CORR  * d.get('p_correct',    0.0))
-                    for qid, d in successors
-                ]
-                scored.sort(key=lambda x: x[1], reverse=True)
-                return scored[0][0]
-
-        # Fallback
-        return random.choice(remaining)
+        # Graph-guided selection (exploration with probability EPSILON)
+        if random.random() >= EPSILON and self.indptr is not None:
+            i = self.node_index.get(last_qid) if last_qid else None
+            if i is not None:
+                lo, hi = self.indptr[i], self.row_end[i]
+                if hi > lo:
+                    ok = mask[self.targets[lo:hi]]
+                    if ok.any():
+                        best = np.argmax(np.where(ok, self.score[lo:hi], -np.inf))
+                        return int(self.targets[lo + best])
+
+        # Exploration / fallback
+        return int(random.choice(np.flatnonzero(mask)))
 
     # ------------------------------------------------------------------
     # Status / introspection
     # ------------------------------------------------------------------
 
+    @_locked
     def get_status(self):
         return {
-            'built':               self.G is not None,
+            'built':               self.built,
+            'version':             self.version,
+            'db_version':          self.db_version,
+            'snapshot':            self.snapshot,
             'nodes':               self._node_count,
             'edges':               self._edge_count,
             'transition_rows_used': self._transition_rows_used,
@@ -179,6 +668,7 @@ class QuizGraph:
     # Shortest path (Dijkstra) — usado por health check y futuro Bloque B
     # ------------------------------------------------------------------
 
+    @_locked
     def get_shortest_path(self, source, target):
         """
         Camino más corto de source a target usando 'weight' (= peso Laplace).
@@ -201,6 +691,7 @@ class QuizGraph:
     # Health: aislados, distribución de grado, prueba de Dijkstra
     # ------------------------------------------------------------------
 
+    @_locked
     def get_health(self, sample_dijkstra=True):
         if not self.G:
             return {'built': False}
@@ -263,6 +754,7 @@ class QuizGraph:
     # Visualization helpers (unchanged API)
     # ------------------------------------------------------------------
 
+    @_locked
     def get_viz_data(self, max_edges=800):
         if not self.G:
             return {'nodes': [], 'edges': [], 'total_edges': 0}
@@ -283,6 +775,7 @@ class QuizGraph:
         all_edges.sort(key=lambda e: e['n_transitions'], reverse=True)
         return {'nodes': nodes, 'edges': all_edges[:max_edges], 'total_edges': len(all_edges)}
 
+    @_locked
     def get_topic_graph(self):
         if not self.G:
             return {'nodes': [], 'edges': []}
@@ -311,6 +804,7 @@ class QuizGraph:
         ]
         return {'nodes': nodes, 'edges': edges}
 
+    @_locked
     def get_transition_matrix(self):
         if not self.G:
             return {'matrix': [], 'labels': []}
@@ -336,6 +830,7 @@ class QuizGraph:
             matrix.append(row)
         return {'matrix': matrix, 'labels': [str(d) for d in diffs]}
 
+    @_locked
     def get_topic_stats(self):
         if not self.G:
             return []
@@ -361,6 +856,7 @@ class QuizGraph:
         stats.sort(key=lambda x: x['density'], reverse=True)
         return stats
 
+    @_locked
     def get_node_neighborhood(self, question_id, top_k=10):
         if not self.G or question_id not in self.G:
             return []
@@ -378,6 +874,7 @@ class QuizGraph:
         neighbors.sort(key=lambda x: x['p_transition'], reverse=True)
         return neighbors[:top_k]
 
+    @_locked
     def get_question_network(self, week=None, tema=None, difficulty=None, max_edges=100000):
         if not self.G:
             return {'nodes': [], 'edges': [], 'total_nodes': 0, 'total_edges': 0}
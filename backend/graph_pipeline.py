@@ -23,11 +23,17 @@ Hay dos modos de uso:
   - ingest_session(db, session_id): incremental. Lee los Answer de UNA
     sesión, agrega a TABLA 1 (respetando el filtro de primer intento) y
     actualiza solo las filas afectadas de TABLA 2. Llamado al completar
-    cada quiz por estudiantes reales o por la simulación.
+    cada quiz por estudiantes reales o por la simulación. Las aristas
+    tocadas se aplican al grafo en memoria como delta
+    (QuizGraph.apply_delta), sin reconstruirlo, y quedan en graph_deltas
+    para los demás workers (graph_sync).
 """
 import math
+import sys
 from collections import defaultdict
 
+import graph_sync
+
 
 # Laplace smoothing: evita peso = -log(0) = +inf cuando total_aciertos = 0.
 LAPLACE_NUM = 1.0   # +1 al numerador
@@ -151,32 +157,69 @@ def ingest_session(db, session_id):
 
     db.session.flush()
 
-    # Recalcular solo las aristas afectadas
-    for (y, x) in pairs_touched:
+    # Serializa ingestas concurrentes hasta el commit (ver graph_sync)
+    graph_sync.lock_version(db)
+
+    # Recalcular solo las aristas afectadas; lo que cambió va al delta
+    # que se aplica al grafo en memoria de cada worker (QuizGraph.apply_delta)
+    delta = {'edges': [], 'out_stats': {}}
+    for (y, x) in sorted(pairs_touched):
         n, c = _recount_pair(db, RawTransition, y, x)
-        _upsert_question_transition(db, QuestionTransition, y, x, n, c)
+        row = _upsert_question_transition(db, QuestionTransition, y, x, n, c)
+        delta['edges'].append([y, x, n, c, row.peso])
 
     # Recalcular QuestionOutStats de los nodos Y afectados (legacy / viz)
-    _refresh_out_stats(db, [y for (y, _) in pairs_touched])
+    delta['out_stats'] = _refresh_out_stats(db, [y for (y, _) in pairs_touched])
 
+    version = graph_sync.publish(db, delta)
     db.session.commit()
 
-    # Invalida grafo en memoria del worker actual: se reconstruye lazy al
-    # próximo request a un endpoint que use get_graph().
-    try:
-        from graph_engine import quiz_graph
-        quiz_graph.G = None
-    except Exception:
-        pass
+    apply_graph_delta(db, delta, version)
 
     return inserted
 
 
+def apply_graph_delta(db, delta, version):
+    """
+    Aplica el delta de una ingesta (ya publicado como `version`) al grafo
+    de este worker, en el lugar. Si no hay grafo cargado no hace nada (el
+    próximo build() ya lee la BD). Si al grafo le faltan versiones
+    anteriores las trae con graph_sync; si aun así no se puede (p. ej. una
+    pregunta nueva que no es nodo) se invalida y get_graph() lo recarga.
+    """
+    graph_engine = sys.modules.get('graph_engine')
+    if graph_engine is None or not graph_engine.quiz_graph.built:
+        return False
+    quiz_graph = graph_engine.quiz_graph
+    with quiz_graph.lock:
+        if quiz_graph.db_version == version - 1 and quiz_graph.apply_delta(delta):
+            quiz_graph.db_version = version
+            return True
+    graph_sync.sync(quiz_graph, db, force=True)
+    return quiz_graph.built
+
+
+def _invalidate_loaded_graph():
+    """
+    Marca como obsoleto el grafo de este worker (los demás lo ven por
+    graph_version). Si graph_engine aún no se importó (modo lazy) no hay
+    grafo que invalidar, y no se importa solo para esto: arrastraría
+    numpy/networkx en cada quiz completado.
+    """
+    graph_engine = sys.modules.get('graph_engine')
+    if graph_engine is not None:
+        graph_engine.quiz_graph.invalidate()
+
+
 def _refresh_out_stats(db, from_ids):
-    """Recalcula QuestionOutStats para una lista de question_from_id."""
+    """
+    Recalcula QuestionOutStats para una lista de question_from_id.
+    Retorna {question_from_id: total_salidas}.
+    """
     from models import QuestionTransition, QuestionOutStats
     from sqlalchemy import func
 
+    totals = {}
     for y in set(from_ids):
         total = db.session.query(func.sum(QuestionTransition.total_transiciones)) \
                           .filter(QuestionTransition.question_from_id == y).scalar() or 0
@@ -185,6 +228,8 @@ def _refresh_out_stats(db, from_ids):
             db.session.add(QuestionOutStats(question_id=y, total_salidas=int(total)))
         else:
             row.total_salidas = int(total)
+        totals[y] = int(total)
+    return totals
 
 
 # ---------------------------------------------------------------------------
@@ -306,14 +351,12 @@ def rebuild_full(db):
             for qid, total in out_buf.items()
         ])
 
+    # Los demás workers descartan su grafo al ver esta versión
+    graph_sync.publish(db, None)
     db.session.commit()
 
     # Invalida cache en memoria
-    try:
-        from graph_engine import quiz_graph
-        quiz_graph.G = None
-    except Exception:
-        pass
+    _invalidate_loaded_graph()
 
     return {
         'answers_processed': len(rows),
@@ -1,41 +1,50 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from authz import teacher_required
 from models import db, User, Question, QuizSession, Answer
+from startup_profile import lazy_import
+import graph_sync
+import threading
 
 graph_bp = Blueprint('graph', __name__, url_prefix='/api/graph')
 
 
-def check_teacher_role():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    return user and user.role == 'teacher'
+# Con workers gthread varios requests pueden encontrar el grafo sin cargar
+_load_lock = threading.Lock()
 
 
 def get_graph():
     """
-    Return the quiz_graph singleton, auto-building it from QuestionTransition
-    if it hasn't been built in this worker process yet.
-
-    Gunicorn spawns multiple worker processes; each has its own in-memory
-    quiz_graph. This ensures every worker can serve graph data without
-    requiring a manual /rebuild call after simulation.
+    Return the quiz_graph singleton, loading it if it isn't loaded in this
+    worker process yet.
+
+    Gunicorn spawns multiple worker processes; each has its own quiz_graph.
+    The first one to build it writes a snapshot that the others mmap
+    (QuizGraph.load), so the graph is built once per transition state
+    instead of once per worker; graph_sync keeps the workers' copies in
+    step with graph_version.
     """
-    from graph_engine import quiz_graph
-    if not quiz_graph.G:
-        quiz_graph.build(db, Question)
+    # Primer uso en este worker: importa numpy/networkx (ver startup_profile)
+    quiz_graph = lazy_import('graph_engine').quiz_graph
+    # Cambios publicados por otros workers (graph_sync)
+    graph_sync.sync(quiz_graph, db)
+    if not quiz_graph.built:
+        with _load_lock:
+            if not quiz_graph.built:
+                quiz_graph.load(db, Question)
     return quiz_graph
 
 
 @graph_bp.route('/status', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def graph_status():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify(get_graph().get_status()), 200
 
 
 @graph_bp.route('/health', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def graph_health():
     """
     Diagnóstico del grafo: nodos aislados, distribución de grado,
@@ -45,24 +54,22 @@ def graph_health():
     Útil después de un rebuild o seed-simulation para confirmar que el
     grafo quedó utilizable.
     """
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify(get_graph().get_health()), 200
 
 
 @graph_bp.route('/rebuild', methods=['POST'])
 @jwt_required()
+@teacher_required()
 def rebuild_graph():
     """Rebuild the in-memory graph from the QuestionTransition table."""
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
-    from graph_engine import quiz_graph
+    quiz_graph = lazy_import('graph_engine').quiz_graph
     success = quiz_graph.build(db, Question)
     return jsonify({'success': success, 'status': get_graph().get_status()}), 200
 
 
 @graph_bp.route('/seed-simulation', methods=['POST'])
 @jwt_required()
+@teacher_required()
 def seed_simulation():
     """
     Generate synthetic quiz sessions and rebuild the question transition graph.
@@ -73,22 +80,19 @@ def seed_simulation():
                            (only affects users with role='simulacion'; real
                            student data is preserved)
     """
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
-
     data       = request.get_json(force=True, silent=True) or {}
     n_sessions = min(int(data.get('n_sessions', 3000)), 10000)
     force      = bool(data.get('force', False))
 
     try:
-        from simulation import run_simulation
+        run_simulation = lazy_import('simulation').run_simulation
         sessions, answers, transitions = run_simulation(
             db, User, Question, QuizSession, Answer,
             n_sessions=n_sessions,
             force=force,
         )
 
-        from graph_engine import quiz_graph
+        quiz_graph = lazy_import('graph_engine').quiz_graph
         quiz_graph.build(db, Question)
 
         return jsonify({
@@ -109,6 +113,7 @@ def seed_simulation():
 
 @graph_bp.route('/rebuild-pipeline', methods=['POST'])
 @jwt_required()
+@teacher_required()
 def rebuild_pipeline():
     """
     Reconstruir TABLA 1 (RawTransition) + TABLA 2 (QuestionTransition con peso)
@@ -119,14 +124,11 @@ def rebuild_pipeline():
     Es la operación canónica para refrescar el grafo. NO destruye Answer ni
     QuizSession; solo regenera las tablas derivadas.
     """
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
-
     try:
         from graph_pipeline import rebuild_full
         stats = rebuild_full(db)
 
-        from graph_engine import quiz_graph
+        quiz_graph = lazy_import('graph_engine').quiz_graph
         quiz_graph.build(db, Question)
 
         return jsonify({
@@ -151,6 +153,7 @@ def reset_transitions():
 
 @graph_bp.route('/transitions', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_raw_transitions():
     """
     Return raw rows from QuestionTransition for inspection.
@@ -160,9 +163,6 @@ def get_raw_transitions():
       to_id   : int  – filter by question_to_id
       limit   : int  – max rows (default 100)
     """
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
-
     from models import QuestionTransition, QuestionOutStats
 
     from_id = request.args.get('from_id', type=int)
@@ -207,41 +207,36 @@ def get_raw_transitions():
 
 @graph_bp.route('/viz-data', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_viz_data():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify(get_graph().get_viz_data()), 200
 
 
 @graph_bp.route('/topic-graph', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_topic_graph():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify(get_graph().get_topic_graph()), 200
 
 
 @graph_bp.route('/transition-matrix', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_transition_matrix():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify(get_graph().get_transition_matrix()), 200
 
 
 @graph_bp.route('/topic-stats', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_topic_stats():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     return jsonify({'topic_stats': get_graph().get_topic_stats()}), 200
 
 
 @graph_bp.route('/node-neighborhood', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_node_neighborhood():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     question_id = request.args.get('question_id', type=int)
     top_k       = request.args.get('top_k', default=10, type=int)
     if question_id is None:
@@ -251,9 +246,8 @@ def get_node_neighborhood():
 
 @graph_bp.route('/question-network', methods=['GET'])
 @jwt_required()
+@teacher_required()
 def get_question_network():
-    if not check_teacher_role():
-        return jsonify({'error': 'Unauthorized'}), 403
     week       = request.args.get('week',       type=int)
     tema       = request.args.get('tema',       type=str)
     difficulty = request.args.get('difficulty', type=int)
@@ -0,0 +1,215 @@
+"""
+Versión del grafo compartida entre workers de gunicorn.
+
+Cada worker tiene su propio quiz_graph; ingest_session solo lo parcheaba en
+el worker que atendió el request. Ahora cada cambio del pipeline sube
+AppState['graph_version'] y deja su delta en graph_deltas, en la misma
+transacción:
+
+    publish(db, delta)        # ingest_session (delta) o rebuild_full (None)
+    sync(quiz_graph, db)      # en get_graph() y /next: como mucho una
+                              # lectura por PK cada GRAPH_SYNC_TTL s
+
+Un worker atrasado aplica en orden los deltas que le faltan
+(QuizGraph.apply_delta); si entre medio hubo un rebuild, o los deltas ya
+se podaron (GRAPH_DELTAS_KEEP), descarta su grafo y get_graph() lo vuelve
+a cargar (snapshot o build). Los deltas traen conteos absolutos, así que
+reaplicar uno ya incluido no cambia nada. Todos los workers convergen al
+mismo grafo en a lo sumo GRAPH_SYNC_TTL segundos.
+
+La fila de AppState se toma con FOR UPDATE antes de recontar, así que dos
+ingestas concurrentes se serializan y el orden de las versiones es el de
+los commits.
+
+En Postgres, además, publish() hace pg_notify y cada worker escucha con
+LISTEN en un thread (GRAPH_NOTIFY=1): el siguiente request después de un
+cambio sincroniza sin esperar el TTL. En SQLite queda solo el polling.
+"""
+import json
+import os
+import select
+import threading
+import time
+
+GRAPH_VERSION_KEY = 'graph_version'
+GRAPH_SYNC_TTL = float(os.environ.get('GRAPH_SYNC_TTL', 2))
+GRAPH_DELTAS_KEEP = int(os.environ.get('GRAPH_DELTAS_KEEP', 1000))
+GRAPH_NOTIFY = os.environ.get('GRAPH_NOTIFY', '1') != '0'
+GRAPH_NOTIFY_CHANNEL = 'quiz_graph'
+
+
+# ---------------------------------------------------------------------------
+# Versión en la BD
+# ---------------------------------------------------------------------------
+
+def current_version(db):
+    """AppState['graph_version'] como int (0 si nunca se publicó nada)."""
+    from models import AppState
+    return int(AppState.get_value(GRAPH_VERSION_KEY) or 0)
+
+
+def lock_version(db):
+    """
+    Lee la versión con FOR UPDATE (creando la fila si no existe). El
+    pipeline la toma antes de recontar aristas; publish() sube la siguiente.
+    """
+    from models import AppState
+    from sqlalchemy.exc import IntegrityError
+
+    table = AppState.__table__
+    select_row = (db.select(table.c.value)
+                  .where(table.c.key == GRAPH_VERSION_KEY)
+                  .with_for_update())
+    value = db.session.execute(select_row).scalar()
+    if value is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(key=GRAPH_VERSION_KEY, value='0'))
+        except IntegrityError:
+            pass
+        value = db.session.execute(select_row).scalar()
+    return int(value or 0)
+
+
+def publish(db, delta=None):
+    """
+    Sube la versión y registra el cambio (delta de ingest_session, o None
+    para un rebuild). No hace commit: va en la transacción del pipeline.
+    Retorna la versión nueva.
+    """
+    from models import AppState, GraphDelta
+
+    version = lock_version(db) + 1
+    table = AppState.__table__
+    db.session.execute(table.update()
+                       .where(table.c.key == GRAPH_VERSION_KEY)
+                       .values(value=str(version)))
+    db.session.add(GraphDelta(version=version,
+                              payload=json.dumps(delta) if delta is not None else None))
+    db.session.query(GraphDelta) \
+              .filter(GraphDelta.version <= version - GRAPH_DELTAS_KEEP) \
+              .delete(synchronize_session=False)
+    if GRAPH_NOTIFY and db.engine.dialect.name == 'postgresql':
+        # Se entrega al hacer commit (y no se entrega si hay rollback)
+        db.session.execute(db.text('SELECT pg_notify(:channel, :version)'),
+                           {'channel': GRAPH_NOTIFY_CHANNEL, 'version': str(version)})
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Sincronización de un worker
+# ---------------------------------------------------------------------------
+
+def catch_up(quiz_graph, db, target=None):
+    """
+    Aplica a quiz_graph los deltas posteriores a su db_version, hasta
+    `target` (por defecto la versión actual). False si no se puede (rebuild
+    entre medio, deltas podados, grafo sin versión): hay que recargarlo.
+    """
+    from models import GraphDelta
+
+    target = current_version(db) if target is None else target
+    base = quiz_graph.db_version
+    if base is None:
+        return False
+    if target <= base:
+        return True
+
+    rows = (db.session.query(GraphDelta.version, GraphDelta.payload)
+            .filter(GraphDelta.version > base, GraphDelta.version <= target)
+            .order_by(GraphDelta.version).all())
+    if len(rows) != target - base:
+        return False
+    # Deltas y db_version juntos: otro thread no ve (ni aplica) la mitad
+    with quiz_graph.lock:
+        for version, payload in rows:
+            if version <= (quiz_graph.db_version or 0):
+                continue
+            if payload is None or not quiz_graph.apply_delta(json.loads(payload)):
+                return False
+            quiz_graph.db_version = version
+    return True
+
+
+_checked_at = None
+_sync_lock = threading.Lock()
+
+
+def sync(quiz_graph, db, force=False):
+    """
+    Pone al día el grafo de este worker si la versión de la BD cambió.
+    Sin grafo cargado no hace nada (al cargarse ya lee el estado actual).
+    Lee la versión como mucho cada GRAPH_SYNC_TTL s, salvo force o aviso
+    por LISTEN/NOTIFY.
+    """
+    global _checked_at
+
+    if not quiz_graph.built:
+        return False
+    _start_listener(db)
+    now = time.monotonic()
+    notified = _listener.latest if _listener is not None else None
+    if (not force and _checked_at is not None and now - _checked_at < GRAPH_SYNC_TTL
+            and (notified is None or notified <= (quiz_graph.db_version or 0))):
+        return False
+
+    with _sync_lock:
+        _checked_at = now
+        version = current_version(db)
+        if version == quiz_graph.db_version:
+            return False
+        if not catch_up(quiz_graph, db, version):
+            print(f"[graph_sync] graph at version {quiz_graph.db_version} cannot reach "
+                  f"{version} with deltas; reloading")
+            quiz_graph.invalidate()
+        return True
+
+
+# ---------------------------------------------------------------------------
+# LISTEN/NOTIFY (Postgres)
+# ---------------------------------------------------------------------------
+
+class _Listener(threading.Thread):
+    """Thread que hace LISTEN y guarda la última versión notificada."""
+
+    def __init__(self, engine):
+        super().__init__(name='graph-sync-listener', daemon=True)
+        self.engine = engine
+        self.latest = None
+
+    def _connect(self):
+        raw = self.engine.raw_connection()
+        raw.detach()        # conexión propia, fuera del pool
+        conn = raw.driver_connection
+        conn.autocommit = True
+        conn.cursor().execute(f'LISTEN {GRAPH_NOTIFY_CHANNEL}')
+        return conn
+
+    def run(self):
+        while True:
+            try:
+                conn = self._connect()
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        version = int(conn.notifies.pop(0).payload)
+                        self.latest = max(self.latest or 0, version)
+            except Exception as e:
+                print(f"[graph_sync] listener error: {e}; retrying in 5s")
+                time.sleep(5)
+
+
+_listener = None
+
+
+def _start_listener(db):
+    """Arranca el LISTEN del worker (una vez, ya después del fork)."""
+    global _listener
+    if _listener is not None or not GRAPH_NOTIFY or db.engine.dialect.name != 'postgresql':
+        return
+    with _sync_lock:
+        if _listener is None:
+            _listener = _Listener(db.engine)
+            _listener.start()
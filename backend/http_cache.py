@@ -0,0 +1,51 @@
+"""
+ETag / peticiones condicionales para los endpoints de catálogo del quiz
+(/api/quiz/themes, /difficulties y /count).
+
+Sus respuestas solo cambian cuando cambia el banco, así que el ETag es
+fuerte y se deriva de la versión del catálogo (AppState['bank_version'],
+el hash del banco que escribe bank_sync) más los parámetros de la
+petición. Con If-None-Match coincidente se responde 304 antes de calcular
+nada; get_catalog() solo consulta la BD una vez cada CATALOG_VERSION_TTL s.
+
+Cache-Control deja que el navegador reuse la respuesta CATALOG_MAX_AGE
+segundos y luego revalide con el ETag.
+"""
+import hashlib
+import json
+import os
+
+from flask import current_app, jsonify, request
+
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE', 60))
+
+
+def catalog_etag(version, endpoint, params):
+    """ETag (sin comillas) para una respuesta del catálogo en esa versión."""
+    key = json.dumps([version, endpoint, params], sort_keys=True,
+                     ensure_ascii=False, default=str)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def catalog_response(endpoint, params, build):
+    """
+    Respuesta JSON build(catalog) con ETag y Cache-Control. En GET/HEAD, si
+    If-None-Match ya tiene ese ETag, 304 sin llamar a build().
+
+    `params` debe venir normalizado (p. ej. temas ordenados) para que
+    peticiones equivalentes compartan ETag.
+    """
+    from question_catalog import get_catalog
+
+    catalog = get_catalog()
+    etag = catalog_etag(catalog.version, endpoint, params)
+
+    if request.method in ('GET', 'HEAD') and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build(catalog))
+
+    response.set_etag(etag)
+    if request.method in ('GET', 'HEAD'):
+        response.headers['Cache-Control'] = f'public, max-age={CATALOG_MAX_AGE}, must-revalidate'
+    return response
@@ -5,14 +5,16 @@ SAFE VERSION - Does not drop existing tables or data
 """
 import sys
 import os
-import json
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app import create_app
-from models import db, User, Question, QuestionTransition, QuestionOutStats, Answer, RawTransition
-from preguntas_loader_simple import Preguntas
+from models import db, User, Answer
+from preguntas_loader_simple import Preguntas, BANK_HASH
+from bank_sync import sync_questions
+from question_render import refresh_rendered
+from seen_questions import rebuild_seen
 from sqlalchemy import inspect, text
 
 
@@ -61,6 +63,58 @@ def _backfill_order_in_session():
     return total
 
 
+def _dedupe_order_in_session():
+    """
+    Renumber the sessions where two answers share an order_in_session (the
+    old MAX()+1 race on double submits), keeping their relative order by
+    (order_in_session, answered_at, id). Needed before the unique index.
+    """
+    sessions = db.session.execute(text(
+        "SELECT DISTINCT session_id FROM answers WHERE order_in_session IS NOT NULL "
+        "GROUP BY session_id, order_in_session HAVING COUNT(*) > 1"
+    )).fetchall()
+    for (sid,) in sessions:
+        rows = db.session.execute(text(
+            "SELECT id FROM answers WHERE session_id = :sid "
+            "ORDER BY order_in_session, answered_at, id"
+        ), {'sid': sid}).fetchall()
+        for idx, (aid,) in enumerate(rows):
+            db.session.execute(text(
+                "UPDATE answers SET order_in_session = :idx WHERE id = :aid"
+            ), {'idx': idx, 'aid': aid})
+    if sessions:
+        db.session.commit()
+        print(f"  ✓ Renumbered duplicated order_in_session in {len(sessions)} sessions")
+    return len(sessions)
+
+
+def _ensure_unique_answer_order():
+    """Unique (session_id, order_in_session), replacing the old plain index."""
+    db.session.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_answers_session_order "
+        "ON answers (session_id, order_in_session)"
+    ))
+    db.session.execute(text("DROP INDEX IF EXISTS ix_answers_session_order"))
+    db.session.commit()
+
+
+def _backfill_answer_count():
+    """
+    quiz_sessions.answer_count = MAX(order_in_session) + 1 where it lags
+    behind (sessions created before the column existed). Idempotent.
+    """
+    next_order = ("(SELECT COALESCE(MAX(order_in_session), -1) + 1 FROM answers "
+                  "WHERE answers.session_id = quiz_sessions.id)")
+    result = db.session.execute(text(
+        f"UPDATE quiz_sessions SET answer_count = {next_order} "
+        f"WHERE answer_count < {next_order}"
+    ))
+    db.session.commit()
+    if result.rowcount:
+        print(f"  ✓ Backfilled answer_count for {result.rowcount} sessions")
+    return result.rowcount
+
+
 def init_db():
     """Initialize database with tables and default data"""
     app = create_app(os.getenv('FLASK_ENV', 'development'))
@@ -77,7 +131,15 @@ def init_db():
         _ensure_column('answers', 'order_in_session', 'INTEGER')
         _ensure_column('question_transitions', 'peso',
                        'FLOAT NOT NULL DEFAULT 0')
+        _ensure_column('questions', 'content_hash', 'VARCHAR(64)')
+        _ensure_column('quiz_sessions', 'answer_count', 'INTEGER NOT NULL DEFAULT 0')
         _backfill_order_in_session()
+        _dedupe_order_in_session()
+        _ensure_unique_answer_order()
+        _backfill_answer_count()
+        from models import UserSeenQuestions
+        if UserSeenQuestions.query.first() is None and Answer.query.first() is not None:
+            print(f"  ✓ Seen-question bitmaps built for {rebuild_seen(db)} users")
         
         # Check if admin already exists
         admin = User.query.filter_by(student_number='admin').first()
@@ -116,33 +178,19 @@ def init_db():
         else:
             print("✓ Test students already exist")
         
-        # Load questions from Preguntas.tex into database
-        question_count = Question.query.count()
-        
-        if question_count == 0:
-            print("Loading questions from Preguntas.tex into database...")
-            loaded = 0
-            for qid, data in Preguntas.items():
-                question = Question(
-                    question_id=qid,
-                    theme=data['tema'],
-                    difficulty=data['dif'],
-                    correct_answer=data['res'][0] if data['res'] else 'a',
-                    week=data['week'],
-                    content=json.dumps(data)  # Store complete data as JSON
-                )
-                db.session.add(question)
-                loaded += 1
-                
-                # Commit in batches of 100
-                if loaded % 100 == 0:
-                    db.session.commit()
-                    print(f"  Loaded {loaded} questions...")
-            
-            db.session.commit()
-            print(f"✓ Loaded {loaded} questions into database")
-        else:
-            print(f"✓ Questions already in database ({question_count} questions)")
+        # Sync questions from Preguntas.tex into database: only the
+        # questions whose content hash changed are written.
+        print("Syncing questions from Preguntas.tex into database...")
+        stats = sync_questions(db, Preguntas, bank_version=BANK_HASH)
+        print(f"✓ Questions synced: {stats['inserted']} inserted, "
+              f"{stats['updated']} updated, {stats['deleted']} deleted, "
+              f"{stats['unchanged']} unchanged")
+
+        # Pre-render HTML for new/changed questions (served by the quiz routes)
+        print("Rendering question HTML...")
+        stats = refresh_rendered(db)
+        print(f"✓ HTML rendered: {stats['rendered']} rendered, "
+              f"{stats['deleted']} deleted, {stats['unchanged']} unchanged")
         
         print("\n✓ Database initialization complete!")
         print("Default accounts:")
@@ -1,6 +1,5 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-import bcrypt
 
 db = SQLAlchemy()
 
@@ -18,14 +17,23 @@ class User(db.Model):
     
     # Relationships
     quiz_sessions = db.relationship('QuizSession', backref='user', lazy=True, cascade='all, delete-orphan')
+    seen_questions = db.relationship('UserSeenQuestions', uselist=False, lazy=True,
+                                     cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and set password (bcrypt in the password_hashing pool)"""
+        from password_hashing import hash_password
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        """Verify password"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        """Verify password (may raise password_hashing.PasswordHashBusy)"""
+        from password_hashing import verify_password
+        return verify_password(password, self.password_hash)
+
+    def password_needs_rehash(self):
+        """True if the stored hash was made with a different BCRYPT_ROUNDS"""
+        from password_hashing import needs_rehash
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         """Convert user to dictionary"""
@@ -50,9 +58,36 @@ class QuizSession(db.Model):
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     status = db.Column(db.String(20), default='in_progress')  # 'in_progress', 'completed', 'abandoned'
+    # Answers registered so far = next order_in_session. Only changed through
+    # reserve_answer_orders() (atomic UPDATE ... RETURNING).
+    answer_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     answers = db.relationship('Answer', backref='session', lazy=True, cascade='all, delete-orphan')
+
+    @classmethod
+    def reserve_answer_orders(cls, session_id, n=1, user_id=None):
+        """
+        Reserva atómicamente n posiciones consecutivas de order_in_session y
+        retorna la primera (None si la sesión no existe o no es de user_id).
+
+        Un solo UPDATE answer_count = answer_count + n RETURNING: la fila
+        queda bloqueada hasta el commit, así que dos submits concurrentes
+        nunca reciben el mismo orden. Sin RETURNING (SQLite < 3.35) se lee
+        el valor dentro de la misma transacción, que ya tiene el lock.
+        """
+        where = [cls.id == session_id]
+        if user_id is not None:
+            where.append(cls.user_id == user_id)
+        stmt = db.update(cls).where(*where).values(answer_count=cls.answer_count + n)
+
+        if db.engine.dialect.update_returning:
+            new_count = db.session.execute(stmt.returning(cls.answer_count)).scalar()
+        else:
+            if db.session.execute(stmt).rowcount == 0:
+                return None
+            new_count = db.session.query(cls.answer_count).filter(cls.id == session_id).scalar()
+        return None if new_count is None else new_count - n
     
     def to_dict(self):
         """Convert session to dictionary"""
@@ -79,12 +114,13 @@ class Answer(db.Model):
     user_answer = db.Column(db.String(10))
     is_correct = db.Column(db.Boolean, nullable=False)
     answered_at = db.Column(db.DateTime, default=datetime.utcnow)
-    # Position of this answer within its session (0-indexed). Backfilled for
-    # legacy rows by init_db.py using (answered_at, id) ordering.
+    # Position of this answer within its session (0-indexed), taken from
+    # QuizSession.reserve_answer_orders(). Backfilled for legacy rows by
+    # init_db.py using (answered_at, id) ordering.
     order_in_session = db.Column(db.Integer, nullable=True)
 
     __table_args__ = (
-        db.Index('ix_answers_session_order', 'session_id', 'order_in_session'),
+        db.Index('uq_answers_session_order', 'session_id', 'order_in_session', unique=True),
     )
 
     def to_dict(self):
@@ -99,6 +135,19 @@ class Answer(db.Model):
             'order_in_session': self.order_in_session,
         }
 
+class UserSeenQuestions(db.Model):
+    """
+    Preguntas que el usuario ya respondió, en cualquier sesión: bitmap
+    comprimido (zlib) donde el bit k corresponde a question_id == k, como
+    los bitsets del catálogo. Lo mantiene seen_questions.mark_seen.
+    """
+    __tablename__ = 'user_seen_questions'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    bitmap = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Question(db.Model):
     """Question model to store quiz questions"""
     __tablename__ = 'questions'
@@ -109,11 +158,23 @@ class Question(db.Model):
     difficulty = db.Column(db.Integer, nullable=False)
     correct_answer = db.Column(db.String(10), nullable=False)
     week = db.Column(db.Integer, nullable=False)
-    content = db.Column(db.Text, nullable=False)  # LaTeX content
+    # LaTeX/JSON de la pregunta. Diferido: las rutas del quiz no lo
+    # necesitan (metadata del catálogo + HTML de rendered_questions), así que
+    # Question.query no lo trae salvo .options(db.undefer(Question.content)).
+    content = db.deferred(db.Column(db.Text, nullable=False))
+    # SHA-256 del bloque parseado (ver preguntas_loader_simple.question_hash).
+    # bank_sync.sync_questions lo compara para actualizar solo lo que cambió.
+    content_hash = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @classmethod
+    def meta_columns(cls):
+        """Columnas de metadata, para queries que proyectan sin content."""
+        return (cls.question_id, cls.theme, cls.difficulty, cls.week, cls.correct_answer,
+                cls.content_hash)
+
     def to_dict(self):
-        """Convert question to dictionary"""
+        """Convert question to dictionary (carga content si estaba diferido)"""
         return {
             'id': self.id,
             'question_id': self.question_id,
@@ -122,10 +183,107 @@ class Question(db.Model):
             'correct_answer': self.correct_answer,
             'week': self.week,
             'content': self.content,
+            'content_hash': self.content_hash,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
+class QuestionTheme(db.Model):
+    """
+    Relación N:M pregunta ↔ tema canónico. Normaliza Question.theme
+    ('Conjuntos,Lógica' → dos filas) para filtrar por tema con un índice
+    (theme, question_id) en lugar de LIKE '%tema%' sobre el string.
+    La mantiene bank_sync.sync_questions.
+    """
+    __tablename__ = 'question_themes'
+
+    question_id = db.Column(db.Integer, primary_key=True)
+    theme = db.Column(db.String(100), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_qtheme_theme_qid', 'theme', 'question_id'),
+    )
+
+    @classmethod
+    def any_of(cls, themes):
+        """
+        Condición sobre Question: la pregunta tiene AL MENOS uno de `themes`.
+        Se resuelve como semi-join contra ix_qtheme_theme_qid.
+        """
+        return Question.question_id.in_(
+            db.select(cls.question_id).where(cls.theme.in_(list(themes)))
+        )
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'theme': self.theme,
+        }
+
+
+class RenderedQuestion(db.Model):
+    """
+    HTML pre-renderizado de cada pregunta (salida de get_question_html).
+    source_hash = question_render.render_source_hash(Question.content_hash):
+    si no coincide con el de la pregunta actual la fila está obsoleta.
+    Se llena en bloque con question_render.refresh_rendered (init_db.py).
+    """
+    __tablename__ = 'rendered_questions'
+
+    question_id = db.Column(db.Integer, primary_key=True)
+    source_hash = db.Column(db.String(64), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    options = db.Column(db.Text)  # JSON: content['opciones'] de la pregunta
+    rendered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'question_id': self.question_id,
+            'source_hash': self.source_hash,
+            'html': self.html,
+            'rendered_at': self.rendered_at.isoformat() if self.rendered_at else None,
+        }
+
+
+class AppState(db.Model):
+    """
+    Estado global clave/valor compartido por todos los workers
+    (p. ej. 'bank_version' = SHA-256 del Preguntas.tex sincronizado).
+    """
+    __tablename__ = 'app_state'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def get_value(cls, key, default=None):
+        row = db.session.get(cls, key)
+        return row.value if row is not None else default
+
+    @classmethod
+    def set_value(cls, key, value):
+        """Crea o actualiza la clave. No hace commit."""
+        row = db.session.get(cls, key)
+        if row is None:
+            db.session.add(cls(key=key, value=value))
+        else:
+            row.value = value
+
+
+class GraphDelta(db.Model):
+    """
+    Cambios del grafo de transiciones, uno por AppState['graph_version']
+    (ver graph_sync). payload es el JSON del delta de ingest_session; NULL
+    marca un rebuild completo. Se guardan solo los últimos GRAPH_DELTAS_KEEP.
+    """
+    __tablename__ = 'graph_deltas'
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    payload = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class RawTransition(db.Model):
     """
     TABLA 1 — fuente de verdad. Una fila por cada par consecutivo (Y, X)
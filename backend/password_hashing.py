@@ -0,0 +1,158 @@
+"""
+bcrypt fuera del thread del request, con cola acotada.
+
+Al inicio de una clase entran decenas de logins a la vez; con bcrypt en
+el request cada worker de gunicorn queda ocupado ~250 ms por login y los
+/api/quiz/* esperan detrás. Aquí hash y verificación corren en un pool de
+procesos chico (PASSWORD_HASH_WORKERS por worker de gunicorn) y, si ya hay
+PASSWORD_HASH_QUEUE_MAX operaciones en curso o en cola, se rechaza de
+inmediato con PasswordHashBusy (las rutas responden 503 + Retry-After) en
+vez de acumular workers bloqueados.
+
+El límite solo tiene sentido si un worker atiende varios requests a la vez:
+gunicorn corre con --worker-class gthread (start.sh, Procfile, Dockerfile),
+así que los logins de un worker esperan en el pool y los /api/quiz/* siguen
+en los otros threads. Un hash que pasa PASSWORD_HASH_TIMEOUT responde 503
+pero sigue ocupando su lugar en la cola hasta que el pool lo termina.
+
+    hash_password(pw)               → hash con BCRYPT_ROUNDS
+    verify_password(pw, hashed)     → bool
+    needs_rehash(hashed)            → True si se hizo con otro costo (rehash al login)
+
+PASSWORD_HASH_WORKERS=0 ejecuta en el mismo thread (tests, init_db),
+manteniendo el límite de cola. Métricas en GET /api/health/password-hashing.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_QUEUE_MAX = int(os.environ.get('PASSWORD_HASH_QUEUE_MAX', 16))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+
+class PasswordHashBusy(Exception):
+    """Demasiados hashes pendientes; reintentar en un momento."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, queue_max=PASSWORD_HASH_QUEUE_MAX,
+                 timeout=PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.queue_max = queue_max
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_ms = 0.0
+
+    def _executor(self):
+        # Se crea al primer uso, ya dentro del worker de gunicorn (no antes del fork)
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+        return self._pool
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def _finished(self, t0):
+        with self._lock:
+            self.completed += 1
+            self.total_ms += (time.perf_counter() - t0) * 1000
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.queue_max:
+                self.rejected += 1
+                raise PasswordHashBusy('Password hashing queue is full')
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        t0 = time.perf_counter()
+        if self.workers <= 0:
+            try:
+                result = fn(*args)
+            finally:
+                self._release()
+            self._finished(t0)
+            return result
+
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Sale de la cola cuando el pool termina el trabajo, no cuando el
+        # request deja de esperarlo (un timeout no libera al proceso)
+        future.add_done_callback(self._release)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timed_out += 1
+            raise PasswordHashBusy('Password hashing timed out')
+        self._finished(t0)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'rounds': BCRYPT_ROUNDS,
+                'queue_depth': self.pending,
+                'peak_queue_depth': self.peak_pending,
+                'queue_max': self.queue_max,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_ms': round(self.total_ms / self.completed, 2) if self.completed else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+# Singleton del proceso
+hasher = PasswordHasher()
+
+
+def hash_password(password, rounds=None):
+    return hasher.run(_hash, password, rounds or BCRYPT_ROUNDS)
+
+
+def verify_password(password, hashed):
+    return hasher.run(_verify, password, hashed)
+
+
+def needs_rehash(hashed, rounds=None):
+    """True si el hash no usa el costo actual ('$2b$12$...' → 12)."""
+    try:
+        return int(hashed.split('$')[2]) != (rounds or BCRYPT_ROUNDS)
+    except (AttributeError, IndexError, ValueError):
+        return True
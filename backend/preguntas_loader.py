@@ -65,9 +65,25 @@ def canon_tema(raw: str) -> str:
     # Fallback: lo dejamos en formato Título a partir del original
     return s[:1].upper() + s[1:].lower()
 
+def _fix_inline_dollars(tex: str) -> str:
+    """Arregla $...$ y $$...$$ para que MathJax/Pandoc no sufran."""
+    tex = tex.strip()
+    # Normaliza $$...$$ a \[...\] (bloque)
+    tex = re.sub(r"\$\$([\s\S]*?)\$\$", r"\\[\1\\]", tex)
+
+    # Si queda un número impar de '$', recorta un $ colgante al final (defensa)
+    if tex.count("$") % 2 == 1:
+        tex = tex.rstrip("$")
+
+    # Reemplaza $...$ (inline) por \( ... \)
+    tex = re.sub(r"\$([^$]+)\$", r"\\(\1\\)", tex)
+    return tex
+
+
 def load_preguntas_from_latex(file_name: str):
     """
-    Lee el archivo LaTeX y extrae preguntas definidas con el entorno question.
+    Lee el banco LaTeX (archivo o directorio de .tex, en streaming) y extrae
+    preguntas definidas con el entorno question.
     Estructura de cada pregunta:
       {id}{tema(s)}{dif}{res(s)}{week}{enunciado con enumerate}
     Devuelve: dict[int] -> {
@@ -78,21 +94,28 @@ def load_preguntas_from_latex(file_name: str):
         'enunciado_html': str,
         'opts': dict[letra]=texto
     }
+
+    Se hace en dos pasadas: primero se parsea todo y se juntan los
+    fragmentos LaTeX (enunciados y opciones); luego se renderizan todos
+    juntos con latex_to_html_batch (pocas invocaciones de Pandoc en vez de
+    una por fragmento) y se arma el HTML de cada pregunta.
     """
+    from question_parser import iter_question_blocks
+
     current_dir = os.path.dirname(os.path.abspath(__file__))
     file_path = os.path.join(current_dir, file_name)
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
 
-    pattern = r"\\begin\{question\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([\s\S]+?)\}\s*\\end\{question\}"
     preguntas = {}
-    matches = re.findall(pattern, content, re.DOTALL)
 
-    for qid_str, tema, dif_str, res_str, week_str, body in matches:
-        qid = int(qid_str)
-        dif = int(dif_str)
-        week = int(week_str)
-        res_list = [r.strip() for r in res_str.split(',')]
+    # Fragmentos a renderizar: fragments[i] es LaTeX listo para Pandoc.
+    # Cada pregunta guarda el índice de su enunciado y de sus opciones.
+    fragments = []
+    layout = []   # (qid, idx_enunciado, [idx_opcion, ...])
+
+    # El banco (archivo o directorio de .tex) se lee bloque a bloque
+    for block in iter_question_blocks(file_path):
+        qid, tema, dif, week, body = block.qid, block.tema, block.dif, block.week, block.body
+        res_list = [r.strip() for r in block.res.split(',')]
 
         # ---- CANONIZACIÓN DE TEMAS ----
         raw_topics = [t.strip() for t in tema.split(",") if t.strip()]
@@ -114,56 +137,53 @@ def load_preguntas_from_latex(file_name: str):
         # Guardamos también el texto “original” de cada opción por si lo necesitas
         opts = {}
 
-        # --- utilitaria: arregla $...$ y $$...$$ para que MathJax/Pandoc no sufran
-        def _fix_inline_dollars(tex: str) -> str:
-            tex = tex.strip()
-            # Normaliza $$...$$ a \[...\] (bloque)
-            tex = re.sub(r"\$\$([\s\S]*?)\$\$", r"\\[\1\\]", tex)
-
-            # Si queda un número impar de '$', recorta un $ colgante al final (defensa)
-            if tex.count("$") % 2 == 1:
-                tex = tex.rstrip("$")
-
-            # Reemplaza $...$ (inline) por \( ... \)
-            tex = re.sub(r"\$([^$]+)\$", r"\\(\1\\)", tex)
-            return tex
-
         # --- Enunciado sin el enumerate (como ya lo tenías)
         body_no_enum = re.sub(r"\\begin\{enumerate\}([\s\S]+?)\\end\{enumerate\}", "", body, flags=re.DOTALL).strip()
-        body_no_enum = sanitize_latex_fragment(body_no_enum)
-        html = latex_to_html(body_no_enum)
+        stem_idx = len(fragments)
+        fragments.append(sanitize_latex_fragment(body_no_enum))
 
-        # --- Construye el <ol> de opciones renderizando cada li con Pandoc
-        if items:
-            html += "<ol type='a' class='options-list' style='padding-left:1.5rem; margin-top:.5rem;'>\n"
-            for letra, texto, _ in items:
-                # elimina "a)" inicial si vino duplicado en el banco
-                txt = re.sub(r'^[A-Za-z]\)\s*', '', texto).strip()
-                opts[letra.lower()] = " ".join(txt.split())
+        option_idxs = []
+        for letra, texto, _ in items:
+            # elimina "a)" inicial si vino duplicado en el banco
+            txt = re.sub(r'^[A-Za-z]\)\s*', '', texto).strip()
+            opts[letra.lower()] = " ".join(txt.split())
 
-                # prepara el LaTeX del li
-                txt = _fix_inline_dollars(txt)
-                txt = sanitize_latex_fragment(txt)
+            # prepara el LaTeX del li
+            txt = _fix_inline_dollars(txt)
+            option_idxs.append(len(fragments))
+            fragments.append(sanitize_latex_fragment(txt))
 
-                # convierte con Pandoc para que quede igual de “bonito” que el enunciado
-                li_html = latex_to_html(txt).strip()
-
-                # Si Pandoc envolvió en <p>...</p>, lo quitamos para no anidar párrafos en <li>
-                li_html = re.sub(r'^<p>([\s\S]*?)</p>\s*$', r'\1', li_html)
+        layout.append((qid, stem_idx, option_idxs))
 
-                html += f"<li>{li_html}</li>\n"
-            html += "</ol>\n"
-
-        # --- Guarda estructura
+        # --- Guarda estructura (enunciado_html se completa abajo)
         preguntas[qid] = {
             "tema": canon_topics,   # <-- YA UNIFICADO
             "dif": dif,
             "res": res_list,
             "week": week,
-            "enunciado_html": html,
+            "enunciado_html": "",
             "opts": opts
         }
 
+    rendered = latex_to_html_batch(fragments)
+
+    for qid, stem_idx, option_idxs in layout:
+        html = rendered[stem_idx]
+
+        # --- Construye el <ol> de opciones, igual de “bonito” que el enunciado
+        if option_idxs:
+            html += "<ol type='a' class='options-list' style='padding-left:1.5rem; margin-top:.5rem;'>\n"
+            for idx in option_idxs:
+                li_html = rendered[idx].strip()
+
+                # Si Pandoc envolvió en <p>...</p>, lo quitamos para no anidar párrafos en <li>
+                li_html = re.sub(r'^<p>([\s\S]*?)</p>\s*$', r'\1', li_html)
+
+                html += f"<li>{li_html}</li>\n"
+            html += "</ol>\n"
+
+        preguntas[qid]["enunciado_html"] = html
+
     return preguntas
 
 
@@ -213,9 +233,7 @@ def latex_to_html(src: str) -> str:
         with open(html_path, "r", encoding="utf-8") as f:
             html_content = f.read()
 
-        # Por defensa: quitar etiquetas de documento/estilos si se cuelan
-        html_content = re.sub(r"</?(html|head|body)[^>]*>", "", html_content, flags=re.IGNORECASE)
-        html_content = re.sub(r"<style[^>]*>[\s\S]*?</style>", "", html_content, flags=re.IGNORECASE)
+        html_content = _clean_pandoc_html(html_content)
 
         os.remove(tex_path)
         os.remove(html_path)
@@ -232,5 +250,109 @@ def latex_to_html(src: str) -> str:
         return f"<p>Error al convertir con Pandoc ({str(e)}). Versión simple:<br>{s}</p>"
 
 
+# ---------------------------
+# Render por lotes con Pandoc
+# ---------------------------
+
+# Fragmentos por invocación de Pandoc y cuántas invocaciones en paralelo.
+PANDOC_BATCH_SIZE = int(os.environ.get('PANDOC_BATCH_SIZE', 200))
+PANDOC_WORKERS = int(os.environ.get('PANDOC_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Párrafo separador entre fragmentos: solo letras y dígitos, así Pandoc lo
+# emite tal cual como <p>MARCA{i}</p> y no puede confundirse con contenido.
+_SEP_TOKEN = "QZBATCHSEPX"
+_SEP_RE = re.compile(r"<p>" + _SEP_TOKEN + r"(\d+)</p>")
+
+
+def _clean_pandoc_html(html_content: str) -> str:
+    """Por defensa: quitar etiquetas de documento/estilos si se cuelan."""
+    html_content = re.sub(r"</?(html|head|body)[^>]*>", "", html_content, flags=re.IGNORECASE)
+    html_content = re.sub(r"<style[^>]*>[\s\S]*?</style>", "", html_content, flags=re.IGNORECASE)
+    return html_content
+
+
+def _fragment_html(html_content: str) -> str:
+    """HTML final de un fragmento: limpio, sin espacios alrededor y con un salto al final."""
+    return _clean_pandoc_html(html_content).strip() + "\n"
+
+
+def _run_pandoc(src: str) -> str:
+    """Una invocación de Pandoc sobre stdin/stdout (sin archivos temporales)."""
+    import subprocess
+    proc = subprocess.run(
+        ["pandoc", "-f", "latex", "-t", "html5", "--mathjax", "--quiet"],
+        input=src, capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    return proc.stdout
+
+
+def _join_fragments(fragments) -> str:
+    """Concatena fragmentos, cada uno seguido de su párrafo separador."""
+    return "".join(f"{frag}\n\n{_SEP_TOKEN}{i}\n\n" for i, frag in enumerate(fragments))
+
+
+def _split_batch_output(html_content: str, n: int):
+    """
+    Parte la salida de Pandoc de un lote de n fragmentos. Devuelve la lista
+    de HTML por fragmento, o None si los separadores no aparecen exactamente
+    como 0..n-1 en orden (un fragmento roto se "comió" un separador) o si
+    Pandoc juntó notas al pie al final del documento.
+    """
+    if 'class="footnotes"' in html_content:
+        return None
+    parts = _SEP_RE.split(html_content)
+    # parts = [frag0, '0', frag1, '1', ..., fragN-1, 'N-1', resto]
+    indices = parts[1::2]
+    if indices != [str(i) for i in range(n)] or parts[-1].strip():
+        return None
+    return [_fragment_html(p) for p in parts[0:-1:2]]
+
+
+def _render_chunk(fragments):
+    """
+    Renderiza un lote con una sola invocación de Pandoc. Si el lote no se
+    puede partir de forma confiable (o Pandoc falla), lo divide en dos y
+    reintenta; un fragmento suelto cae en latex_to_html, que tiene su
+    propio fallback por fragmento. Todas las ramas normalizan igual, así un
+    fragmento da el mismo HTML solo o dentro de un lote.
+    """
+    if len(fragments) == 1:
+        return [_fragment_html(latex_to_html(fragments[0]))]
+    try:
+        out = _split_batch_output(_run_pandoc(_join_fragments(fragments)), len(fragments))
+    except FileNotFoundError:
+        # Sin Pandoc instalado partir el lote no sirve de nada
+        return [_fragment_html(latex_to_html(f)) for f in fragments]
+    except Exception:
+        out = None
+    if out is not None:
+        return out
+    mid = len(fragments) // 2
+    return _render_chunk(fragments[:mid]) + _render_chunk(fragments[mid:])
+
+
+def latex_to_html_batch(fragments, batch_size=None, workers=None):
+    """
+    Equivalente a [latex_to_html(f) for f in fragments] pero con una
+    invocación de Pandoc por lote de `batch_size` fragmentos y hasta
+    `workers` lotes en paralelo.
+    """
+    fragments = list(fragments)
+    if not fragments:
+        return []
+    batch_size = batch_size or PANDOC_BATCH_SIZE
+    workers = workers or PANDOC_WORKERS
+
+    chunks = [fragments[i:i + batch_size] for i in range(0, len(fragments), batch_size)]
+    if workers <= 1 or len(chunks) == 1:
+        rendered = [_render_chunk(c) for c in chunks]
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        # Hilos: cada uno solo espera a su subproceso de Pandoc
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(_render_chunk, chunks))
+    return [html for chunk in rendered for html in chunk]
+
+
 # Carga inmediata en import
 Preguntas = load_preguntas_from_latex("Preguntas.tex")
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import json
+import hashlib
 import unicodedata
 
 def _strip_accents(s: str) -> str:
@@ -44,6 +46,34 @@ def canon_tema(raw: str) -> str:
         return THEMES_CANON[key]
     return s[:1].upper() + s[1:].lower()
 
+# ---------------------------------------------------------------------------
+# LaTeX → HTML (cascada de re.sub)
+# ---------------------------------------------------------------------------
+#
+# La misma cascada de siempre, con los patrones compilados una vez. Lo que
+# la hacía cuadrática era restaurar las matemáticas protegidas con un
+# str.replace por bloque (cada uno recorría todo el texto): ahora los
+# placeholders se restauran en un solo re.sub.
+
+_BRACKET_MATH_RE = re.compile(r'\\\[(.*?)\\\]', re.DOTALL)
+_PAREN_MATH_RE = re.compile(r'\\\((.*?)\\\)', re.DOTALL)
+_FORMAT_RES = [
+    (re.compile(r'\\textbf\{([^}]*)\}'), r'<strong>\1</strong>'),
+    (re.compile(r'\\textit\{([^}]*)\}'), r'<em>\1</em>'),
+    (re.compile(r'\\emph\{([^}]*)\}'), r'<em>\1</em>'),
+    (re.compile(r'\\smallskip'), '<br>'),
+    (re.compile(r'\\medskip'), '<br>'),
+    (re.compile(r'\\bigskip'), '<br><br>'),
+]
+_DISPLAY_MATH_RE = re.compile(r'\$\$.*?\$\$', re.DOTALL)
+_INLINE_MATH_RE = re.compile(r'\$.*?\$')
+_LINE_BREAK_RE = re.compile(r'\\\\')
+# \x00 no aparece en el .tex: un placeholder nunca choca con texto real
+_MATH_PLACEHOLDER_RE = re.compile('\x00(\\d+)\x00')
+_COMMAND_ARG_RE = re.compile(r'\\[a-zA-Z]+(?:\[[^\]]*\])?\{([^}]*)\}')
+_COMMAND_RE = re.compile(r'\\[a-zA-Z]+\s*')
+
+
 def simple_latex_to_html(latex_str: str) -> str:
     """
     Conversión mejorada de LaTeX a HTML con soporte para MathJax.
@@ -51,101 +81,119 @@ def simple_latex_to_html(latex_str: str) -> str:
     html = latex_str
 
     # Convertir bloques de matemáticas \[ ... \] a $$ ... $$ para MathJax
-    html = re.sub(r'\\\[(.*?)\\\]', r'$$\1$$', html, flags=re.DOTALL)
+    html = _BRACKET_MATH_RE.sub(r'$$\1$$', html)
 
     # Convertir matemáticas inline \( ... \) a $ ... $ para MathJax
-    html = re.sub(r'\\\((.*?)\\\)', r'$\1$', html, flags=re.DOTALL)
-
-    # Reemplazos básicos de formato
-    html = re.sub(r'\\textbf\{([^}]*)\}', r'<strong>\1</strong>', html)
-    html = re.sub(r'\\textit\{([^}]*)\}', r'<em>\1</em>', html)
-    html = re.sub(r'\\emph\{([^}]*)\}', r'<em>\1</em>', html)
+    html = _PAREN_MATH_RE.sub(r'$\1$', html)
 
-    # Espaciado
-    html = re.sub(r'\\smallskip', '<br>', html)
-    html = re.sub(r'\\medskip', '<br>', html)
-    html = re.sub(r'\\bigskip', '<br><br>', html)
+    # Reemplazos básicos de formato y espaciado
+    for pattern, repl in _FORMAT_RES:
+        html = pattern.sub(repl, html)
 
     # Saltos de línea - IMPORTANTE: mantener \\ solo fuera de matemáticas
     # Primero protegemos las matemáticas
     math_blocks = []
     def save_math(match):
         math_blocks.append(match.group(0))
-        return f"__MATH_{len(math_blocks)-1}__"
+        return f"\x00{len(math_blocks)-1}\x00"
 
-    html = re.sub(r'\$\$.*?\$\$', save_math, html, flags=re.DOTALL)
-    html = re.sub(r'\$.*?\$', save_math, html)
+    html = _DISPLAY_MATH_RE.sub(save_math, html)
+    html = _INLINE_MATH_RE.sub(save_math, html)
 
     # Ahora convertimos \\ a <br> solo fuera de matemáticas
-    html = re.sub(r'\\\\', '<br>', html)
+    html = _LINE_BREAK_RE.sub('<br>', html)
 
-    # Restauramos las matemáticas
-    for i, math in enumerate(math_blocks):
-        html = html.replace(f"__MATH_{i}__", math)
+    # Restauramos las matemáticas (un $..$ puede contener un $$..$$ ya
+    # protegido: se restaura también)
+    def restore_math(match):
+        return _MATH_PLACEHOLDER_RE.sub(restore_math, math_blocks[int(match.group(1))])
+    html = _MATH_PLACEHOLDER_RE.sub(restore_math, html)
 
     # Limpiar comandos LaTeX básicos no procesados
-    html = re.sub(r'\\[a-zA-Z]+(?:\[[^\]]*\])?\{([^}]*)\}', r'\1', html)
+    html = _COMMAND_ARG_RE.sub(r'\1', html)
 
     # Limpiar comandos sin argumentos
-    html = re.sub(r'\\[a-zA-Z]+\s*', ' ', html)
+    html = _COMMAND_RE.sub(' ', html)
 
     return html.strip()
 
+# Ruta del banco, relativa a este directorio: un .tex o un directorio de .tex
+BANK_PATH = os.environ.get('QUESTION_BANK_PATH', 'Preguntas.tex')
+
+_ENUM_RE = re.compile(r"\\begin\{enumerate\}([\s\S]+?)\\end\{enumerate\}")
+_ITEM_RE = re.compile(r"\\item\s*([A-Za-z])\)\s*([\s\S]*?)(?=(\\item|$))")
+_ITEM_LETTER_RE = re.compile(r'^[A-Za-z]\)\s*')
+
+
+def _bank_path(file_name: str) -> str:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_dir, file_name)
+
+
+def parse_pregunta(block):
+    """QuestionBlock (question_parser) → (qid, datos de la pregunta)."""
+    res_list = [r.strip() for r in block.res.split(',')]
+
+    # Canonizar temas
+    raw_topics = [t.strip() for t in block.tema.split(",") if t.strip()]
+    canon_set = set()
+    for t in raw_topics:
+        ct = canon_tema(t)
+        if ct:
+            canon_set.add(ct)
+    canon_topics = ",".join(sorted(canon_set))
+
+    # Extraer opciones del enumerate
+    enum_match = _ENUM_RE.search(block.body)
+    enum_src = enum_match.group(1) if enum_match else ""
+    items = _ITEM_RE.findall(enum_src)
+
+    opts = {}
+    for letra, texto, _ in items:
+        txt = _ITEM_LETTER_RE.sub('', texto).strip()
+        opts[letra.lower()] = " ".join(txt.split())
+
+    # Pregunta sin convertir a HTML aún
+    return block.qid, {
+        "tema": canon_topics,
+        "dif": block.dif,
+        "res": res_list,
+        "week": block.week,
+        "body_latex": block.body,  # Guardamos el LaTeX original
+        "opts": opts
+    }
+
+
+def iter_preguntas(file_name: str):
+    """
+    Genera (qid, datos) pregunta a pregunta, leyendo el banco en streaming
+    (un .tex o un directorio de .tex). Lanza QuestionParseError con
+    archivo y línea si un bloque está mal formado.
+    """
+    from question_parser import iter_question_blocks
+    for block in iter_question_blocks(_bank_path(file_name)):
+        yield parse_pregunta(block)
+
+
 def load_preguntas_from_latex(file_name: str):
     """
-    Lee el archivo LaTeX y extrae preguntas.
+    Lee el banco LaTeX (archivo o directorio) y extrae preguntas.
     RÁPIDO: No convierte a HTML hasta que se solicite.
+    Si un id se repite, queda la última definición.
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(current_dir, file_name)
-
+    file_path = _bank_path(file_name)
     if not os.path.exists(file_path):
         print(f"Warning: {file_path} not found")
         return {}
+    return dict(iter_preguntas(file_name))
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    pattern = r"\\begin\{question\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([\s\S]+?)\}\s*\\end\{question\}"
-    preguntas = {}
-    matches = re.findall(pattern, content, re.DOTALL)
-
-    for qid_str, tema, dif_str, res_str, week_str, body in matches:
-        qid = int(qid_str)
-        dif = int(dif_str)
-        week = int(week_str)
-        res_list = [r.strip() for r in res_str.split(',')]
-
-        # Canonizar temas
-        raw_topics = [t.strip() for t in tema.split(",") if t.strip()]
-        canon_set = set()
-        for t in raw_topics:
-            ct = canon_tema(t)
-            if ct:
-                canon_set.add(ct)
-        canon_topics = ",".join(sorted(canon_set))
-
-        # Extraer opciones del enumerate
-        enum_match = re.search(r"\\begin\{enumerate\}([\s\S]+?)\\end\{enumerate\}", body)
-        enum_src = enum_match.group(1) if enum_match else ""
-        items = re.findall(r"\\item\s*([A-Za-z])\)\s*([\s\S]*?)(?=(\\item|$))", enum_src)
-
-        opts = {}
-        for letra, texto, _ in items:
-            txt = re.sub(r'^[A-Za-z]\)\s*', '', texto).strip()
-            opts[letra.lower()] = " ".join(txt.split())
-
-        # Guardar pregunta (sin convertir a HTML aún)
-        preguntas[qid] = {
-            "tema": canon_topics,
-            "dif": dif,
-            "res": res_list,
-            "week": week,
-            "body_latex": body,  # Guardamos el LaTeX original
-            "opts": opts
-        }
-
-    return preguntas
+def question_hash(pregunta_data) -> str:
+    """
+    SHA-256 de una pregunta ya parseada (serialización JSON canónica).
+    Cambia si cambia su bloque en el .tex o lo que el parser extrae de él.
+    """
+    payload = json.dumps(pregunta_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 def get_question_html(pregunta_data):
     """
@@ -156,21 +204,21 @@ def get_question_html(pregunta_data):
         body = pregunta_data["body_latex"]
 
         # Separar enunciado de opciones
-        body_no_enum = re.sub(r"\\begin\{enumerate\}([\s\S]+?)\\end\{enumerate\}", "", body, flags=re.DOTALL).strip()
+        body_no_enum = _ENUM_RE.sub("", body).strip()
 
         # Convertir enunciado a HTML con mejor soporte de matemáticas
         html = simple_latex_to_html(body_no_enum)
 
         # Agregar opciones como lista HTML
-        enum_match = re.search(r"\\begin\{enumerate\}([\s\S]+?)\\end\{enumerate\}", body)
+        enum_match = _ENUM_RE.search(body)
         if enum_match:
             enum_src = enum_match.group(1)
-            items = re.findall(r"\\item\s*([A-Za-z])\)\s*([\s\S]*?)(?=(\\item|$))", enum_src)
+            items = _ITEM_RE.findall(enum_src)
 
             if items:
                 html += "<ol type='a' style='margin-top:1rem; line-height: 1.8;'>"
                 for letra, texto, _ in items:
-                    txt = re.sub(r'^[A-Za-z]\)\s*', '', texto).strip()
+                    txt = _ITEM_LETTER_RE.sub('', texto).strip()
                     txt_html = simple_latex_to_html(txt)
                     html += f"<li style='margin-bottom: 0.5rem;'>{txt_html}</li>"
                 html += "</ol>"
@@ -180,6 +228,110 @@ def get_question_html(pregunta_data):
         print(f"Error converting question to HTML: {str(e)}")
         return f"<p>Error al cargar pregunta: {str(e)}</p>"
 
-# Cargar preguntas al importar (rápido porque no convierte a HTML)
-Preguntas = load_preguntas_from_latex("Preguntas.tex")
-print(f"Loaded {len(Preguntas)} questions (lazy conversion)")
\ No newline at end of file
+# ---------------------------------------------------------------------------
+# Snapshot compilado del banco
+# ---------------------------------------------------------------------------
+
+# Subir este número cuando cambie la estructura que produce
+# load_preguntas_from_latex: invalida todos los snapshots existentes.
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot.json"
+
+
+def _file_sha256(file_path: str) -> str:
+    """SHA-256 hexadecimal del contenido del archivo."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _source_sha256(path: str) -> str:
+    """
+    SHA-256 del banco. Para un directorio combina ruta relativa + hash de
+    cada .tex, así que cambia si se edita, agrega, borra o renombra uno.
+    """
+    if not os.path.isdir(path):
+        return _file_sha256(path)
+    from question_parser import iter_tex_files
+    h = hashlib.sha256()
+    for file_path in iter_tex_files(path):
+        rel = os.path.relpath(file_path, path).replace(os.sep, '/')
+        h.update(f"{rel}\0{_file_sha256(file_path)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def _read_snapshot(snapshot_path: str, source_sha256: str):
+    """Devuelve las preguntas del snapshot si es válido para ese hash, o None."""
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (snap.get('version') != SNAPSHOT_VERSION
+            or snap.get('source_sha256') != source_sha256):
+        return None
+    return {int(qid): data for qid, data in snap['questions'].items()}
+
+
+def _write_snapshot(snapshot_path: str, source_sha256: str, preguntas) -> bool:
+    """Escribe el snapshot de forma atómica (tmp + rename). Falla en silencio."""
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'source_sha256': source_sha256,
+                'questions': preguntas,
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, snapshot_path)
+        return True
+    except OSError as e:
+        print(f"Warning: could not write bank snapshot {snapshot_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_bank(file_name: str):
+    """
+    Carga el banco de preguntas usando el snapshot compilado
+    (<file_name>.snapshot.json) si su SHA-256 coincide con el del banco
+    (un .tex o un directorio de .tex). Si no existe o está desactualizado,
+    re-parsea el banco y lo reescribe.
+
+    Devuelve (preguntas, sha256_del_banco). sha256 es None si no existe.
+    """
+    file_path = _bank_path(file_name)
+
+    if not os.path.exists(file_path):
+        print(f"Warning: {file_path} not found")
+        return {}, None
+
+    source_sha256 = _source_sha256(file_path)
+    snapshot_path = file_path.rstrip('/' + os.sep) + SNAPSHOT_SUFFIX
+
+    preguntas = _read_snapshot(snapshot_path, source_sha256)
+    if preguntas is not None:
+        return preguntas, source_sha256
+
+    preguntas = load_preguntas_from_latex(file_name)
+    _write_snapshot(snapshot_path, source_sha256, preguntas)
+    return preguntas, source_sha256
+
+
+def __getattr__(name):
+    """
+    Preguntas y BANK_HASH se cargan al primer acceso (desde el snapshot si
+    el .tex no cambió), no al importar: los workers solo usan
+    get_question_html y no necesitan el banco en memoria.
+    """
+    if name in ('Preguntas', 'BANK_HASH'):
+        global Preguntas, BANK_HASH
+        Preguntas, BANK_HASH = load_bank(BANK_PATH)
+        print(f"Loaded {len(Preguntas)} questions (lazy conversion)")
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Catálogo en memoria de las preguntas (uno por worker).
+
+Evita que /api/quiz/question, /next, /count, /themes, /difficulties y
+/generate construyan un query de SQLAlchemy y materialicen cada Question
+(incluido su blob JSON `content`) solo para contar o escoger una al azar.
+
+Estructura:
+  - Arrays columnares por posición: question_ids, weeks, difficulties,
+    theme_masks (bit i = tema self.themes[i]), correct_answers y
+    content_hashes.
+  - Bitsets precalculados (enteros de Python) donde el bit k corresponde
+    a question_id == k:
+        by_theme[tema]        preguntas que incluyen ese tema
+        by_difficulty[dif]    preguntas de esa dificultad
+        week_upto[semana]     preguntas con week <= semana (acumulado)
+
+Filtrar y contar son operaciones &, |, ~ y bit_count() sobre esos enteros:
+microsegundos y sin ir a la base de datos.
+
+Invalidación: el catálogo guarda la versión del banco con la que se
+construyó (AppState['bank_version'], escrita por bank_sync). get_catalog()
+la vuelve a consultar como máximo cada CATALOG_VERSION_TTL segundos y
+reconstruye si cambió. sync_questions además invalida el catálogo del
+worker que hizo el sync (invalidate_catalog).
+
+Con workers gthread otros threads leen el catálogo mientras se reconstruye:
+get_catalog() arma uno nuevo y reemplaza la referencia `catalog` de una
+vez, y cada request sigue con la instancia que obtuvo.
+"""
+import os
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+# Cada cuánto (segundos) se verifica contra la BD si cambió la versión del banco.
+CATALOG_VERSION_TTL = float(os.environ.get('CATALOG_VERSION_TTL', 30))
+
+
+def split_themes(theme):
+    """'Conjuntos,Lógica' → ['Conjuntos', 'Lógica'] (sin vacíos)."""
+    return [t.strip() for t in (theme or '').split(',') if t.strip()]
+
+
+def iter_bits(bits):
+    """Posiciones (question_id) de los bits encendidos, en orden ascendente."""
+    s = format(bits, 'b')[::-1] if bits else ''
+    i = s.find('1')
+    while i != -1:
+        yield i
+        i = s.find('1', i + 1)
+
+
+def bits_of(question_ids):
+    """
+    Bitset con los question_id dados encendidos. Los ids deben ser enteros
+    (las rutas validan la entrada del cliente); los negativos no pueden
+    estar en el catálogo y se ignoran.
+    """
+    bits = 0
+    for qid in question_ids:
+        qid = int(qid)
+        if qid >= 0:
+            bits |= 1 << qid
+    return bits
+
+
+class QuestionCatalog:
+    def __init__(self):
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.question_ids = array('l')
+        self.weeks = array('l')
+        self.difficulties = array('l')
+        self.theme_masks = []
+        self.correct_answers = []
+        self.content_hashes = []
+        self.theme_strings = []
+        self.themes = []
+        self.by_theme = {}
+        self.by_difficulty = {}
+        self.week_upto = {}
+        self._weeks_sorted = []
+        self._pos = {}
+        self.all_bits = 0
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def build(self, db, version=None):
+        """
+        Construye el catálogo desde la tabla questions, leyendo solo las
+        columnas de metadata (nunca `content`). Los temas salen de
+        question_themes; las preguntas sin filas ahí (BD sin sincronizar)
+        usan Question.theme separado por comas.
+        """
+        from models import Question, QuestionTheme
+
+        # Un question_id negativo no cabe en el bitset: esas filas no entran
+        rows = (db.session.query(*Question.meta_columns())
+                .filter(Question.question_id >= 0)
+                .order_by(Question.question_id)
+                .all())
+        themes_of = {}
+        for qid, theme in (db.session.query(QuestionTheme.question_id, QuestionTheme.theme)
+                           .order_by(QuestionTheme.question_id, QuestionTheme.theme)):
+            themes_of.setdefault(qid, []).append(theme)
+
+        with self._lock:
+            self._reset()
+            theme_index = {}
+            by_theme, by_difficulty, by_week = {}, {}, {}
+
+            for pos, (qid, theme, difficulty, week, correct, content_hash) in enumerate(rows):
+                bit = 1 << qid
+                mask = 0
+                for t in themes_of.get(qid) or split_themes(theme):
+                    if t not in theme_index:
+                        theme_index[t] = len(self.themes)
+                        self.themes.append(t)
+                    mask |= 1 << theme_index[t]
+                    by_theme[t] = by_theme.get(t, 0) | bit
+                by_difficulty[difficulty] = by_difficulty.get(difficulty, 0) | bit
+                by_week[week] = by_week.get(week, 0) | bit
+
+                self.question_ids.append(qid)
+                self.weeks.append(week)
+                self.difficulties.append(difficulty)
+                self.theme_masks.append(mask)
+                self.correct_answers.append(correct)
+                self.content_hashes.append(content_hash)
+                self.theme_strings.append(theme)
+                self._pos[qid] = pos
+                self.all_bits |= bit
+
+            # Bitsets acumulados: week_upto[w] = preguntas con week <= w
+            acc = 0
+            for w in sorted(by_week):
+                acc |= by_week[w]
+                self.week_upto[w] = acc
+            self._weeks_sorted = sorted(by_week)
+
+            self.by_theme = by_theme
+            self.by_difficulty = by_difficulty
+            self.version = version
+            self._checked_at = time.monotonic()
+
+        return len(self.question_ids)
+
+    def invalidate(self):
+        """Fuerza reconstrucción en el próximo get_catalog()."""
+        self.version = None
+        self._checked_at = 0.0
+
+    # ------------------------------------------------------------------
+    # Filtrado
+    # ------------------------------------------------------------------
+
+    def bits_upto_week(self, week):
+        """Bitset de preguntas con week <= `week`."""
+        i = bisect_right(self._weeks_sorted, week)
+        return self.week_upto[self._weeks_sorted[i - 1]] if i else 0
+
+    def select(self, week=None, themes=None, difficulty=None, exclude_ids=None):
+        """
+        Bitset de preguntas que cumplen los filtros (None = sin filtro):
+          week        → week <= week
+          themes      → incluye AL MENOS uno de los temas
+          difficulty  → difficulty == difficulty
+          exclude_ids → quita esos question_id
+        """
+        bits = self.all_bits
+        if week is not None:
+            bits &= self.bits_upto_week(int(week))
+        if difficulty is not None:
+            bits &= self.by_difficulty.get(int(difficulty), 0)
+        if themes:
+            any_theme = 0
+            for t in themes:
+                any_theme |= self.by_theme.get(t.strip(), 0)
+            bits &= any_theme
+        if exclude_ids:
+            bits &= ~bits_of(exclude_ids)
+        return bits
+
+    @staticmethod
+    def count(bits):
+        return bits.bit_count()
+
+    @staticmethod
+    def ids(bits):
+        return list(iter_bits(bits))
+
+    def random_id(self, bits, rng=random):
+        """Un question_id al azar del bitset, o None si está vacío."""
+        ids = self.ids(bits)
+        return rng.choice(ids) if ids else None
+
+    def sample_ids(self, bits, k, rng=random):
+        ids = self.ids(bits)
+        return rng.sample(ids, min(k, len(ids)))
+
+    def themes_in(self, bits):
+        """Temas presentes en el bitset, ordenados."""
+        return sorted(t for t, tb in self.by_theme.items() if tb & bits)
+
+    def difficulties_in(self, bits):
+        """Dificultades presentes en el bitset, ordenadas."""
+        return sorted(d for d, dbits in self.by_difficulty.items() if dbits & bits)
+
+    def get(self, question_id):
+        """Metadata de una pregunta (sin content), o None."""
+        pos = self._pos.get(question_id)
+        if pos is None:
+            return None
+        return {
+            'question_id': question_id,
+            'theme': self.theme_strings[pos],
+            'difficulty': self.difficulties[pos],
+            'week': self.weeks[pos],
+            'correct_answer': self.correct_answers[pos],
+            'content_hash': self.content_hashes[pos],
+        }
+
+    def correct_answer(self, question_id):
+        pos = self._pos.get(question_id)
+        return None if pos is None else self.correct_answers[pos]
+
+    def content_hash(self, question_id):
+        pos = self._pos.get(question_id)
+        return None if pos is None else self.content_hashes[pos]
+
+    def __contains__(self, question_id):
+        return question_id in self._pos
+
+    def __len__(self):
+        return len(self.question_ids)
+
+
+def _current_version(db):
+    """
+    Versión del banco en la BD: AppState['bank_version'] si existe; si no
+    (BD poblada sin bank_sync), una huella barata de la tabla questions.
+    """
+    from models import AppState, Question
+    from bank_sync import BANK_VERSION_KEY
+    from sqlalchemy import func
+
+    version = AppState.get_value(BANK_VERSION_KEY)
+    if version:
+        return version
+    n, max_id = db.session.query(func.count(Question.id), func.max(Question.id)).one()
+    return f"rows:{n}:{max_id}"
+
+
+def get_catalog():
+    """
+    Catálogo del worker, construyéndolo o reconstruyéndolo si la versión
+    del banco cambió (chequeo como máximo cada CATALOG_VERSION_TTL s).
+    """
+    from models import db
+    global catalog
+
+    current = catalog
+    now = time.monotonic()
+    if current.version is None or now - current._checked_at >= CATALOG_VERSION_TTL:
+        with _refresh_lock:
+            current = catalog
+            if current.version is None or now - current._checked_at >= CATALOG_VERSION_TTL:
+                version = _current_version(db)
+                if version != current.version:
+                    fresh = QuestionCatalog()
+                    fresh.build(db, version=version)
+                    catalog = current = fresh
+                current._checked_at = now
+    return current
+
+
+# Module-level singleton used by routes (reemplazado entero al reconstruir)
+catalog = QuestionCatalog()
+_refresh_lock = threading.Lock()
+
+
+def invalidate_catalog():
+    """Invalida la instancia vigente (una referencia vieja a `catalog` ya no sirve)."""
+    catalog.invalidate()
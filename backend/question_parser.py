@@ -0,0 +1,122 @@
+"""
+Parser en streaming de los bancos de preguntas (.tex).
+
+Antes cada loader leía el .tex completo a un string y corría re.findall
+con un cuerpo perezoso [\\s\\S]+? sobre todo el archivo. Aquí el archivo se
+lee línea a línea: solo se acumula el bloque \\begin{question} ...
+\\end{question} en curso, se parsea con el mismo patrón (anclado al
+bloque) y se entrega. La memoria es O(pregunta más grande), no O(banco).
+
+    for block in iter_question_blocks("Preguntas.tex"):   # o un directorio
+        block.qid, block.tema, block.body, block.file, block.line, ...
+
+`path` puede ser un archivo o un directorio: en ese caso se recorren sus
+*.tex (recursivo, en orden alfabético de ruta) como un solo banco.
+
+Un bloque mal formado lanza QuestionParseError con el archivo y la línea
+del \\begin{question} correspondiente, en vez de saltarse la pregunta (o
+tragarse la siguiente) en silencio.
+"""
+import os
+import re
+from collections import namedtuple
+
+BEGIN = '\\begin{question}'
+END = '\\end{question}'
+
+# Mismo patrón que usaban los loaders con re.findall, anclado al inicio del bloque
+_BLOCK_RE = re.compile(
+    r"\\begin\{question\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}"
+    r"\{([\s\S]+?)\}\s*\\end\{question\}"
+)
+_HEADER_RE = re.compile(
+    r"\\begin\{question\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{([^\}]+)\}\{(\d+)\}\{"
+)
+
+QuestionBlock = namedtuple(
+    'QuestionBlock', ['qid', 'tema', 'dif', 'res', 'week', 'body', 'file', 'line']
+)
+
+
+class QuestionParseError(ValueError):
+    """Bloque \\begin{question} mal formado; indica archivo y línea."""
+
+    def __init__(self, message, file=None, line=None):
+        self.file = file
+        self.line = line
+        self.message = message
+        where = f"{file}:{line}: " if file is not None else ""
+        super().__init__(f"{where}{message}")
+
+
+def iter_tex_files(path):
+    """Archivos .tex del banco: el propio path o los *.tex bajo el directorio."""
+    if not os.path.isdir(path):
+        yield path
+        return
+    found = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        found.extend(os.path.join(root, name) for name in files if name.endswith('.tex'))
+    yield from sorted(found)
+
+
+def _parse_block(text, file_path, line):
+    m = _BLOCK_RE.match(text)
+    if m is None:
+        if _HEADER_RE.match(text) is None:
+            raise QuestionParseError(
+                "cabecera inválida, se esperaba "
+                "\\begin{question}{id}{tema}{dif}{res}{week}{", file_path, line)
+        raise QuestionParseError(
+            "el cuerpo debe cerrar con '}' justo antes de \\end{question}",
+            file_path, line)
+    qid, tema, dif, res, week, body = m.groups()
+    return QuestionBlock(int(qid), tema, int(dif), res, int(week), body, file_path, line)
+
+
+def iter_file_blocks(file_path):
+    """Genera los QuestionBlock de un archivo, leyéndolo línea a línea."""
+    block = None         # líneas del bloque en curso (desde el \begin)
+    block_line = None    # línea del \begin{question} en curso
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            pending = line
+            while pending:
+                if block is None:
+                    start = pending.find(BEGIN)
+                    if start < 0:
+                        break
+                    block, block_line = [], lineno
+                    pending = pending[start:]
+                    # El \begin actual no cuenta como el de un bloque nuevo
+                    search_from = len(BEGIN)
+                else:
+                    search_from = 0
+
+                end = pending.find(END, search_from)
+                nested = pending.find(BEGIN, search_from)
+                if nested >= 0 and (end < 0 or nested < end):
+                    raise QuestionParseError(
+                        f"falta \\end{{question}} antes de la pregunta de la línea {lineno}",
+                        file_path, block_line)
+                if end < 0:
+                    block.append(pending)
+                    break
+
+                cut = end + len(END)
+                block.append(pending[:cut])
+                yield _parse_block(''.join(block), file_path, block_line)
+                block = None
+                pending = pending[cut:]
+
+    if block is not None:
+        raise QuestionParseError("falta \\end{question} al final del archivo",
+                                 file_path, block_line)
+
+
+def iter_question_blocks(path):
+    """Genera los QuestionBlock de un archivo o de un directorio de .tex."""
+    for file_path in iter_tex_files(path):
+        yield from iter_file_blocks(file_path)
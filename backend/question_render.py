@@ -0,0 +1,168 @@
+"""
+HTML pre-renderizado de las preguntas (tabla rendered_questions).
+
+get_question_html es determinista para un mismo content, así que se
+calcula una sola vez por versión de la pregunta y los endpoints del quiz
+sirven el HTML guardado, sin json.loads ni las pasadas de regex sobre el
+LaTeX en el camino caliente.
+
+    refresh_rendered(db)          → re-renderiza en bloque solo lo obsoleto
+    get_question_payloads(ids)    → {qid: {'html', 'options'}} en un query
+    get_question_payloads(ids, content_hashes={qid: hash})
+                                  → igual, pero primero desde render_cache
+
+Una fila es válida si su source_hash coincide con
+render_source_hash(Question.content_hash). Subir RENDER_VERSION cuando
+cambie la salida de get_question_html invalida todas.
+
+Con RENDERED_HTML_STORE=0 (BD sin la tabla) no se consulta
+rendered_questions y todo se renderiza al vuelo a través del LRU de
+render_cache, igual que el fallback de filas faltantes u obsoletas.
+"""
+import hashlib
+import json
+import os
+
+RENDERED_HTML_STORE = os.environ.get('RENDERED_HTML_STORE', '1') != '0'
+
+RENDER_VERSION = 1
+
+# Preguntas por lote al re-renderizar (limita cuánto content se carga a la vez)
+REFRESH_CHUNK = 200
+
+
+def render_source_hash(content_hash):
+    """Clave de validez del HTML guardado; None si la pregunta no tiene hash."""
+    if not content_hash:
+        return None
+    key = f"{RENDER_VERSION}:{content_hash}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _render(content):
+    """(html, options) de una pregunta a partir de su content JSON."""
+    from preguntas_loader_simple import get_question_html
+    data = json.loads(content)
+    return get_question_html(data), data.get('opciones', [])
+
+
+def refresh_rendered(db, force=False):
+    """
+    Re-renderiza las preguntas cuyo HTML guardado falta o está obsoleto
+    (todas si force=True) y borra las filas de preguntas que ya no existen.
+
+    Retorna dict con conteos: rendered, deleted, unchanged.
+    """
+    from models import Question, RenderedQuestion
+
+    current = dict(db.session.query(Question.question_id, Question.content_hash).all())
+    stored = dict(db.session.query(RenderedQuestion.question_id,
+                                   RenderedQuestion.source_hash).all())
+
+    stale = [
+        qid for qid, h in current.items()
+        if force or stored.get(qid) is None or stored[qid] != render_source_hash(h)
+    ]
+    orphans = [qid for qid in stored if qid not in current]
+
+    for i in range(0, len(stale), REFRESH_CHUNK):
+        chunk = stale[i:i + REFRESH_CHUNK]
+        inserts, updates = [], []
+        for qid, content, content_hash in (
+                db.session.query(Question.question_id, Question.content,
+                                 Question.content_hash)
+                .filter(Question.question_id.in_(chunk))):
+            html, options = _render(content)
+            row = {
+                'question_id': qid,
+                'source_hash': render_source_hash(content_hash) or '',
+                'html': html,
+                'options': json.dumps(options),
+            }
+            (updates if qid in stored else inserts).append(row)
+        if inserts:
+            db.session.bulk_insert_mappings(RenderedQuestion, inserts)
+        if updates:
+            db.session.bulk_update_mappings(RenderedQuestion, updates)
+
+    if orphans:
+        RenderedQuestion.query.filter(RenderedQuestion.question_id.in_(orphans)) \
+                              .delete(synchronize_session=False)
+
+    db.session.commit()
+    return {
+        'rendered': len(stale),
+        'deleted': len(orphans),
+        'unchanged': len(current) - len(stale),
+    }
+
+
+def _payload_key(question_id, content_hash):
+    return ('payload', question_id, render_source_hash(content_hash))
+
+
+def get_question_payloads(question_ids, content_hashes=None):
+    """
+    HTML y opciones de varias preguntas: {qid: {'html': str, 'options': list}}.
+
+    Con content_hashes ({qid: content_hash}, p. ej. del catálogo) se buscan
+    primero en render_cache y solo las que falten van a la BD; las leídas
+    de rendered_questions o renderizadas al vuelo quedan cacheadas para la
+    próxima vez (también con RENDERED_HTML_STORE=0).
+
+    Un solo query a rendered_questions (join con questions para validar el
+    hash). Las que falten o estén obsoletas se renderizan al vuelo desde
+    Question.content (con cache LRU por worker) sin persistirlas;
+    refresh_rendered las completa.
+    Los ids que no existen no aparecen en el resultado.
+    """
+    from models import db, Question, RenderedQuestion
+
+    ids = list(dict.fromkeys(question_ids))
+    if not ids:
+        return {}
+
+    from render_cache import render_cache, cached_question_html
+
+    payloads = {}
+    if content_hashes:
+        for qid in ids:
+            if content_hashes.get(qid):
+                cached = render_cache.get(_payload_key(qid, content_hashes[qid]), count=False)
+                if cached is not None:
+                    payloads[qid] = cached
+                    render_cache.record(hit=True)
+        ids = [qid for qid in ids if qid not in payloads]
+        if not ids:
+            return payloads
+
+    rows = []
+    if RENDERED_HTML_STORE:
+        rows = (db.session.query(RenderedQuestion.question_id, RenderedQuestion.source_hash,
+                                 RenderedQuestion.html, RenderedQuestion.options,
+                                 Question.content_hash)
+                .join(Question, Question.question_id == RenderedQuestion.question_id)
+                .filter(RenderedQuestion.question_id.in_(ids))
+                .all())
+    for qid, source_hash, html, options, content_hash in rows:
+        if source_hash and source_hash == render_source_hash(content_hash):
+            payloads[qid] = {'html': html, 'options': json.loads(options or '[]')}
+            if content_hashes is not None:
+                render_cache.record(hit=False)
+                render_cache.put(_payload_key(qid, content_hash), payloads[qid])
+
+    missing = [qid for qid in ids if qid not in payloads]
+    if missing:
+        for qid, content, content_hash in (
+                db.session.query(Question.question_id, Question.content,
+                                 Question.content_hash)
+                .filter(Question.question_id.in_(missing))):
+            data = json.loads(content)
+            payloads[qid] = {
+                'html': cached_question_html(qid, content_hash, data),
+                'options': data.get('opciones', []),
+            }
+            if content_hashes is not None and content_hash:
+                render_cache.put(_payload_key(qid, content_hash), payloads[qid])
+
+    return payloads
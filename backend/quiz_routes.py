@@ -1,12 +1,24 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, QuizSession, Answer, User, Question
+from models import db, QuizSession, Answer
+from question_catalog import get_catalog
+from question_render import get_question_payloads
+from http_cache import catalog_response
+from session_state import load_state, start_state, save_answer, forget_state
+from seen_questions import seen_bits, mark_seen, prefer_unseen
+from startup_profile import lazy_import
+import graph_sync
 from datetime import datetime
-import random
 import json
+import os
 
 quiz_bp = Blueprint('quiz', __name__, url_prefix='/api/quiz')
 
+# Máximo de respuestas por request en /answers/bulk
+BULK_ANSWERS_MAX = int(os.environ.get('BULK_ANSWERS_MAX', 200))
+# Máximo de versiones por request en /generate (una por estudiante)
+GENERATE_MAX_VERSIONS = int(os.environ.get('GENERATE_MAX_VERSIONS', 500))
+
 def load_questions(questions_data):
     """Deprecated - questions now loaded from database"""
     pass  # Keep for backwards compatibility but doesn't do anything
@@ -34,6 +46,7 @@ def start_quiz():
 
         db.session.add(session)
         db.session.commit()
+        start_state(session)
 
         return jsonify({
             'message': 'Quiz session started',
@@ -49,64 +62,56 @@ def start_quiz():
 def get_question():
     """Get a quiz question based on filters from database"""
     try:
-        from preguntas_loader_simple import get_question_html
+        user_id = get_jwt_identity()
         data = request.get_json()
 
         week = data.get('week')
         themes = data.get('themes', [])  # List of themes
         difficulty = data.get('difficulty')
-        exclude_ids = data.get('exclude_ids', [])  # Already answered questions
-
-        # Build query
-        query = Question.query
-
-        # Filter by week
-        if week:
-            query = query.filter(Question.week <= week)
-
-        # Filter by difficulty
-        if difficulty:
-            query = query.filter(Question.difficulty == difficulty)
-
-        # Filter by themes
-        if themes:
-            # Use OR condition for themes - any theme matches
-            theme_conditions = []
-            for theme in themes:
-                theme_conditions.append(Question.theme.contains(theme))
-            from sqlalchemy import or_
-            query = query.filter(or_(*theme_conditions))
-
-        # Exclude already answered questions
-        if exclude_ids:
-            query = query.filter(~Question.question_id.in_(exclude_ids))
-
-        # Get all matching questions
-        filtered_questions = query.all()
+        exclude_ids = data.get('exclude_ids') or []  # Already answered questions
+        if not isinstance(exclude_ids, list):
+            return jsonify({'error': 'exclude_ids must be a list of question ids'}), 400
+        try:
+            exclude_ids = [int(qid) for qid in exclude_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'exclude_ids must be a list of question ids'}), 400
+
+        # Filter with the in-memory catalog (any theme matches, exclude
+        # already answered questions). Questions the user already saw in
+        # any session are skipped while unseen ones remain.
+        catalog = get_catalog()
+        bits = catalog.select(
+            week=week or None,
+            themes=themes,
+            difficulty=difficulty or None,
+            exclude_ids=exclude_ids,
+        )
+        bits = prefer_unseen(bits, seen_bits(user_id))
+        available_count = catalog.count(bits)
 
-        if not filtered_questions:
+        if not available_count:
             return jsonify({
                 'message': 'No questions available',
                 'question': None,
                 'available_count': 0
             }), 200
 
-        # Select a random question
-        question = random.choice(filtered_questions)
-
-        # Convert to HTML only now (lazy conversion)
-        content_data = json.loads(question.content)
-        html_content = get_question_html(content_data)
+        # Select a random question; metadata comes from the catalog and the
+        # pre-rendered HTML from rendered_questions
+        question = catalog.get(catalog.random_id(bits))
+        payload = get_question_payloads([question['question_id']]).get(question['question_id'])
+        if not payload:
+            return jsonify({'error': 'Question not found'}), 404
 
         return jsonify({
             'question': {
-                'id': question.question_id,
-                'content': html_content,
-                'theme': question.theme,
-                'difficulty': question.difficulty,
-                'week': question.week
+                'id': question['question_id'],
+                'content': payload['html'],
+                'theme': question['theme'],
+                'difficulty': question['difficulty'],
+                'week': question['week']
             },
-            'available_count': len(filtered_questions)
+            'available_count': available_count
         }), 200
 
     except Exception as e:
@@ -118,7 +123,12 @@ def get_question():
 @quiz_bp.route('/answer', methods=['POST'])
 @jwt_required()
 def submit_answer():
-    """Submit an answer to a question"""
+    """
+    Submit an answer to a question.
+    With include_next (and total_questions) the response also carries the
+    next adaptive question under 'next', as /next would return it.
+    """
+    data = None
     try:
         user_id = get_jwt_identity()
         data = request.get_json()
@@ -128,55 +138,76 @@ def submit_answer():
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields'}), 400
 
-        # Verify session belongs to user
-        session = QuizSession.query.filter_by(
-            id=data['session_id'],
-            user_id=user_id
-        ).first()
-
-        if not session:
+        # Verify session belongs to user (cached session state)
+        state = load_state(data['session_id'], user_id)
+        if not state:
             return jsonify({'error': 'Session not found'}), 404
 
-        # Find the question in database to check correct answer
-        question = Question.query.filter_by(question_id=data['question_id']).first()
-
-        if not question:
+        # Grade against the in-memory catalog (no questions read)
+        try:
+            question = get_catalog().get(int(data['question_id']))
+        except (TypeError, ValueError):
+            question = None
+        if question is None or question['correct_answer'] is None:
             return jsonify({'error': 'Question not found'}), 404
 
         # Check if answer is correct
         user_answer = data['user_answer'].lower().strip()
-        correct_answer = question.correct_answer.lower().strip()
+        correct_answer = question['correct_answer'].lower().strip()
         is_correct = user_answer == correct_answer
 
-        # Compute order_in_session: el siguiente índice contiguo dentro
-        # de la sesión. Persistirlo evita tener que reordenar por timestamp
-        # en el pipeline del grafo.
-        from sqlalchemy import func as sql_func
-        next_order = db.session.query(
-            sql_func.coalesce(sql_func.max(Answer.order_in_session), -1) + 1
-        ).filter(Answer.session_id == data['session_id']).scalar()
+        # order_in_session: el siguiente índice contiguo dentro de la
+        # sesión, reservado con un UPDATE atómico del contador de la sesión
+        # (dos submits concurrentes nunca comparten orden). Persistirlo
+        # evita tener que reordenar por timestamp en el pipeline del grafo.
+        order = QuizSession.reserve_answer_orders(data['session_id'], user_id=user_id)
+        if order is None:
+            db.session.rollback()
+            forget_state(data['session_id'])
+            return jsonify({'error': 'Session not found'}), 404
 
-        # Create answer record
         answer = Answer(
             session_id=data['session_id'],
-            question_id=data['question_id'],
+            question_id=question['question_id'],
             user_answer=user_answer,
             is_correct=is_correct,
-            order_in_session=int(next_order or 0),
+            order_in_session=order,
         )
 
         db.session.add(answer)
+        mark_seen(user_id, [answer.question_id])
+        db.session.flush()
+        # Serializar antes del commit: después el objeto expira y
+        # to_dict() volvería a leer la fila
+        answer_dict = answer.to_dict()
         db.session.commit()
 
-        return jsonify({
+        state = save_answer(state, answer_dict['question_id'], is_correct, order)
+
+        response = {
             'message': 'Answer submitted',
             'is_correct': is_correct,
             'correct_answer': correct_answer,
-            'answer': answer.to_dict()
-        }), 201
+            'answer': answer_dict
+        }
+        # include_next: pick and render the next adaptive question in the
+        # same request (same body as /next), saving the /next round trip
+        # (the answer is already committed: a failure here only drops 'next'
+        # and the client falls back to /next)
+        if data.get('include_next'):
+            try:
+                response['next'], _ = _next_question(state, data.get('total_questions', 10))
+            except Exception as ne:
+                print(f"Error selecting next question: {ne}")
+                response['next'] = None
+
+        return jsonify(response), 201
 
     except Exception as e:
         db.session.rollback()
+        # El estado pudo quedar desfasado: que el próximo uso lo reconstruya
+        if isinstance(data, dict) and data.get('session_id'):
+            forget_state(data['session_id'])
         return jsonify({'error': str(e)}), 500
 
 @quiz_bp.route('/session/<int:session_id>/complete', methods=['POST'])
@@ -198,6 +229,7 @@ def complete_session(session_id):
         session.status = 'completed'
         session.completed_at = datetime.utcnow()
         db.session.commit()
+        forget_state(session_id)
 
         # Alimentar el grafo de transiciones con los Answers de esta sesión.
         # Falla silenciosa: si el pipeline rompe, no queremos que tumbe el
@@ -258,39 +290,35 @@ def get_session_details(session_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@quiz_bp.route('/count', methods=['POST'])
+def _themes_arg(value):
+    """'A,B' o ['A', 'B'] → lista de temas ordenada y sin repetidos (None si vacía)."""
+    if isinstance(value, str):
+        value = value.split(',')
+    themes = sorted({t.strip() for t in (value or []) if t and t.strip()})
+    return themes or None
+
+@quiz_bp.route('/count', methods=['GET', 'POST'])
 def count_questions():
-    """Count available questions based on filters from database"""
+    """
+    Count available questions based on filters.
+    GET (?week=&themes=A,B&difficulty=) supports ETag/If-None-Match;
+    POST with a JSON body is kept for older clients.
+    """
     try:
-        data = request.get_json()
-
-        week = data.get('week')
-        themes = data.get('themes', [])
-        difficulty = data.get('difficulty')
-
-        # Build query
-        query = Question.query
-
-        # Filter by week
-        if week:
-            query = query.filter(Question.week <= week)
-
-        # Filter by difficulty
-        if difficulty:
-            query = query.filter(Question.difficulty == difficulty)
-
-        # Filter by themes
-        if themes:
-            # Use OR condition for themes
-            theme_conditions = []
-            for theme in themes:
-                theme_conditions.append(Question.theme.contains(theme))
-            from sqlalchemy import or_
-            query = query.filter(or_(*theme_conditions))
-
-        count = query.count()
-
-        return jsonify({'count': count}), 200
+        if request.method == 'GET':
+            week = request.args.get('week', type=int)
+            themes = _themes_arg(request.args.get('themes'))
+            difficulty = request.args.get('difficulty', type=int)
+        else:
+            data = request.get_json()
+            week = data.get('week')
+            themes = _themes_arg(data.get('themes', []))
+            difficulty = data.get('difficulty')
+
+        params = {'week': week or None, 'themes': themes, 'difficulty': difficulty or None}
+        return catalog_response('count', params, lambda catalog: {
+            'count': catalog.count(catalog.select(**params)),
+        })
 
     except Exception as e:
         print(f"Error counting questions: {str(e)}")
@@ -300,59 +328,32 @@ def count_questions():
 
 @quiz_bp.route('/themes', methods=['GET'])
 def get_available_themes():
-    """Get all available themes from database"""
+    """Get all available themes (ETag: changes only with the question bank)"""
     try:
         week = request.args.get('week', type=int)
 
-        # Query questions from database
-        query = Question.query
-        if week is not None:
-            query = query.filter(Question.week <= week)
-
-        questions = query.all()
-
-        themes = set()
-        for q in questions:
-            question_themes = [t.strip() for t in q.theme.split(',')]
-            themes.update(question_themes)
-
-        return jsonify({
-            'themes': sorted(list(themes))
-        }), 200
+        return catalog_response('themes', {'week': week}, lambda catalog: {
+            'themes': catalog.themes_in(catalog.select(week=week)),
+        })
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @quiz_bp.route('/difficulties', methods=['GET'])
 def get_available_difficulties():
-    """Get available difficulties for given themes and week from database"""
+    """Get available difficulties for given themes and week (ETag-aware)"""
     try:
         week = request.args.get('week', type=int)
-        themes_param = request.args.get('themes')  # Comma-separated string
-
-        # Query questions from database
-        query = Question.query
-        if week is not None:
-            query = query.filter(Question.week <= week)
-
-        if themes_param:
-            # Split themes and filter by any of them
-            themes_list = [t.strip() for t in themes_param.split(',')]
-            theme_conditions = []
-            for theme in themes_list:
-                theme_conditions.append(Question.theme.contains(theme))
-            from sqlalchemy import or_
-            query = query.filter(or_(*theme_conditions))
-
-        questions = query.all()
-
-        difficulties = set()
-        for q in questions:
-            difficulties.add(q.difficulty)
-
-        return jsonify({
-            'difficulties': sorted(list(difficulties))
-        }), 200
+        # Comma-separated string; any of them matches
+        themes_list = _themes_arg(request.args.get('themes'))
+
+        return catalog_response(
+            'difficulties', {'week': week, 'themes': themes_list},
+            lambda catalog: {
+                'difficulties': catalog.difficulties_in(
+                    catalog.select(week=week, themes=themes_list)
+                ),
+            })
 
     except Exception as e:
         print(f"Error getting difficulties: {str(e)}")
@@ -360,62 +361,180 @@ def get_available_difficulties():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def _generated_question(catalog, qid, payload):
+    """One question of a /generate response."""
+    q = catalog.get(qid)
+    return {
+        'question_id': qid,
+        'question_text': payload['html'],
+        'options': payload['options'],
+        'correct_answer': q['correct_answer'],
+        'theme': q['theme'],
+        'difficulty': q['difficulty'],
+        'week': q['week']
+    }
+
+def _generate_ndjson(catalog, quizzes):
+    """
+    /generate as NDJSON: one {"version", "question"} line per question as
+    soon as it is rendered, then {"done": true, "total", "versions"}.
+
+    Payloads are fetched in chunks that double (1, 2, 4, ...): the first
+    line costs a single render and the total is still O(log n) queries.
+    """
+    rendered = {}
+    chunk = 1
+    total = 0
+    for version, quiz in enumerate(quizzes):
+        for i, qid in enumerate(quiz):
+            if qid not in rendered:
+                pending = [q for q in dict.fromkeys(quiz[i:]) if q not in rendered][:chunk]
+                payloads = get_question_payloads(
+                    pending, content_hashes={q: catalog.content_hash(q) for q in pending}
+                )
+                for q in pending:
+                    rendered[q] = _generated_question(catalog, q, payloads[q]) \
+                        if q in payloads else None
+                chunk *= 2
+            if rendered[qid] is None:
+                continue
+            total += 1
+            yield json.dumps({'version': version, 'question': rendered[qid]},
+                             ensure_ascii=False) + '\n'
+    yield json.dumps({'done': True, 'total': total, 'versions': len(quizzes)}) + '\n'
+
 @quiz_bp.route('/generate', methods=['POST'])
 @jwt_required()
 def generate_quiz():
-    """Generate a quiz with questions from database"""
+    """
+    Generate a quiz (or several versions of it) from the in-memory catalog.
+
+    Optional: stratify ('theme' | 'difficulty' | 'week') with quotas
+    {stratum: n} or weights {stratum: weight} (default: balanced),
+    num_versions (e.g. one per student, up to GENERATE_MAX_VERSIONS) and
+    seed. 'questions' is always the first version; with num_versions > 1
+    every version is under 'versions'.
+    With stream=true (or Accept: application/x-ndjson) the questions are
+    streamed as NDJSON while they are rendered (see _generate_ndjson).
+    """
     try:
         data = request.get_json()
         week = data.get('week')
         theme = data.get('theme')
         difficulty = data.get('difficulty')
-        num_questions = data.get('num_questions', 10)
-
-        # Query questions from database
-        query = Question.query
-
-        if week:
-            query = query.filter(Question.week <= week)
-        if theme:
-            query = query.filter(Question.theme.contains(theme))
-        if difficulty:
-            query = query.filter(Question.difficulty == difficulty)
-
-        # Get all matching questions
-        all_questions = query.all()
+        try:
+            num_questions = int(data.get('num_questions', 10))
+            num_versions = int(data.get('num_versions', 1))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'num_questions and num_versions must be integers'}), 400
+
+        if not 1 <= num_versions <= GENERATE_MAX_VERSIONS:
+            return jsonify({'error': f'num_versions must be between 1 and {GENERATE_MAX_VERSIONS}'}), 400
+
+        catalog = get_catalog()
+        bits = catalog.select(
+            week=week or None,
+            themes=[theme] if theme else None,
+            difficulty=difficulty or None,
+        )
 
-        if len(all_questions) == 0:
+        if not catalog.count(bits):
             return jsonify({'error': 'No questions found with these criteria'}), 404
 
-        # Randomly select questions
-        selected = random.sample(all_questions, min(num_questions, len(all_questions)))
-
-        # Convert to dict with content
-        questions_response = []
-        for q in selected:
-            content_data = json.loads(q.content)
-            from preguntas_loader_simple import get_question_html
-
-            questions_response.append({
-                'question_id': q.question_id,
-                'question_text': get_question_html(content_data),
-                'options': content_data.get('opciones', []),
-                'correct_answer': q.correct_answer,
-                'theme': q.theme,
-                'difficulty': q.difficulty,
-                'week': q.week
-            })
+        # Draw every version at once (NumPy over the catalog arrays)
+        quiz_sampler = lazy_import('quiz_sampler')
+        try:
+            quizzes = quiz_sampler.sample_quizzes(
+                catalog, bits, num_questions, n_quizzes=num_versions,
+                stratify=data.get('stratify'), quotas=data.get('quotas'),
+                weights=data.get('weights'), themes=[theme] if theme else None,
+                seed=data.get('seed'),
+            ).tolist()
+        except quiz_sampler.SamplingError as se:
+            return jsonify({'error': str(se)}), 400
+
+        if data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+            # X-Accel-Buffering: que nginx no junte las líneas antes de enviarlas
+            return Response(stream_with_context(_generate_ndjson(catalog, quizzes)),
+                            mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
+
+        # Render each distinct question once for all versions; HTML comes
+        # pre-rendered (one query, or none if already in render_cache)
+        unique_ids = sorted({qid for quiz in quizzes for qid in quiz})
+        payloads = get_question_payloads(
+            unique_ids, content_hashes={qid: catalog.content_hash(qid) for qid in unique_ids}
+        )
+        questions_by_id = {qid: _generated_question(catalog, qid, payloads[qid])
+                           for qid in unique_ids if qid in payloads}
 
-        return jsonify({
-            'questions': questions_response,
-            'total': len(questions_response)
-        }), 200
+        versions = [[questions_by_id[qid] for qid in quiz if qid in questions_by_id]
+                    for quiz in quizzes]
+        response = {
+            'questions': versions[0],
+            'total': len(versions[0])
+        }
+        if num_versions > 1:
+            response['versions'] = [{'questions': v, 'total': len(v)} for v in versions]
+
+        return jsonify(response), 200
 
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def _next_question(state, total_questions):
+    """
+    Next adaptive question for a session state: (body, status) as returned
+    by /next. Shared with /answer?include_next; no DB reads in steady state.
+    """
+    n_answered = state.answered
+    if n_answered >= total_questions:
+        return {'done': True, 'total_answered': n_answered}, 200
+
+    # Candidate pool for the session filters, minus asked questions
+    catalog = get_catalog()
+    available_bits = state.candidates(catalog)
+
+    if not available_bits:
+        return {'done': True, 'reason': 'No more questions', 'total_answered': n_answered}, 200
+
+    # Use graph to select next question
+    quiz_graph = lazy_import('graph_engine').quiz_graph
+    graph_sync.sync(quiz_graph, db)
+    quiz_graph.attach_snapshot(db)
+    next_qid = quiz_graph.get_next_question(
+        last_qid=state.last_qid,
+        asked_ids=state.asked,
+        available_bits=available_bits,
+        performance=state.performance
+    )
+
+    if next_qid is None:
+        return {'done': True, 'reason': 'No question selected', 'total_answered': n_answered}, 200
+
+    next_q = catalog.get(next_qid)
+    payload = get_question_payloads(
+        [next_qid], content_hashes={next_qid: catalog.content_hash(next_qid)}
+    ).get(next_qid)
+    if not next_q or not payload:
+        return {'error': 'Question not found'}, 404
+
+    return {
+        'done': False,
+        'question': {
+            'question_id': next_qid,
+            'question_text': payload['html'],
+            'options': payload['options'],
+            'theme': next_q['theme'],
+            'difficulty': next_q['difficulty'],
+            'week': next_q['week'],
+        },
+        'question_number': n_answered + 1,
+        'total': total_questions,
+    }, 200
+
 @quiz_bp.route('/next', methods=['POST'])
 @jwt_required()
 def get_next_adaptive():
@@ -429,77 +548,13 @@ def get_next_adaptive():
         if not session_id:
             return jsonify({'error': 'session_id required'}), 400
 
-        session = QuizSession.query.filter_by(id=session_id, user_id=user_id).first()
-        if not session:
+        # Asked ids, counts and last question come from the session state
+        state = load_state(session_id, user_id)
+        if not state:
             return jsonify({'error': 'Session not found'}), 404
 
-        # Get answers ordered by time
-        session_answers = Answer.query.filter_by(session_id=session_id).order_by(
-            Answer.answered_at, Answer.id
-        ).all()
-
-        n_answered = len(session_answers)
-        if n_answered >= total_questions:
-            return jsonify({'done': True, 'total_answered': n_answered}), 200
-
-        # Get available questions matching session filters
-        from sqlalchemy import or_ as sql_or
-        query = Question.query
-        if session.week:
-            query = query.filter(Question.week <= session.week)
-        if session.difficulty:
-            query = query.filter(Question.difficulty == session.difficulty)
-        if session.theme:
-            query = query.filter(Question.theme.contains(session.theme))
-
-        asked_ids = [a.question_id for a in session_answers]
-        all_matching = query.all()
-        available_questions = [q for q in all_matching if q.question_id not in asked_ids]
-
-        if not available_questions:
-            return jsonify({'done': True, 'reason': 'No more questions', 'total_answered': n_answered}), 200
-
-        # Calculate performance
-        n_correct = sum(1 for a in session_answers if a.is_correct)
-        performance = n_correct / n_answered if n_answered > 0 else 0.5
-
-        # Last answered question
-        last_answer = session_answers[-1] if session_answers else None
-        last_qid = last_answer.question_id if last_answer else None
-
-        # Use graph to select next question
-        from graph_engine import quiz_graph
-        next_qid = quiz_graph.get_next_question(
-            last_qid=last_qid,
-            asked_ids=set(asked_ids),
-            available_qids=[q.question_id for q in available_questions],
-            performance=performance
-        )
-
-        if next_qid is None:
-            return jsonify({'done': True, 'reason': 'No question selected', 'total_answered': n_answered}), 200
-
-        next_q = Question.query.filter_by(question_id=next_qid).first()
-        if not next_q:
-            return jsonify({'error': 'Question not found'}), 404
-
-        from preguntas_loader_simple import get_question_html
-        content_data = json.loads(next_q.content)
-        html_content = get_question_html(content_data)
-
-        return jsonify({
-            'done': False,
-            'question': {
-                'question_id': next_q.question_id,
-                'question_text': html_content,
-                'options': content_data.get('opciones', []),
-                'theme': next_q.theme,
-                'difficulty': next_q.difficulty,
-                'week': next_q.week,
-            },
-            'question_number': n_answered + 1,
-            'total': total_questions,
-        }), 200
+        body, status = _next_question(state, total_questions)
+        return jsonify(body), status
 
     except Exception as e:
         import traceback
@@ -522,7 +577,8 @@ def submit_quiz():
             theme=data.get('theme'),
             difficulty=data.get('difficulty'),
             status='completed',
-            completed_at=datetime.utcnow()
+            completed_at=datetime.utcnow(),
+            answer_count=len(data.get('answers', [])),
         )
         db.session.add(session)
         db.session.flush()  # Get session ID
@@ -538,6 +594,8 @@ def submit_quiz():
                 order_in_session=idx,
             )
             db.session.add(answer)
+        mark_seen(user_id, [a.get('questionId') for a in answers
+                            if isinstance(a.get('questionId'), int)])
 
         db.session.commit()
 
@@ -557,4 +615,120 @@ def submit_quiz():
         db.session.rollback()
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@quiz_bp.route('/answers/bulk', methods=['POST'])
+@jwt_required()
+def submit_answers_bulk():
+    """
+    Submit a batch of answers graded on the server (offline / exam mode).
+
+    Body: {answers: [{question_id, user_answer}, ...], session_id?,
+           week?, theme?, difficulty?, complete?}
+    Without session_id a new session is created (completed unless
+    complete=false). The whole batch is graded against the catalog and
+    written in one transaction with a single multi-row INSERT; graph
+    ingestion runs once if the session ends up completed.
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json(force=True, silent=True) or {}
+        answers = data.get('answers')
+
+        if not isinstance(answers, list) or not answers:
+            return jsonify({'error': 'answers must be a non-empty list'}), 400
+        if len(answers) > BULK_ANSWERS_MAX:
+            return jsonify({'error': f'At most {BULK_ANSWERS_MAX} answers per request'}), 400
+        if not all(isinstance(a, dict) and 'question_id' in a and 'user_answer' in a
+                   for a in answers):
+            return jsonify({'error': 'Each answer needs question_id and user_answer'}), 400
+
+        # Grade everything against the in-memory catalog
+        catalog = get_catalog()
+        graded, unknown = [], []
+        for ans in answers:
+            try:
+                qid = int(ans['question_id'])
+            except (TypeError, ValueError):
+                qid = None
+            correct_answer = catalog.correct_answer(qid)
+            if correct_answer is None:
+                unknown.append(ans['question_id'])
+                continue
+            user_answer = str(ans['user_answer']).lower().strip()
+            correct_answer = correct_answer.lower().strip()
+            graded.append((qid, user_answer, user_answer == correct_answer, correct_answer))
+
+        if unknown:
+            return jsonify({'error': 'Unknown questions', 'unknown_question_ids': unknown}), 400
+
+        session_id = data.get('session_id')
+        now = datetime.utcnow()
+        if session_id:
+            complete = bool(data.get('complete', False))
+            first_order = QuizSession.reserve_answer_orders(session_id, n=len(graded),
+                                                            user_id=user_id)
+            if first_order is None:
+                db.session.rollback()
+                return jsonify({'error': 'Session not found'}), 404
+            if complete:
+                db.session.execute(db.update(QuizSession)
+                                   .where(QuizSession.id == session_id)
+                                   .values(status='completed', completed_at=now))
+        else:
+            complete = bool(data.get('complete', True))
+            session = QuizSession(
+                user_id=user_id,
+                week=data.get('week'),
+                theme=data.get('theme'),
+                difficulty=data.get('difficulty'),
+                status='completed' if complete else 'in_progress',
+                completed_at=now if complete else None,
+                answer_count=len(graded),
+            )
+            db.session.add(session)
+            db.session.flush()  # Get session ID
+            session_id, first_order = session.id, 0
+
+        rows = [{
+            'session_id': session_id,
+            'question_id': qid,
+            'user_answer': user_answer,
+            'is_correct': is_correct,
+            'answered_at': now,
+            'order_in_session': first_order + i,
+        } for i, (qid, user_answer, is_correct, _) in enumerate(graded)]
+        db.session.execute(db.insert(Answer).values(rows))
+        mark_seen(user_id, [g[0] for g in graded])
+        db.session.commit()
+
+        # El estado cacheado de la sesión ya no cuadra: se reconstruye al usarlo
+        forget_state(session_id)
+
+        if complete:
+            try:
+                from graph_pipeline import ingest_session
+                ingest_session(db, session_id)
+            except Exception as ge:
+                print(f"[graph_pipeline] ingest_session({session_id}) failed: {ge}")
+
+        return jsonify({
+            'message': 'Answers submitted',
+            'session_id': session_id,
+            'completed': complete,
+            'total': len(graded),
+            'correct': sum(1 for g in graded if g[2]),
+            'results': [{
+                'question_id': qid,
+                'is_correct': is_correct,
+                'correct_answer': correct_answer,
+                'order_in_session': first_order + i,
+            } for i, (qid, _, is_correct, correct_answer) in enumerate(graded)],
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,173 @@
+"""
+Muestreo vectorizado de quizzes sobre el catálogo en memoria (NumPy).
+
+Reemplaza el random.sample por quiz de /api/quiz/generate: las candidatas
+salen del bitset del catálogo y el quiz (o cientos de variantes, p. ej.
+una por estudiante) se sortea de una vez con claves aleatorias y
+argpartition, sin queries ni bucles por pregunta.
+
+    quizzes = sample_quizzes(catalog, bits, k=10, n_quizzes=200,
+                             stratify='difficulty', weights={'1': 2, '3': 1})
+    quizzes.shape == (200, 10)       # question_ids, sin repetidos por fila
+
+Estratificación (stratify = 'theme' | 'difficulty' | 'week'):
+  - quotas  {estrato: n}: exactamente n preguntas de ese estrato por quiz
+    (el total es la suma; k se ignora).
+  - weights {estrato: peso}: k se reparte proporcional a los pesos (por
+    defecto iguales → quiz balanceado); si un estrato no alcanza, lo que
+    falta pasa a los demás.
+Las claves de quotas/weights se comparan como string ('2' == 2), como
+llegan en el JSON.
+
+Para 'theme' cada pregunta cuenta en un solo estrato (si no, podría salir
+dos veces): su primer tema, o el primero de `themes` si se filtró por tema.
+"""
+import math
+
+import numpy as np
+
+from question_catalog import iter_bits, split_themes
+
+STRATA = ('theme', 'difficulty', 'week')
+
+
+class SamplingError(ValueError):
+    """
+    Parámetros de muestreo inválidos o imposibles (estrato desconocido,
+    cuota sin preguntas, seed/quotas/weights mal formados).
+    """
+
+
+def allocate(k, sizes, shares):
+    """
+    Reparte k preguntas entre estratos proporcional a `shares` (restos
+    mayores), sin pasar `sizes`; lo que no cabe se redistribuye.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    shares = np.asarray(shares, dtype=float)
+    alloc = np.zeros(len(sizes), dtype=np.int64)
+    remaining = int(min(k, sizes[shares > 0].sum())) if len(sizes) else 0
+    open_ = (sizes > 0) & (shares > 0)
+
+    while remaining > 0 and open_.any():
+        w = np.where(open_, shares, 0.0)
+        exact = remaining * w / w.sum()
+        add = np.floor(exact).astype(np.int64)
+        short = remaining - int(add.sum())
+        if short:
+            add[np.argsort(-(exact - add), kind='stable')[:short]] += 1
+        add = np.minimum(add, sizes - alloc)
+        alloc += add
+        remaining -= int(add.sum())
+        open_ &= alloc < sizes
+    return alloc
+
+
+def _draw(rng, n_rows, n_items, k):
+    """Por fila, índices de k ítems distintos de range(n_items) (k <= n_items)."""
+    keys = rng.random((n_rows, n_items))
+    if k >= n_items:
+        return np.argsort(keys, axis=1)
+    return np.argpartition(keys, k - 1, axis=1)[:, :k]
+
+
+_arrays = {}   # (id(catalog), versión) → vistas NumPy de los arrays del catálogo
+
+
+def catalog_arrays(catalog):
+    """question_ids, weeks y difficulties del catálogo como ndarrays (cacheados por versión)."""
+    key = (id(catalog), catalog.version, len(catalog))
+    arrays = _arrays.get(key)
+    if arrays is None:
+        arrays = {
+            'question_ids': np.array(catalog.question_ids, dtype=np.int64),
+            'week': np.array(catalog.weeks, dtype=np.int64),
+            'difficulty': np.array(catalog.difficulties, dtype=np.int64),
+        }
+        _arrays.clear()
+        _arrays[key] = arrays
+    return arrays
+
+
+def _labels(catalog, ids, by, themes=None):
+    """Estrato de cada question_id según `by`."""
+    arrays = catalog_arrays(catalog)
+    # question_ids está ordenado (el catálogo se construye por question_id)
+    positions = np.searchsorted(arrays['question_ids'], ids)
+    if by in ('difficulty', 'week'):
+        return arrays[by][positions]
+
+    wanted = [t.strip() for t in themes or []]
+    labels = []
+    for p in positions.tolist():
+        own = split_themes(catalog.theme_strings[p])
+        labels.append(next((t for t in own if t in wanted), own[0] if own else ''))
+    return np.array(labels)
+
+
+def _check_params(stratify, quotas, weights, seed):
+    """Valida los parámetros que vienen tal cual del cliente (JSON)."""
+    if stratify is not None and stratify not in STRATA:
+        raise SamplingError(f"stratify must be one of {', '.join(STRATA)}")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool) or seed < 0):
+        raise SamplingError("seed must be a non-negative integer")
+    for name, table, kinds, what in (('quotas', quotas, (int,), 'integers'),
+                                     ('weights', weights, (int, float), 'numbers')):
+        if table is None:
+            continue
+        if not isinstance(table, dict):
+            raise SamplingError(f"{name} must be an object {{stratum: number}}")
+        for value in table.values():
+            if (not isinstance(value, kinds) or isinstance(value, bool)
+                    or not math.isfinite(value) or value < 0):
+                raise SamplingError(f"{name} values must be non-negative {what}")
+
+
+def sample_quizzes(catalog, bits, k, n_quizzes=1, stratify=None, quotas=None,
+                   weights=None, themes=None, seed=None):
+    """
+    n_quizzes quizzes de hasta k preguntas del bitset `bits`.
+
+    Retorna un ndarray (n_quizzes, m) de question_ids, m <= k (menos si no
+    hay suficientes candidatas), en orden aleatorio dentro de cada fila.
+    """
+    _check_params(stratify, quotas, weights, seed)
+
+    rng = np.random.default_rng(seed)
+    ids = np.fromiter(iter_bits(bits), dtype=np.int64)
+    if not len(ids) or (k <= 0 and quotas is None):
+        return np.empty((n_quizzes, 0), dtype=np.int64)
+
+    if stratify is None:
+        m = min(k, len(ids))
+        columns = [ids[_draw(rng, n_quizzes, len(ids), m)]]
+    else:
+        labels = _labels(catalog, ids, stratify, themes)
+        values, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        keys = [str(v) for v in values.tolist()]
+
+        if quotas is not None:
+            quotas = {str(key): int(n) for key, n in quotas.items()}
+            missing = sorted(set(quotas) - set(keys))
+            if any(quotas[key] > 0 for key in missing):
+                raise SamplingError(f"No questions for {stratify} {', '.join(missing)}")
+            alloc = np.array([quotas.get(key, 0) for key in keys], dtype=np.int64)
+            if (alloc > sizes).any():
+                short = [key for key, a, n in zip(keys, alloc, sizes) if a > n]
+                raise SamplingError(f"Not enough questions for {stratify} {', '.join(short)}")
+        else:
+            weights = {str(key): float(w) for key, w in (weights or {}).items()}
+            shares = [weights.get(key, 0.0) if weights else 1.0 for key in keys]
+            alloc = allocate(k, sizes, shares)
+
+        columns = []
+        for j in np.flatnonzero(alloc):
+            members = ids[inverse == j]
+            columns.append(members[_draw(rng, n_quizzes, len(members), int(alloc[j]))])
+        if not columns:
+            return np.empty((n_quizzes, 0), dtype=np.int64)
+
+    quizzes = np.concatenate(columns, axis=1)
+    # Mezclar dentro de cada quiz (si no, quedan agrupadas por estrato)
+    order = np.argsort(rng.random(quizzes.shape), axis=1)
+    return np.take_along_axis(quizzes, order, axis=1)
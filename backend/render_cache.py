@@ -0,0 +1,125 @@
+"""
+Cache LRU en memoria (uno por worker) delante de get_question_html.
+
+Para despliegues sin la tabla rendered_questions (RENDERED_HTML_STORE=0)
+y para el fallback de question_render cuando una fila falta o está
+obsoleta. En una clase, todos los de la misma semana/tema reciben las
+mismas pocas decenas de preguntas: la mayoría de los renders se repiten.
+
+La clave es (question_id, content_hash): si la pregunta cambia en el
+banco cambia su hash y la entrada vieja simplemente deja de usarse hasta
+que el LRU la expulsa. El cache tiene dos límites, número de entradas y
+bytes (UTF-8) de HTML guardado; al pasarse se expulsan las menos usadas.
+
+question_render también guarda aquí los payloads {'html', 'options'}
+ya leídos de rendered_questions, con clave ('payload', qid, source_hash),
+para que /api/quiz/next sirva la pregunta sin ir a la BD.
+
+Métricas (hits, misses, evictions) en GET /api/health/render-cache: un
+hit o un miss por pregunta pedida. Los sondeos intermedios (payload antes
+que HTML) usan get(key, count=False) y quien los hace cuenta con record().
+"""
+import os
+import threading
+from collections import OrderedDict
+
+RENDER_CACHE_MAX_ENTRIES = int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', 1024))
+RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+
+
+def _sizeof(value):
+    """Bytes aproximados de un valor cacheado: HTML o payload {'html', 'options'}."""
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    return len(value['html'].encode('utf-8')) + sum(len(str(o)) for o in value['options'])
+
+
+class RenderCache:
+    def __init__(self, max_entries=RENDER_CACHE_MAX_ENTRIES, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key → (valor, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, count=True):
+        """Valor guardado para key (y lo marca como recién usado), o None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += count
+                return None
+            self._entries.move_to_end(key)
+            self.hits += count
+            return entry[0]
+
+    def record(self, hit):
+        """Cuenta un lookup resuelto fuera de get() (ver docstring del módulo)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, html):
+        size = _sizeof(html)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes or self.max_entries <= 0:
+                # No cabe ni solo: no se guarda (y no expulsa a nadie)
+                return
+            self._entries[key] = (html, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Singleton del proceso
+render_cache = RenderCache()
+
+
+def cached_question_html(question_id, content_hash, pregunta_data):
+    """
+    get_question_html(pregunta_data) pasando por el LRU. Sin content_hash
+    no hay clave confiable y se renderiza directo.
+    """
+    from preguntas_loader_simple import get_question_html
+
+    if not content_hash:
+        return get_question_html(pregunta_data)
+
+    key = (question_id, content_hash)
+    html = render_cache.get(key)
+    if html is None:
+        html = get_question_html(pregunta_data)
+        render_cache.put(key, html)
+    return html
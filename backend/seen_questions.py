@@ -0,0 +1,101 @@
+"""
+Preguntas ya vistas por cada usuario, entre sesiones (user_seen_questions).
+
+El bitmap usa la misma convención que question_catalog (bit k =
+question_id k), así que excluir las vistas al elegir es un `& ~seen`
+sobre enteros de Python, sin importar cuántas sean ni mandarlas en el
+request. En la BD se guarda comprimido con zlib (pack/unpack).
+
+    seen = seen_bits(user_id)                  # una lectura por PK
+    mark_seen(user_id, [qid, ...])             # al escribir answers, misma transacción
+    prefer_unseen(bits, seen)                  # bits sin las vistas, o bits si no queda nada
+    rebuild_seen()                             # recalcula desde answers (init_db)
+"""
+import zlib
+from datetime import datetime
+
+from question_catalog import bits_of
+
+
+def pack(bits):
+    """Bitset → bytes comprimidos (little endian)."""
+    return zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+
+
+def unpack(blob):
+    """bytes de pack() → bitset (0 si no hay)."""
+    return int.from_bytes(zlib.decompress(blob), 'little') if blob else 0
+
+
+def seen_bits(user_id):
+    """Bitset de las preguntas que el usuario ya respondió."""
+    from models import db, UserSeenQuestions
+
+    blob = db.session.query(UserSeenQuestions.bitmap) \
+                     .filter(UserSeenQuestions.user_id == int(user_id)).scalar()
+    return unpack(blob)
+
+
+def prefer_unseen(bits, seen):
+    """Candidatas sin las ya vistas; si las vio todas, las candidatas tal cual."""
+    return (bits & ~seen) or bits
+
+
+def mark_seen(user_id, question_ids):
+    """
+    Agrega question_ids al bitmap del usuario dentro de la transacción en
+    curso (no hace commit). La fila se lee con FOR UPDATE para que dos
+    sesiones del mismo usuario no se pisen los bits. Retorna el bitset.
+    """
+    from models import db, UserSeenQuestions
+    from sqlalchemy.exc import IntegrityError
+
+    user_id = int(user_id)
+    added = bits_of(question_ids)
+    table = UserSeenQuestions.__table__
+    select_row = (db.select(table.c.bitmap)
+                  .where(table.c.user_id == user_id)
+                  .with_for_update())
+
+    blob = db.session.execute(select_row).scalar()
+    if blob is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(
+                    user_id=user_id, bitmap=pack(added), updated_at=datetime.utcnow()))
+            return added
+        except IntegrityError:
+            # Otra transacción creó la fila primero: mezclar con la suya
+            blob = db.session.execute(select_row).scalar()
+
+    seen = unpack(blob)
+    if seen | added != seen:
+        seen |= added
+        db.session.execute(table.update()
+                           .where(table.c.user_id == user_id)
+                           .values(bitmap=pack(seen), updated_at=datetime.utcnow()))
+    return seen
+
+
+def rebuild_seen(db):
+    """
+    Recalcula todos los bitmaps desde answers (p. ej. tras crear la tabla).
+    Retorna el número de usuarios escritos.
+    """
+    from models import Answer, QuizSession, UserSeenQuestions
+
+    by_user = {}
+    for user_id, qid in (db.session.query(QuizSession.user_id, Answer.question_id)
+                         .join(Answer, Answer.session_id == QuizSession.id)
+                         .distinct()):
+        by_user[user_id] = by_user.get(user_id, 0) | (1 << qid)
+
+    db.session.query(UserSeenQuestions).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    if by_user:
+        db.session.execute(UserSeenQuestions.__table__.insert(), [
+            {'user_id': user_id, 'bitmap': pack(bits), 'updated_at': now}
+            for user_id, bits in by_user.items()
+        ])
+    db.session.commit()
+    return len(by_user)
@@ -0,0 +1,349 @@
+"""
+Estado de las sesiones de quiz en curso, para /api/quiz/next y /answer.
+
+Antes cada /next recargaba la QuizSession y todos sus Answers para
+recalcular asked_ids (lista), rendimiento y última pregunta. Aquí ese
+estado vive en un store y /answer lo actualiza en O(1):
+
+    SessionState: asked (set), answered, correct, last_qid, next_order,
+                  seen (bitmap de preguntas vistas por el usuario en
+                  cualquier sesión, ver seen_questions), filtros de la
+                  sesión y el pool de candidatas (bitset del catálogo,
+                  recalculado solo si cambia la versión del banco)
+
+    state = load_state(session_id, user_id)   # store → BD si no está
+    state = save_answer(state, qid, is_correct, order)
+
+En régimen: /answer = 1 transacción (UPDATE del contador de la sesión,
+INSERT y el merge del bitmap de vistas); /next = 0 lecturas de BD con
+'redis' o SESSION_STATE_VERIFY=0, y una lectura por PK con 'memory' (ver
+abajo).
+
+Las sesiones se guardan por int(session_id): /answer puede recibir el id
+como str y start_state lo registra como int.
+
+Backends (SESSION_STATE_BACKEND):
+  - 'memory': dict LRU en el proceso (SESSION_STATE_MAX sesiones, TTL
+    SESSION_STATE_TTL s). Cada worker de gunicorn tiene el suyo, así que
+    con varios workers una sesión puede tener estado viejo en otro
+    worker; por eso, salvo SESSION_STATE_VERIFY=0 (un solo worker o
+    sticky sessions), antes de usarlo se compara `next_order` contra
+    QuizSession.answer_count (una fila por PK; el contador sube en la
+    misma transacción que inserta cada Answer) y se recarga si no coincide.
+  - 'redis': compartido entre workers (REDIS_URL), JSON con TTL. Sin
+    verificación: 0 lecturas de BD por /next. save_answer suma la
+    respuesta con WATCH/MULTI sobre el valor guardado, así dos /answer
+    concurrentes de la misma sesión no se pisan.
+Por defecto 'redis' si hay REDIS_URL y el paquete está instalado, si no
+'memory'. Si Redis falla, se cae a la BD (como un miss).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+REDIS_URL = os.environ.get('REDIS_URL')
+SESSION_STATE_BACKEND = os.environ.get(
+    'SESSION_STATE_BACKEND', 'redis' if REDIS_URL and REDIS_AVAILABLE else 'memory')
+SESSION_STATE_MAX = int(os.environ.get('SESSION_STATE_MAX', 10000))
+SESSION_STATE_TTL = int(os.environ.get('SESSION_STATE_TTL', 6 * 3600))
+SESSION_STATE_VERIFY = os.environ.get('SESSION_STATE_VERIFY', '1') != '0'
+
+
+# El backend memory comparte el objeto entre los threads del worker
+_record_lock = threading.Lock()
+
+
+class SessionState:
+    """Estado incremental de una QuizSession (sin el pool, que es derivado)."""
+
+    FIELDS = ('session_id', 'user_id', 'week', 'theme', 'difficulty',
+              'answered', 'correct', 'last_qid', 'next_order')
+
+    def __init__(self, session_id, user_id, week=None, theme=None, difficulty=None,
+                 asked=(), answered=0, correct=0, last_qid=None, next_order=0, seen=0):
+        self.session_id = int(session_id)
+        self.user_id = str(user_id)
+        self.week = week
+        self.theme = theme
+        self.difficulty = difficulty
+        self.asked = set(asked)
+        self.answered = answered
+        self.correct = correct
+        self.last_qid = last_qid
+        self.next_order = next_order
+        self.seen = int(seen, 16) if isinstance(seen, str) else seen
+        # Candidatas según los filtros de la sesión (sin excluir asked)
+        self.pool = None
+        self.pool_version = None
+
+    @property
+    def performance(self):
+        return self.correct / self.answered if self.answered else 0.5
+
+    def record_answer(self, question_id, is_correct, order=None):
+        """Suma una respuesta; `order` es su order_in_session si se conoce."""
+        with _record_lock:
+            self.asked.add(question_id)
+            self.seen |= 1 << question_id
+            self.answered += 1
+            self.correct += 1 if is_correct else 0
+            self.last_qid = question_id
+            self.next_order = max(self.next_order, order + 1) if order is not None \
+                else self.next_order + 1
+
+    def candidates(self, catalog):
+        """
+        Bitset de preguntas disponibles: pool de la sesión menos las ya
+        preguntadas y, mientras queden otras, menos las que el usuario vio
+        en sesiones anteriores.
+        """
+        from question_catalog import bits_of
+        from seen_questions import prefer_unseen
+
+        if self.pool is None or self.pool_version != catalog.version:
+            self.pool = catalog.select(
+                week=self.week or None,
+                themes=[self.theme] if self.theme else None,
+                difficulty=self.difficulty or None,
+            )
+            self.pool_version = catalog.version
+        return prefer_unseen(self.pool & ~bits_of(self.asked), self.seen)
+
+    def to_json(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data['asked'] = sorted(self.asked)
+        data['seen'] = format(self.seen, 'x')
+        return json.dumps(data)
+
+    @classmethod
+    def from_json(cls, raw):
+        return cls(**json.loads(raw))
+
+    @classmethod
+    def from_db(cls, session):
+        """Reconstruye el estado desde los Answers de la sesión (una proyección)."""
+        from models import db, Answer
+        from seen_questions import seen_bits
+
+        state = cls(session.id, session.user_id, week=session.week,
+                    theme=session.theme, difficulty=session.difficulty,
+                    seen=seen_bits(session.user_id))
+        max_order = -1
+        for qid, is_correct, order in (
+                db.session.query(Answer.question_id, Answer.is_correct,
+                                 Answer.order_in_session)
+                .filter(Answer.session_id == session.id)
+                .order_by(Answer.order_in_session, Answer.answered_at, Answer.id)):
+            state.record_answer(qid, is_correct)
+            if order is not None and order > max_order:
+                max_order = order
+        state.next_order = max(max_order + 1, session.answer_count or 0)
+        return state
+
+
+class MemorySessionStore:
+    """LRU en el proceso con TTL; guarda los objetos SessionState tal cual."""
+
+    shared = False
+
+    def __init__(self, max_entries=SESSION_STATE_MAX, ttl=SESSION_STATE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # session_id → (state, expira)
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, state):
+        with self._lock:
+            self._entries[state.session_id] = (state, time.monotonic() + self.ttl)
+            self._entries.move_to_end(state.session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_answer(self, state, question_id, is_correct, order=None):
+        state.record_answer(question_id, is_correct, order)
+        self.put(state)
+        return state
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisSessionStore:
+    """Estado compartido entre workers: quiz:session:<id> → JSON, con TTL."""
+
+    shared = True
+    PREFIX = 'quiz:session:'
+    MAX_RETRIES = 10
+
+    def __init__(self, url=REDIS_URL, ttl=SESSION_STATE_TTL):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("SESSION_STATE_BACKEND=redis requiere el paquete redis "
+                               "(pip install -r requirements.txt)")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, session_id):
+        try:
+            raw = self.client.get(f'{self.PREFIX}{session_id}')
+        except redis.RedisError as e:
+            print(f"[session_state] redis get failed: {e}")
+            return None
+        return SessionState.from_json(raw) if raw else None
+
+    def put(self, state):
+        try:
+            self.client.set(f'{self.PREFIX}{state.session_id}', state.to_json(), ex=self.ttl)
+        except redis.RedisError as e:
+            print(f"[session_state] redis set failed: {e}")
+
+    def record_answer(self, state, question_id, is_correct, order=None):
+        """
+        Suma la respuesta al estado guardado, no a la copia leída al inicio
+        del request: WATCH + MULTI y, si otro /answer de la sesión escribió
+        entre medio, se reintenta sobre el valor nuevo. Sin clave (expiró)
+        o si Redis falla no se escribe nada y la clave se borra: el próximo
+        load_state reconstruye desde la BD, donde la respuesta ya está.
+        """
+        key = f'{self.PREFIX}{state.session_id}'
+        try:
+            with self.client.pipeline() as pipe:
+                for _ in range(self.MAX_RETRIES):
+                    try:
+                        pipe.watch(key)
+                        raw = pipe.get(key)
+                        if raw is None:
+                            break
+                        current = SessionState.from_json(raw)
+                        current.record_answer(question_id, is_correct, order)
+                        pipe.multi()
+                        pipe.set(key, current.to_json(), ex=self.ttl)
+                        pipe.execute()
+                        return current
+                    except redis.WatchError:
+                        continue
+        except redis.RedisError as e:
+            print(f"[session_state] redis update failed: {e}")
+        state.record_answer(question_id, is_correct, order)
+        self.delete(state.session_id)
+        return state
+
+    def delete(self, session_id):
+        try:
+            self.client.delete(f'{self.PREFIX}{session_id}')
+        except redis.RedisError as e:
+            print(f"[session_state] redis delete failed: {e}")
+
+
+def _make_store():
+    if SESSION_STATE_BACKEND == 'redis':
+        return RedisSessionStore()
+    return MemorySessionStore()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _make_store()
+    return _store
+
+
+def _answer_count_in_db(session_id):
+    from models import db, QuizSession
+    return db.session.query(QuizSession.answer_count) \
+                     .filter(QuizSession.id == session_id).scalar()
+
+
+def _session_key(session_id):
+    """int(session_id), o None si no es un id válido."""
+    try:
+        return int(session_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_state(session_id, user_id):
+    """
+    Estado de la sesión si pertenece a user_id, o None si no existe / es
+    de otro usuario. En un miss (o estado viejo) se reconstruye desde la
+    BD y se guarda en el store.
+    """
+    from models import QuizSession
+
+    session_id = _session_key(session_id)
+    if session_id is None:
+        return None
+    store = get_store()
+    state = store.get(session_id)
+    if state is not None and state.user_id != str(user_id):
+        return None
+    if (state is not None and not store.shared and SESSION_STATE_VERIFY
+            and _answer_count_in_db(session_id) != state.next_order):
+        state = None
+
+    if state is None:
+        session = QuizSession.query.filter_by(id=session_id, user_id=user_id).first()
+        if session is None:
+            return None
+        state = SessionState.from_db(session)
+        store.put(state)
+    return state
+
+
+def start_state(session):
+    """Registra el estado vacío de una sesión recién creada (evita el miss)."""
+    from seen_questions import seen_bits
+    get_store().put(SessionState(session.id, session.user_id, week=session.week,
+                                 theme=session.theme, difficulty=session.difficulty,
+                                 seen=seen_bits(session.user_id)))
+
+
+def save_state(state):
+    get_store().put(state)
+
+
+def save_answer(state, question_id, is_correct, order=None):
+    """
+    Suma una respuesta ya guardada en la BD y la persiste en el store.
+    Retorna el estado actualizado (en Redis, el releído del store).
+    """
+    return get_store().record_answer(state, question_id, is_correct, order)
+
+
+def forget_state(session_id):
+    session_id = _session_key(session_id)
+    if session_id is not None:
+        get_store().delete(session_id)
@@ -105,11 +105,10 @@ def run_simulation(db, User, Question, QuizSession, Answer,
     # Limpiar simulación previa (NO toca datos reales)
     _clear_sim_data(db, User, QuizSession, Answer)
 
-    questions = Question.query.all()
-    if not questions:
+    q_ids = [qid for (qid,) in db.session.query(Question.question_id)]
+    if not q_ids:
         print("No questions found in DB. Run init_db.py first.")
         return 0, 0, 0
-    q_ids = [q.question_id for q in questions]
 
     rng = np.random.default_rng(seed)
 
@@ -144,6 +143,7 @@ def run_simulation(db, User, Question, QuizSession, Answer,
             started_at=started_at,
             completed_at=started_at + timedelta(minutes=session_len * 2),
             status='completed',
+            answer_count=session_len,
         )
         db.session.add(session_obj)
         db.session.flush()  # necesario: necesitamos session_obj.id para los Answer
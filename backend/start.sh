@@ -10,5 +10,7 @@ echo "Starting gunicorn..."
 exec gunicorn 'app:create_app()' \
   --bind 0.0.0.0:${PORT:-8080} \
   --workers 2 \
+  --worker-class gthread \
+  --threads ${GUNICORN_THREADS:-8} \
   --timeout 180 \
   --log-level info
@@ -0,0 +1,75 @@
+"""
+Perfil de tiempos de arranque del worker.
+
+create_app() mide cada fase (imports, extensiones, blueprints, banco,
+warmup) y las deja en app.extensions['startup_profile']; el reporte se
+consulta en GET /api/health/startup.
+
+Los módulos pesados (graph_engine → numpy/networkx, simulation) no se
+importan al arrancar en STARTUP_MODE='lazy': se cargan con lazy_import()
+la primera vez que un endpoint los necesita, y ese costo también queda
+registrado en el perfil del proceso.
+"""
+import importlib
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    def __init__(self, mode='lazy'):
+        self.mode = mode
+        self.pid = os.getpid()
+        self.phases = []
+        self.lazy_imports = []
+
+    @contextmanager
+    def phase(self, name):
+        """Mide el bloque `with` como una fase del arranque."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name, seconds):
+        self.phases.append({'name': name, 'ms': round(seconds * 1000, 2)})
+
+    def total_ms(self):
+        return round(sum(p['ms'] for p in self.phases), 2)
+
+    def summary(self):
+        parts = ", ".join(f"{p['name']}={p['ms']:.0f}ms" for p in self.phases)
+        return f"Startup ({self.mode}) {self.total_ms():.0f}ms: {parts}"
+
+    def report(self):
+        return {
+            'mode': self.mode,
+            'pid': self.pid,
+            'phases': list(self.phases),
+            'total_ms': self.total_ms(),
+            'lazy_imports': list(LAZY_IMPORTS),
+        }
+
+
+# Importaciones diferidas hechas por este proceso (compartidas por todas
+# las apps del proceso, igual que sys.modules).
+LAZY_IMPORTS = []
+
+
+def lazy_import(module_name):
+    """
+    importlib.import_module que registra cuánto tardó la primera carga
+    del módulo en este proceso.
+    """
+    mod = sys.modules.get(module_name)
+    if mod is not None:
+        return mod
+    t0 = time.perf_counter()
+    mod = importlib.import_module(module_name)
+    LAZY_IMPORTS.append({
+        'module': module_name,
+        'ms': round((time.perf_counter() - t0) * 1000, 2),
+    })
+    return mod
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, QuizSession, Answer, Question
+from flask_jwt_extended import jwt_required
+from authz import teacher_required
+from models import db, User, QuizSession, Answer, Question, QuestionTheme
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
 import json as json_module
@@ -8,20 +9,12 @@ import re
 
 teacher_bp = Blueprint('teacher', __name__, url_prefix='/api/teacher')
 
-def check_teacher_role():
-    """Check if current user is a teacher"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    return user and user.role == 'teacher'
-
 @teacher_bp.route('/dashboard/stats', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_dashboard_stats():
     """Get overall statistics for teacher dashboard"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         # Total students
         total_students = User.query.filter_by(role='student').count()
         
@@ -63,12 +56,10 @@ def get_dashboard_stats():
 
 @teacher_bp.route('/students', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_all_students():
     """Get list of all students with their statistics"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         students = User.query.filter_by(role='student').all()
         
         students_data = []
@@ -120,12 +111,10 @@ def get_all_students():
 
 @teacher_bp.route('/student/<int:student_id>', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_student_details(student_id):
     """Get detailed information about a specific student"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         student = User.query.filter_by(id=student_id, role='student').first()
         
         if not student:
@@ -196,12 +185,10 @@ def get_student_details(student_id):
 
 @teacher_bp.route('/dashboard/theme-stats', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_theme_statistics():
     """Get statistics by theme across all students"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         theme_stats = db.session.query(
             QuizSession.theme,
             func.count(Answer.id).label('total'),
@@ -232,12 +219,10 @@ def get_theme_statistics():
 
 @teacher_bp.route('/dashboard/difficulty-stats', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_difficulty_statistics():
     """Get statistics by difficulty across all students"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         difficulty_stats = db.session.query(
             QuizSession.difficulty,
             func.count(Answer.id).label('total'),
@@ -266,16 +251,15 @@ def get_difficulty_statistics():
 
 @teacher_bp.route('/questions', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_questions_list():
     """Get questions list with text preview, optionally filtered by theme"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-
         theme = request.args.get('theme')
-        query = Question.query
+        # El preview necesita content (diferido por defecto en el modelo)
+        query = Question.query.options(db.undefer(Question.content))
         if theme:
-            query = query.filter(Question.theme.contains(theme))
+            query = query.filter(QuestionTheme.any_of([theme]))
 
         questions = query.order_by(Question.difficulty, Question.question_id).all()
 
@@ -306,14 +290,32 @@ def get_questions_list():
         return jsonify({'error': str(e)}), 500
 
 
+@teacher_bp.route('/questions/refresh-html', methods=['POST'])
+@jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
+def refresh_questions_html():
+    """
+    Re-render the stored question HTML in bulk.
+    Only missing/stale rows are rendered unless ?force=1.
+    """
+    try:
+        from question_render import refresh_rendered
+        force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+        stats = refresh_rendered(db, force=force)
+
+        return jsonify({'status': 'ok', **stats}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @teacher_bp.route('/dashboard/recent-activity', methods=['GET'])
 @jwt_required()
+@teacher_required('Unauthorized - Teacher access only')
 def get_recent_activity():
     """Get recent quiz activity"""
     try:
-        if not check_teacher_role():
-            return jsonify({'error': 'Unauthorized - Teacher access only'}), 403
-        
         # Get recent sessions with user info
         recent_sessions = db.session.query(QuizSession, User).join(
             User, QuizSession.user_id == User.id
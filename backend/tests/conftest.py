@@ -15,6 +15,11 @@ os.environ.setdefault('FLASK_ENV', 'development')
 os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
 os.environ.setdefault('JWT_SECRET_KEY', 'test-jwt')
 os.environ.setdefault('SECRET_KEY', 'test-secret')
+# bcrypt barato y en el mismo thread
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+# Sin snapshots del grafo en disco salvo en los tests que los usan
+os.environ.setdefault('GRAPH_SNAPSHOT_DIR', '')
 
 
 @pytest.fixture()
@@ -26,6 +31,16 @@ def app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     app.config['TESTING'] = True
 
+    # Los caches por worker no deben sobrevivir entre BDs de test
+    from question_catalog import invalidate_catalog
+    from render_cache import render_cache
+    from session_state import get_store
+    from authz import clear_revalidation_cache
+    invalidate_catalog()
+    render_cache.clear()
+    get_store().clear()
+    clear_revalidation_cache()
+
     with app.app_context():
         db.create_all()
         yield app
@@ -37,3 +52,54 @@ def app():
 def db_session(app):
     from models import db
     return db.session
+
+
+@pytest.fixture()
+def add_questions():
+    """
+    add_questions(ids, correct='a') inserta preguntas simples (semana 1,
+    tema Conjuntos, content_hash 'h<id>') en la BD del app context actual.
+    correct puede ser un dict {question_id: respuesta}.
+    """
+    import json
+    from models import db, Question
+
+    def add(question_ids, correct='a'):
+        for qid in question_ids:
+            db.session.add(Question(
+                question_id=qid, theme='Conjuntos', difficulty=1, week=1,
+                correct_answer=correct[qid] if isinstance(correct, dict) else correct,
+                content_hash=f'h{qid}',
+                content=json.dumps({'body_latex': f'Pregunta {qid}', 'opts': {}}),
+            ))
+        db.session.commit()
+    return add
+
+
+@pytest.fixture()
+def make_user():
+    """make_user(role='student', student_number='123') → (user, headers con su JWT)."""
+    from flask_jwt_extended import create_access_token
+    from models import db, User
+    from authz import role_claims
+
+    def make(role='student', student_number='123'):
+        user = User(student_number=student_number, password_hash='x', role=role)
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id), additional_claims=role_claims(user))
+        return user, {'Authorization': f'Bearer {token}'}
+    return make
+
+
+@pytest.fixture()
+def student_client(app, make_user):
+    """(test client, headers de un estudiante, su user_id)."""
+    user, headers = make_user()
+    return app.test_client(), headers, user.id
+
+
+@pytest.fixture()
+def teacher_auth(app, make_user):
+    """Headers con JWT de un teacher (rutas de métricas y de profesor)."""
+    return make_user(role='teacher', student_number='teacher')[1]
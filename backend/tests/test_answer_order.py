@@ -0,0 +1,69 @@
+"""
+order_in_session con el contador atómico de QuizSession: submits
+concurrentes a la misma sesión nunca comparten orden.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+N_ANSWERS = 40
+
+
+@pytest.fixture()
+def file_app(tmp_path, monkeypatch):
+    # SQLite en archivo: varias conexiones reales compitiendo por el lock
+    import config
+    from app import create_app
+    from models import db
+    from question_catalog import invalidate_catalog
+    from session_state import get_store
+
+    monkeypatch.setattr(config.DevelopmentConfig, 'SQLALCHEMY_DATABASE_URI',
+                        f"sqlite:///{tmp_path / 'quiz.db'}")
+    app = create_app('development')
+    app.config['TESTING'] = True
+    invalidate_catalog()
+    get_store().clear()
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_parallel_answers_get_distinct_orders(file_app, add_questions, make_user):
+    from sqlalchemy.exc import IntegrityError
+    from models import db, Answer, QuizSession
+    from question_catalog import get_catalog
+
+    add_questions(range(1, 6))
+    user, auth = make_user()
+    session = QuizSession(user_id=user.id, week=1, status='in_progress')
+    db.session.add(session)
+    db.session.commit()
+    sid = session.id
+    get_catalog()
+
+    def submit(i):
+        with file_app.test_client() as client:
+            return client.post('/api/quiz/answer', headers=auth, json={
+                'session_id': sid, 'question_id': i % 5 + 1, 'user_answer': 'a',
+            }).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(submit, range(N_ANSWERS)))
+    assert statuses == [201] * N_ANSWERS
+
+    db.session.expire_all()
+    orders = sorted(o for (o,) in db.session.query(Answer.order_in_session)
+                                            .filter_by(session_id=sid))
+    assert orders == list(range(N_ANSWERS))
+    assert db.session.get(QuizSession, sid).answer_count == N_ANSWERS
+
+    # La BD también lo garantiza
+    db.session.add(Answer(session_id=sid, question_id=1, user_answer='a',
+                          is_correct=True, order_in_session=0))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
@@ -0,0 +1,102 @@
+"""
+Tests de authz: rol como claim del JWT en las rutas de teacher/graph.
+"""
+import pytest
+
+
+@pytest.fixture()
+def users(app):
+    from models import db, User
+
+    teacher = User(student_number='t1', password_hash='x', role='teacher')
+    student = User(student_number='s1', password_hash='x', role='student')
+    db.session.add_all([teacher, student])
+    db.session.commit()
+    return teacher, student
+
+
+def _auth(user, claims=True):
+    from flask_jwt_extended import create_access_token
+    from authz import role_claims
+
+    token = create_access_token(identity=str(user.id),
+                                additional_claims=role_claims(user) if claims else None)
+    return {'Authorization': f'Bearer {token}'}
+
+
+def _user_queries(db, fn):
+    from sqlalchemy import event
+
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, [s for s in statements if 'FROM users' in s]
+
+
+def test_role_claim_skips_user_lookup(app, users):
+    from models import db
+
+    teacher, student = users
+    headers = _auth(teacher)
+    client = app.test_client()
+    resp, queries = _user_queries(db, lambda: client.get('/api/graph/status', headers=headers))
+    assert resp.status_code == 200 and queries == []
+
+    resp = client.get('/api/teacher/dashboard/stats', headers=_auth(student))
+    assert resp.status_code == 403
+    assert resp.get_json()['error'] == 'Unauthorized - Teacher access only'
+
+
+def test_login_token_carries_role(app):
+    from flask_jwt_extended import decode_token
+
+    client = app.test_client()
+    resp = client.post('/api/auth/register', json={'student_number': '7', 'password': 'pw'})
+    assert decode_token(resp.get_json()['access_token'])['role'] == 'student'
+
+
+def test_legacy_token_falls_back_to_db(app, users):
+    from models import db
+
+    teacher, student = users
+    headers = _auth(teacher, claims=False)
+    client = app.test_client()
+    resp, queries = _user_queries(db, lambda: client.get('/api/graph/status', headers=headers))
+    assert resp.status_code == 200 and len(queries) == 1
+    assert client.get('/api/graph/status', headers=_auth(student, claims=False)) \
+                 .status_code == 403
+
+
+def test_revalidation_revokes_demoted_teacher(app, users, monkeypatch):
+    import authz
+    from models import db
+
+    teacher, _ = users
+    headers = _auth(teacher)
+    client = app.test_client()
+    monkeypatch.setattr(authz, 'AUTHZ_REVALIDATE_TTL', 60)
+
+    assert client.get('/api/graph/status', headers=headers).status_code == 200
+    teacher.role = 'student'
+    db.session.commit()
+    # Dentro del TTL sigue valiendo el rol confirmado
+    assert client.get('/api/graph/status', headers=headers).status_code == 200
+
+    authz.clear_revalidation_cache()
+    assert client.get('/api/graph/status', headers=headers).status_code == 403
+
+
+def test_worker_metrics_are_teacher_only(app, users):
+    teacher, student = users
+    client = app.test_client()
+    for path in ('/api/health/startup', '/api/health/render-cache',
+                 '/api/health/password-hashing'):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers=_auth(student)).status_code == 403
+        assert client.get(path, headers=_auth(teacher)).status_code == 200
+    assert client.get('/api/health').status_code == 200
@@ -0,0 +1,124 @@
+"""
+Tests de la sincronización incremental banco → tabla questions.
+"""
+import copy
+import json
+
+
+def _bank():
+    """Banco mínimo con la misma forma que preguntas_loader_simple.Preguntas."""
+    return {
+        qid: {
+            'tema': 'Conjuntos', 'dif': 1, 'res': ['a'], 'week': 1,
+            'body_latex': f'Pregunta {qid}', 'opts': {'a': 'x', 'b': 'y'},
+        }
+        for qid in (1, 2, 3)
+    }
+
+
+def test_first_sync_inserts_everything(app):
+    from models import db, Question, AppState
+    from bank_sync import sync_questions, BANK_VERSION_KEY
+
+    stats = sync_questions(db, _bank(), bank_version='v1')
+
+    assert stats == {'inserted': 3, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    assert Question.query.count() == 3
+    assert all(q.content_hash for q in Question.query.all())
+    assert AppState.get_value(BANK_VERSION_KEY) == 'v1'
+
+
+def test_resync_only_touches_changed_rows(app):
+    from models import db, Question
+    from bank_sync import sync_questions
+
+    bank = _bank()
+    sync_questions(db, bank)
+    ids_before = {q.question_id: q.id for q in Question.query.all()}
+
+    edited = copy.deepcopy(bank)
+    edited[2]['body_latex'] = 'Pregunta 2 corregida'
+    edited[2]['dif'] = 3
+    del edited[3]
+    edited[4] = copy.deepcopy(bank[1])
+
+    stats = sync_questions(db, edited)
+    assert stats == {'inserted': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1}
+
+    q2 = Question.query.filter_by(question_id=2).first()
+    assert q2.id == ids_before[2]
+    assert q2.difficulty == 3
+    assert json.loads(q2.content)['body_latex'] == 'Pregunta 2 corregida'
+    assert Question.query.filter_by(question_id=3).first() is None
+
+    # Un segundo sync sin cambios no escribe nada
+    assert sync_questions(db, edited)['unchanged'] == 3
+
+
+def test_sync_keeps_answers_of_removed_questions(app):
+    from models import db, User, QuizSession, Answer
+    from bank_sync import sync_questions
+
+    bank = _bank()
+    sync_questions(db, bank)
+
+    user = User(student_number='s1', role='student', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    session = QuizSession(user_id=user.id, status='completed')
+    db.session.add(session)
+    db.session.flush()
+    db.session.add(Answer(session_id=session.id, question_id=3,
+                          user_answer='a', is_correct=True, order_in_session=0))
+    db.session.commit()
+
+    del bank[3]
+    sync_questions(db, bank)
+    assert Answer.query.filter_by(question_id=3).count() == 1
+
+
+def test_empty_bank_does_not_wipe_questions(app):
+    from models import db, Question
+    from bank_sync import sync_questions
+
+    sync_questions(db, _bank())
+    stats = sync_questions(db, {})
+    assert stats['deleted'] == 0
+    assert Question.query.count() == 3
+
+
+def test_sync_maintains_question_themes(app):
+    from models import db, Question, QuestionTheme
+    from bank_sync import sync_questions
+
+    bank = _bank()
+    bank[2]['tema'] = 'Conjuntos,Lógica'
+    sync_questions(db, bank)
+
+    def themes():
+        return sorted((r.question_id, r.theme) for r in QuestionTheme.query.all())
+
+    assert themes() == [(1, 'Conjuntos'), (2, 'Conjuntos'), (2, 'Lógica'),
+                        (3, 'Conjuntos')]
+
+    bank[2]['tema'] = 'Lógica'
+    del bank[3]
+    sync_questions(db, bank)
+    assert themes() == [(1, 'Conjuntos'), (2, 'Lógica')]
+
+    ids = [q.question_id for q in
+           Question.query.filter(QuestionTheme.any_of(['Lógica'])).all()]
+    assert ids == [2]
+
+
+def test_sync_backfills_themes_for_unchanged_rows(app):
+    from models import db, QuestionTheme
+    from bank_sync import sync_questions
+
+    sync_questions(db, _bank())
+    QuestionTheme.query.delete()
+    db.session.commit()
+
+    stats = sync_questions(db, _bank())
+    assert stats['unchanged'] == 3
+    assert QuestionTheme.query.count() == 3
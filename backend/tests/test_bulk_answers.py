@@ -0,0 +1,79 @@
+"""
+Tests de /api/quiz/answers/bulk: calificación en el servidor, un INSERT
+multi-fila por lote y una sola ingesta al grafo.
+"""
+import pytest
+
+
+@pytest.fixture()
+def client_and_auth(student_client, add_questions):
+    add_questions((1, 2, 3), correct={1: 'a', 2: 'b', 3: 'c'})
+    client, auth, _ = student_client
+    return client, auth
+
+
+def test_bulk_answers_are_graded_and_inserted_at_once(client_and_auth, monkeypatch):
+    import graph_pipeline
+    from sqlalchemy import event
+    from models import db, Answer, QuizSession
+
+    client, auth = client_and_auth
+    ingested = []
+    monkeypatch.setattr(graph_pipeline, 'ingest_session',
+                        lambda db, sid: ingested.append(sid))
+
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        resp = client.post('/api/quiz/answers/bulk', headers=auth, json={
+            'week': 1,
+            'answers': [
+                {'question_id': 2, 'user_answer': 'B ', 'isCorrect': False},
+                {'question_id': 1, 'user_answer': 'c'},
+                {'question_id': 3, 'user_answer': 'c'},
+            ],
+        })
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    body = resp.get_json()
+    assert resp.status_code == 201
+    assert (body['total'], body['correct'], body['completed']) == (3, 2, True)
+    assert [r['is_correct'] for r in body['results']] == [True, False, True]
+    assert sum(s.startswith('INSERT INTO answers') for s in statements) == 1
+    assert ingested == [body['session_id']]
+
+    rows = (db.session.query(Answer.question_id, Answer.order_in_session, Answer.is_correct)
+            .filter_by(session_id=body['session_id']).order_by(Answer.order_in_session).all())
+    assert rows == [(2, 0, True), (1, 1, False), (3, 2, True)]
+    assert db.session.get(QuizSession, body['session_id']).answer_count == 3
+
+
+def test_bulk_answers_append_to_session_and_reject_unknown(client_and_auth):
+    from models import db, Answer
+
+    client, auth = client_and_auth
+    sid = client.post('/api/quiz/start', headers=auth, json={'week': 1}) \
+                .get_json()['session']['id']
+    client.post('/api/quiz/answer', headers=auth,
+                json={'session_id': sid, 'question_id': 1, 'user_answer': 'a'})
+
+    bad = client.post('/api/quiz/answers/bulk', headers=auth, json={
+        'session_id': sid,
+        'answers': [{'question_id': 2, 'user_answer': 'b'},
+                    {'question_id': 99, 'user_answer': 'a'}],
+    })
+    assert bad.status_code == 400 and bad.get_json()['unknown_question_ids'] == [99]
+    assert Answer.query.filter_by(session_id=sid).count() == 1
+
+    ok = client.post('/api/quiz/answers/bulk', headers=auth, json={
+        'session_id': sid, 'answers': [{'question_id': 2, 'user_answer': 'b'}],
+    }).get_json()
+    assert ok['completed'] is False
+    assert [r['order_in_session'] for r in ok['results']] == [1]
+
+    # /next ve la respuesta del lote (el estado cacheado se descartó)
+    nxt = client.post('/api/quiz/next', headers=auth, json={'session_id': sid}).get_json()
+    assert nxt['question_number'] == 3 and nxt['question']['question_id'] == 3
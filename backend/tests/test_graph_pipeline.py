@@ -4,6 +4,7 @@ con valores calculados a mano (ver fixtures/toy_dataset.py).
 """
 import json
 import math
+import random
 from datetime import datetime, timedelta
 
 import pytest
@@ -212,3 +213,131 @@ def test_health_reports_no_negative_weights(app):
     assert health['built'] is True
     assert health['weight_stats']['any_negative'] is False
     assert health['weight_stats']['any_non_finite'] is False
+
+
+@pytest.mark.parametrize('slack', [0, 4])
+def test_ingest_delta_patches_loaded_graph_like_a_rebuild(app, monkeypatch, slack):
+    """
+    Con el grafo cargado, ingest_session lo parchea en el lugar (sin
+    invalidarlo) y el resultado es el mismo que un build() desde cero.
+    slack=0 fuerza a reacomodar la CSR en cada arista nueva.
+    """
+    import graph_engine
+    from models import db, Question
+    from graph_pipeline import ingest_session
+
+    monkeypatch.setattr(graph_engine, 'CSR_MIN_SLACK', slack)
+    monkeypatch.setattr(graph_engine, 'quiz_graph', graph_engine.QuizGraph())
+    session_ids = _seed_toy_data(db)
+    for sid in session_ids[:2]:
+        ingest_session(db, sid)
+    live = graph_engine.quiz_graph
+    assert live.build(db, Question)
+    version = live.version
+
+    for sid in session_ids[2:]:
+        ingest_session(db, sid)
+    assert live.G is not None and live.version > version
+
+    fresh = graph_engine.QuizGraph()
+    fresh.build(db, Question)
+    assert live.get_status()['edges'] == fresh.get_status()['edges']
+
+    def rows(g):
+        out = {}
+        for qid, i in g.node_index.items():
+            lo, hi = g.indptr[i], g.row_end[i]
+            out[qid] = sorted(zip(g.targets[lo:hi].tolist(), g.score[lo:hi].tolist(),
+                                  g.n_transitions[lo:hi].tolist(), g.weight[lo:hi].tolist()))
+        return out
+    assert rows(live) == rows(fresh)
+    assert sorted(live.G.edges(data=True)) == sorted(fresh.G.edges(data=True))
+
+
+def test_snapshot_is_shared_instead_of_rebuilt(app, monkeypatch, tmp_path):
+    """
+    El primer build() deja un snapshot; otro QuizGraph lo mapea sin leer
+    QuestionTransition completa, selecciona igual y sus deltas no tocan el
+    archivo.
+    """
+    import graph_engine
+    from sqlalchemy import event
+    from models import db, Question
+    from graph_pipeline import ingest_session
+
+    monkeypatch.setattr(graph_engine, 'GRAPH_SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(graph_engine, 'EPSILON', 0.0)
+    session_ids = _seed_toy_data(db)
+    for sid in session_ids[:-1]:
+        ingest_session(db, sid)
+
+    built = graph_engine.QuizGraph()
+    assert built.build(db, Question) and built.snapshot
+    on_disk = open(built.snapshot, 'rb').read()
+
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        loaded = graph_engine.QuizGraph()
+        assert loaded.load(db, Question)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert loaded.snapshot == built.snapshot
+    assert not any('question_transitions.question_from_id' in s for s in statements)
+
+    for qid in loaded.node_index:
+        picks = []
+        for g in (loaded, built):
+            random.seed(qid)        # mismo fallback aleatorio en ambos
+            picks.append(g.get_next_question(qid, [qid], available_qids=range(1, 6)))
+        assert picks[0] == picks[1]
+    assert sorted(loaded.G.edges(data=True)) == sorted(built.G.edges(data=True))
+    assert dict(loaded.G.nodes(data=True)) == dict(built.G.nodes(data=True))
+
+    # Un delta en el worker que mapeó el snapshot es privado (copy-on-write)
+    monkeypatch.setattr(graph_engine, 'quiz_graph', loaded)
+    ingest_session(db, session_ids[-1])
+    assert loaded.built and loaded.version > 1
+    assert open(built.snapshot, 'rb').read() == on_disk
+
+    # Huella nueva: un worker nuevo toma el snapshot viejo y le aplica los
+    # deltas publicados desde entonces (graph_sync.catch_up)
+    fresh = graph_engine.QuizGraph()
+    assert fresh.attach_snapshot(db) and fresh.db_version == loaded.db_version
+    assert sorted(fresh.G.edges(data=True)) == sorted(loaded.G.edges(data=True))
+
+
+def test_other_workers_converge_through_graph_version(app, monkeypatch):
+    """
+    Un 'worker' que no atendió la ingesta se pone al día con los deltas de
+    graph_deltas, y descarta su grafo tras un rebuild_full.
+    """
+    import graph_engine
+    import graph_sync
+    from models import db, Question
+    from graph_pipeline import ingest_session, rebuild_full
+
+    monkeypatch.setattr(graph_sync, 'GRAPH_SYNC_TTL', 0)
+    monkeypatch.setattr(graph_engine, 'quiz_graph', graph_engine.QuizGraph())
+    session_ids = _seed_toy_data(db)
+    ingest_session(db, session_ids[0])
+
+    other = graph_engine.QuizGraph()
+    assert other.build(db, Question) and other.db_version == 1
+    for sid in session_ids[1:]:
+        ingest_session(db, sid)
+    version = graph_sync.current_version(db)
+    assert version > 2
+
+    assert graph_sync.sync(other, db)
+    assert other.built and other.db_version == version
+    fresh = graph_engine.QuizGraph()
+    fresh.build(db, Question)
+    assert sorted(other.G.edges(data=True)) == sorted(fresh.G.edges(data=True))
+    assert not graph_sync.sync(other, db)        # ya al día
+
+    rebuild_full(db)
+    graph_sync.sync(other, db)
+    assert not other.built
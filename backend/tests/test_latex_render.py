@@ -0,0 +1,81 @@
+"""
+Golden test del render LaTeX → HTML (simple_latex_to_html).
+
+tests/fixtures/question_html_golden.json guarda, por question_id,
+[question_hash, sha256(get_question_html)] generados con la cascada de
+re.sub anterior. Las preguntas cuyo bloque cambió en Preguntas.tex desde
+entonces (question_hash distinto) no se comparan.
+"""
+import hashlib
+import json
+import os
+import time
+
+import pytest
+
+from preguntas_loader_simple import (
+    get_question_html, load_preguntas_from_latex, question_hash, simple_latex_to_html,
+)
+
+GOLDEN = os.path.join(os.path.dirname(__file__), 'fixtures', 'question_html_golden.json')
+
+
+def test_bank_html_matches_golden():
+    with open(GOLDEN, encoding='utf-8') as f:
+        golden = json.load(f)
+    preguntas = load_preguntas_from_latex('Preguntas.tex')
+
+    compared, mismatched = 0, []
+    for qid, data in preguntas.items():
+        expected = golden.get(str(qid))
+        if expected is None or expected[0] != question_hash(data):
+            continue
+        compared += 1
+        html = get_question_html(data)
+        if hashlib.sha256(html.encode('utf-8')).hexdigest() != expected[1]:
+            mismatched.append(qid)
+
+    assert compared > 0
+    assert mismatched == []
+
+
+@pytest.mark.parametrize('latex, html', [
+    (r'Sea $f:\mathbb{N}\to\mathbb{N}$ \\ y \textbf{negrita} \medskip fin',
+     r'Sea $f:N $ <br> y <strong>negrita</strong> <br> fin'),
+    (r'\[ a \\ b \] y \( x \in A \) \\ \textit{c \textbf{d} e}',
+     r'$$ a \\ b $$ y $ x  A $ <br> <em>c <strong>d</strong> e</em>'),
+    (r'\textbf{a \textbf{b} c} \emph{\foo{x}} \item[a]{b} \cmd  sigue',
+     r'<strong>a b</strong> c <em>x</em> b  sigue'),
+    (r'$a \\b$ \\\textbf{x} $$\frac{1}{2}$$ \bigskipx',
+     r'$a \ $ <br><strong>x</strong> $$1{2}$$ <br><br>x'),
+    (r'precio \$5 y } suelta { \{conjunto\}', r'precio \$5 y } suelta { \{conjunto\}'),
+    # $$..$$ dentro de $..$: la cascada anterior dejaba '__MATH_0__' en el HTML
+    (r'$x $$y$$ z$ \\ w', r'$x $$y$$ z$ <br> w'),
+])
+def test_renders_cascade_cases(latex, html):
+    assert simple_latex_to_html(latex) == html
+
+
+# Holgado para CI cargado: la restauración con un str.replace por bloque
+# tardaba ~9 s con 20000 bloques; la de un solo re.sub, ~0.1 s
+STRESS_SECONDS = 3.0
+
+
+def _timed(latex):
+    t0 = time.perf_counter()
+    html = simple_latex_to_html(latex)
+    return html, time.perf_counter() - t0
+
+
+def test_many_math_blocks_render_in_one_pass():
+    n = 20000
+    html, seconds = _timed(" ".join(r"$x_{%d} \in A$ \\" % i for i in range(n)))
+    assert html == " ".join(r"$x_{%d}  A$ <br>" % i for i in range(n))
+    assert seconds < STRESS_SECONDS
+
+
+def test_many_commands_render_in_one_pass():
+    n = 20000
+    html, seconds = _timed(" ".join([r"\textbf{a} \frac{1}{2}"] * n))
+    assert html == " ".join(["<strong>a</strong> 1{2}"] * n)
+    assert seconds < STRESS_SECONDS
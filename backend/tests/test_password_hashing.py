@@ -0,0 +1,82 @@
+"""
+Tests del pool de bcrypt (password_hashing) y su uso en /api/auth.
+"""
+import time
+
+import pytest
+
+
+def _register(client, password='secret'):
+    return client.post('/api/auth/register', json={'student_number': '42', 'password': password})
+
+
+def test_login_rehashes_when_rounds_change(app, monkeypatch):
+    import password_hashing
+    from models import User
+
+    client = app.test_client()
+    assert _register(client).status_code == 201
+    old_hash = User.query.filter_by(student_number='42').one().password_hash
+    assert old_hash.startswith('$2b$04$')
+
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 5)
+    assert client.post('/api/auth/login', json={'student_number': '42', 'password': 'nope'}) \
+                 .status_code == 401
+    assert client.post('/api/auth/login', json={'student_number': '42', 'password': 'secret'}) \
+                 .status_code == 200
+
+    new_hash = User.query.filter_by(student_number='42').one().password_hash
+    assert new_hash.startswith('$2b$05$') and new_hash != old_hash
+    assert client.post('/api/auth/login', json={'student_number': '42', 'password': 'secret'}) \
+                 .status_code == 200
+
+
+def test_full_queue_answers_503(app, teacher_auth, monkeypatch):
+    from password_hashing import hasher
+
+    client = app.test_client()
+    monkeypatch.setattr(hasher, 'queue_max', 0)
+    resp = _register(client)
+    assert resp.status_code == 503 and resp.headers['Retry-After'] == '1'
+    assert hasher.stats()['rejected'] >= 1
+    assert client.get('/api/health/password-hashing', headers=teacher_auth).get_json()['queue_max'] == 0
+
+
+def test_process_pool_hashes_and_verifies():
+    from password_hashing import PasswordHasher, _hash, _verify, needs_rehash
+
+    pool = PasswordHasher(workers=1, queue_max=4, timeout=30)
+    try:
+        hashed = pool.run(_hash, 'clave', 4)
+        assert pool.run(_verify, 'clave', hashed) is True
+        assert pool.run(_verify, 'otra', hashed) is False
+        stats = pool.stats()
+        assert stats['completed'] == 3 and stats['queue_depth'] == 0
+    finally:
+        pool.shutdown()
+    assert not needs_rehash(hashed, rounds=4) and needs_rehash(hashed, rounds=12)
+    assert needs_rehash('not-a-bcrypt-hash')
+
+
+def test_timed_out_hash_stays_queued_until_it_finishes():
+    from password_hashing import PasswordHasher, PasswordHashBusy, _hash
+
+    pool = PasswordHasher(workers=1, queue_max=1, timeout=0.01)
+    try:
+        with pytest.raises(PasswordHashBusy, match='timed out'):
+            pool.run(_hash, 'clave', 12)
+        # El proceso sigue hasheando: ocupa la cola y no cuenta como completado
+        stats = pool.stats()
+        assert stats['queue_depth'] == 1 and stats['timed_out'] == 1
+        assert stats['completed'] == 0
+        with pytest.raises(PasswordHashBusy, match='full'):
+            pool.run(_hash, 'clave', 4)
+
+        deadline = time.monotonic() + 30
+        while pool.stats()['queue_depth'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        stats = pool.stats()
+        assert stats['queue_depth'] == 0 and stats['completed'] == 0
+        assert stats['rejected'] == 1
+    finally:
+        pool.shutdown()
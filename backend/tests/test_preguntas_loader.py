@@ -0,0 +1,74 @@
+"""
+Tests del render por lotes con Pandoc (preguntas_loader.latex_to_html_batch).
+"""
+import shutil
+
+import pytest
+
+import preguntas_loader
+from preguntas_loader import (
+    _SEP_TOKEN, _split_batch_output, latex_to_html, latex_to_html_batch,
+)
+
+
+def test_split_batch_output_in_order():
+    html = (f"<p>uno</p>\n<p>{_SEP_TOKEN}0</p>\n"
+            f"<p><strong>dos</strong></p>\n<p>{_SEP_TOKEN}1</p>\n")
+    assert _split_batch_output(html, 2) == [
+        "<p>uno</p>\n", "<p><strong>dos</strong></p>\n",
+    ]
+
+
+def test_split_batch_output_rejects_swallowed_separator():
+    # El separador 1 quedó dentro de otro bloque: no se puede partir
+    html = f"<p>uno</p>\n<p>{_SEP_TOKEN}0</p>\n<pre>dos {_SEP_TOKEN}1</pre>\n"
+    assert _split_batch_output(html, 2) is None
+
+
+def test_split_batch_output_rejects_footnotes():
+    html = (f"<p>a</p>\n<p>{_SEP_TOKEN}0</p>\n"
+            f'<section class="footnotes"><ol><li>n</li></ol></section>\n')
+    assert _split_batch_output(html, 1) is None
+
+
+def test_batch_falls_back_per_fragment_when_chunk_breaks(monkeypatch):
+    calls = []
+
+    def fake_run(src):
+        calls.append(src)
+        raise RuntimeError("pandoc failed")
+
+    monkeypatch.setattr(preguntas_loader, '_run_pandoc', fake_run)
+    monkeypatch.setattr(preguntas_loader, 'latex_to_html', lambda s: f"<p>{s}</p>\n")
+
+    out = latex_to_html_batch(['a', 'b', 'c'], batch_size=3, workers=1)
+    assert out == ["<p>a</p>\n", "<p>b</p>\n", "<p>c</p>\n"]
+    assert len(calls) == 2  # lote de 3 → mitades [a] (suelto) y [b, c]
+
+
+def test_fragment_renders_the_same_alone_and_in_a_batch(monkeypatch):
+    # Pandoc falso: un <p> por párrafo, con el salto extra que deja al escribir a archivo
+    def fake_pandoc(src):
+        paragraphs = [p.strip() for p in src.split("\n\n") if p.strip()]
+        return "".join(f"<p>{p}</p>\n" for p in paragraphs) + "\n"
+
+    monkeypatch.setattr(preguntas_loader, '_run_pandoc', fake_pandoc)
+    monkeypatch.setattr(preguntas_loader, 'latex_to_html', lambda s: "\n" + fake_pandoc(s))
+
+    fragments = ['uno', 'dos', 'tres']
+    in_batch = latex_to_html_batch(fragments, batch_size=3, workers=1)
+    alone = [latex_to_html_batch([f], batch_size=1, workers=1)[0] for f in fragments]
+    assert in_batch == alone == ["<p>uno</p>\n", "<p>dos</p>\n", "<p>tres</p>\n"]
+
+
+@pytest.mark.skipif(shutil.which('pandoc') is None, reason='pandoc not installed')
+def test_batch_matches_single_fragment_rendering():
+    fragments = [
+        r"\textbf{Suponga que:} \(p \land q\)",
+        r"Sea \[ A \cup B \] un conjunto.",
+        r"\item sin enumerate",
+        "",
+        r"Texto con \emph{énfasis}.",
+    ]
+    assert latex_to_html_batch(fragments, batch_size=2) == \
+        [latex_to_html(f).strip() + "\n" for f in fragments]
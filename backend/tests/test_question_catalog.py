@@ -0,0 +1,183 @@
+"""
+Tests del catálogo en memoria (bitsets por tema / dificultad / semana).
+"""
+import json
+
+
+QUESTIONS = [
+    # (question_id, theme, difficulty, week)
+    (1, 'Conjuntos', 1, 1),
+    (2, 'Conjuntos,Lógica', 2, 1),
+    (3, 'Lógica', 1, 2),
+    (4, 'Funciones', 3, 3),
+    (5, 'Conjuntos', 2, 3),
+]
+
+
+def _seed(db):
+    from models import Question
+    for qid, theme, dif, week in QUESTIONS:
+        db.session.add(Question(
+            question_id=qid, theme=theme, difficulty=dif,
+            correct_answer='a', week=week,
+            content=json.dumps({'body_latex': f'Pregunta {qid}', 'opts': {}}),
+        ))
+    db.session.commit()
+
+
+def test_select_filters_match_expected_ids(app):
+    from models import db
+    from question_catalog import get_catalog
+
+    _seed(db)
+    cat = get_catalog()
+
+    assert cat.ids(cat.select()) == [1, 2, 3, 4, 5]
+    assert cat.ids(cat.select(week=1)) == [1, 2]
+    assert cat.ids(cat.select(week=2)) == [1, 2, 3]
+    assert cat.ids(cat.select(week=0)) == []
+    assert cat.ids(cat.select(themes=['Lógica'])) == [2, 3]
+    assert cat.ids(cat.select(themes=['Lógica', 'Funciones'])) == [2, 3, 4]
+    assert cat.ids(cat.select(difficulty=2, themes=['Conjuntos'])) == [2, 5]
+    assert cat.ids(cat.select(week=3, exclude_ids=[1, 5])) == [2, 3, 4]
+    assert cat.count(cat.select(themes=['Conjuntos'])) == 3
+
+
+def test_theme_filter_is_exact_not_substring(app):
+    from models import db
+    from question_catalog import get_catalog
+
+    _seed(db)
+    cat = get_catalog()
+    assert cat.count(cat.select(themes=['Conjunto'])) == 0
+
+
+def test_themes_and_difficulties_in(app):
+    from models import db
+    from question_catalog import get_catalog
+
+    _seed(db)
+    cat = get_catalog()
+    assert cat.themes_in(cat.select(week=1)) == ['Conjuntos', 'Lógica']
+    assert cat.difficulties_in(cat.select(themes=['Lógica'])) == [1, 2]
+    assert cat.get(4)['difficulty'] == 3
+
+
+def test_catalog_rebuilds_after_bank_sync(app):
+    from models import db
+    from question_catalog import get_catalog
+    from bank_sync import sync_questions
+
+    _seed(db)
+    assert len(get_catalog()) == 5
+
+    sync_questions(db, {
+        10: {'tema': 'Sumatorias', 'dif': 1, 'res': ['b'], 'week': 4,
+             'body_latex': 'x', 'opts': {}},
+    }, bank_version='v2')
+
+    cat = get_catalog()
+    assert cat.version == 'v2'
+    assert cat.ids(cat.select()) == [10]
+    assert cat.get(10)['correct_answer'] == 'b'
+
+
+def test_catalog_endpoints(app):
+    from models import db
+
+    _seed(db)
+    client = app.test_client()
+
+    r = client.post('/api/quiz/count', json={'week': 1, 'themes': ['Conjuntos']})
+    assert r.get_json() == {'count': 2}
+
+    r = client.get('/api/quiz/themes', query_string={'week': 2})
+    assert r.get_json() == {'themes': ['Conjuntos', 'Lógica']}
+
+    r = client.get('/api/quiz/difficulties',
+                   query_string={'week': 3, 'themes': 'Funciones,Lógica'})
+    assert r.get_json() == {'difficulties': [1, 2, 3]}
+
+
+def test_question_rejects_bad_exclude_ids_and_skips_negative_ids(app, make_user):
+    from models import db, Question
+    from question_catalog import get_catalog
+
+    _seed(db)
+    db.session.add(Question(question_id=-1, theme='Conjuntos', difficulty=1,
+                            correct_answer='a', week=1, content='{}'))
+    db.session.commit()
+    assert -1 not in get_catalog()
+    assert len(get_catalog()) == len(QUESTIONS)
+
+    _, auth = make_user()
+    client = app.test_client()
+    for bad in (['x'], [None], 'abc', {'a': 1}):
+        r = client.post('/api/quiz/question', headers=auth,
+                        json={'week': 3, 'exclude_ids': bad})
+        assert r.status_code == 400
+
+    r = client.post('/api/quiz/question', headers=auth,
+                    json={'week': 3, 'exclude_ids': [-1, '2', 3, 4, 5]})
+    assert r.status_code == 200
+    assert r.get_json()['question']['id'] == 1
+
+
+def test_question_content_is_deferred(app):
+    from sqlalchemy import inspect
+    from models import db, Question
+
+    _seed(db)
+    db.session.expunge_all()
+
+    q = Question.query.filter_by(question_id=1).first()
+    assert 'content' in inspect(q).unloaded
+
+    q = (Question.query.options(db.undefer(Question.content))
+         .filter_by(question_id=2).first())
+    assert 'content' not in inspect(q).unloaded
+    assert json.loads(q.content)['body_latex'] == 'Pregunta 2'
+
+
+def test_catalog_endpoints_answer_304_on_matching_etag(app):
+    from models import db, AppState
+    from bank_sync import BANK_VERSION_KEY
+    from question_catalog import invalidate_catalog
+
+    _seed(db)
+    client = app.test_client()
+
+    first = client.get('/api/quiz/difficulties?week=3&themes=Lógica,Conjuntos')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag.startswith('"') and 'max-age' in first.headers['Cache-Control']
+
+    # Mismos filtros en otro orden → mismo ETag → 304 sin cuerpo ni queries
+    from sqlalchemy import event
+    statements = []
+    def count_sql(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', count_sql)
+    try:
+        again = client.get('/api/quiz/difficulties?week=3&themes=Conjuntos,Lógica',
+                           headers={'If-None-Match': etag})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count_sql)
+    assert again.status_code == 304 and again.data == b''
+    assert statements == []
+    assert again.headers['ETag'] == etag
+
+    count = client.get('/api/quiz/count?week=3&themes=Conjuntos')
+    assert count.get_json() == {'count': 3}
+    assert client.post('/api/quiz/count', json={'week': 3, 'themes': ['Conjuntos']}) \
+                 .get_json() == {'count': 3}
+    assert client.get('/api/quiz/count?week=3&themes=Conjuntos',
+                      headers={'If-None-Match': count.headers['ETag']}).status_code == 304
+
+    # Nueva versión del banco → el ETag viejo ya no coincide
+    AppState.set_value(BANK_VERSION_KEY, 'v2')
+    db.session.commit()
+    invalidate_catalog()
+    changed = client.get('/api/quiz/difficulties?week=3&themes=Lógica,Conjuntos',
+                         headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
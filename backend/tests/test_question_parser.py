@@ -0,0 +1,71 @@
+"""
+Tests del parser en streaming de bancos .tex (question_parser).
+"""
+import pytest
+
+from question_parser import QuestionParseError, iter_question_blocks
+
+
+def _question(qid, tema='lógica', body='Enunciado'):
+    return (f"\\begin{{question}}{{{qid}}}{{{tema}}}{{1}}{{a}}{{2}}{{\n"
+            f"{body}\n"
+            "\\begin{enumerate}\n    \\item a) Sí\n    \\item b) No\n\\end{enumerate}\n"
+            "}\n\\end{question}\n")
+
+
+def test_directory_bank_is_parsed_in_path_order(tmp_path):
+    from preguntas_loader_simple import load_preguntas_from_latex
+
+    (tmp_path / 'b_semana2.tex').write_text('% comentario\n' + _question(3), encoding='utf-8')
+    (tmp_path / 'a_semana1.tex').write_text(_question(1) + '\n' + _question(2), encoding='utf-8')
+    (tmp_path / 'notas.txt').write_text(_question(99), encoding='utf-8')
+
+    blocks = list(iter_question_blocks(str(tmp_path)))
+    assert [(b.qid, b.file.rsplit('/', 1)[-1], b.line) for b in blocks] == [
+        (1, 'a_semana1.tex', 1), (2, 'a_semana1.tex', 10), (3, 'b_semana2.tex', 2),
+    ]
+
+    preguntas = load_preguntas_from_latex(str(tmp_path))
+    assert sorted(preguntas) == [1, 2, 3]
+    assert preguntas[1]['tema'] == 'Lógica'
+    assert preguntas[1]['opts'] == {'a': 'Sí', 'b': 'No'}
+
+
+def test_two_questions_on_one_line(tmp_path):
+    bank = tmp_path / 'bank.tex'
+    bank.write_text(_question(1).replace('\n', ' ') + _question(2).replace('\n', ' '),
+                    encoding='utf-8')
+    assert [b.qid for b in iter_question_blocks(str(bank))] == [1, 2]
+
+
+@pytest.mark.parametrize('broken, message', [
+    ("\\begin{question}{x}{lógica}{1}{a}{2}{\nA\n}\n\\end{question}\n", 'cabecera'),
+    ("\\begin{question}{5}{lógica}{1}{a}{2}{\nA\n\\end{question}\n", "cerrar con '}'"),
+    ("\\begin{question}{5}{lógica}{1}{a}{2}{\nA\n}\n", 'al final del archivo'),
+    ("\\begin{question}{5}{lógica}{1}{a}{2}{\nA\n}\n" + _question(6), 'antes de la pregunta'),
+])
+def test_parse_errors_point_to_file_and_line(tmp_path, broken, message):
+    bank = tmp_path / 'bank.tex'
+    bank.write_text(_question(1) + '\n' + broken, encoding='utf-8')
+    line = 10   # tras la primera pregunta (8 líneas) y una línea en blanco
+
+    with pytest.raises(QuestionParseError) as exc:
+        list(iter_question_blocks(str(bank)))
+    assert exc.value.file == str(bank)
+    assert exc.value.line == line
+    assert message in str(exc.value)
+    assert str(exc.value).startswith(f"{bank}:{line}: ")
+
+
+def test_bank_hash_covers_every_file(tmp_path):
+    from preguntas_loader_simple import load_bank
+
+    (tmp_path / 'a.tex').write_text(_question(1), encoding='utf-8')
+    preguntas, first = load_bank(str(tmp_path))
+    assert list(preguntas) == [1]
+    assert (tmp_path.parent / f'{tmp_path.name}.snapshot.json').exists()
+
+    (tmp_path / 'b.tex').write_text(_question(2), encoding='utf-8')
+    preguntas, second = load_bank(str(tmp_path))
+    assert second != first
+    assert sorted(preguntas) == [1, 2]
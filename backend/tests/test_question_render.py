@@ -0,0 +1,144 @@
+"""
+Tests del HTML pre-renderizado (tabla rendered_questions).
+"""
+
+
+def _bank():
+    return {
+        qid: {
+            'tema': 'Conjuntos', 'dif': 1, 'res': ['a'], 'week': 1,
+            'body_latex': f'Pregunta \\textbf{{{qid}}}', 'opts': {'a': 'x', 'b': 'y'},
+        }
+        for qid in (1, 2, 3)
+    }
+
+
+def test_refresh_renders_only_stale_rows(app):
+    from models import db, RenderedQuestion
+    from bank_sync import sync_questions
+    from question_render import refresh_rendered
+
+    bank = _bank()
+    sync_questions(db, bank)
+    assert refresh_rendered(db) == {'rendered': 3, 'deleted': 0, 'unchanged': 0}
+    assert refresh_rendered(db) == {'rendered': 0, 'deleted': 0, 'unchanged': 3}
+
+    bank[2]['body_latex'] = 'Pregunta \\textit{editada}'
+    del bank[3]
+    sync_questions(db, bank)
+    assert refresh_rendered(db) == {'rendered': 1, 'deleted': 1, 'unchanged': 1}
+
+    row = db.session.get(RenderedQuestion, 2)
+    assert '<em>editada</em>' in row.html
+    assert refresh_rendered(db, force=True)['rendered'] == 2
+
+
+def test_payloads_match_get_question_html(app):
+    from models import db, RenderedQuestion
+    from bank_sync import sync_questions
+    from question_render import refresh_rendered, get_question_payloads
+    from preguntas_loader_simple import get_question_html
+
+    bank = _bank()
+    sync_questions(db, bank)
+    refresh_rendered(db)
+
+    payloads = get_question_payloads([1, 2, 99])
+    assert sorted(payloads) == [1, 2]
+    assert payloads[1]['html'] == get_question_html(bank[1])
+
+    # El HTML guardado es lo que se sirve
+    db.session.get(RenderedQuestion, 1).html = '<p>stored</p>'
+    db.session.commit()
+    assert get_question_payloads([1])[1]['html'] == '<p>stored</p>'
+
+
+def test_payloads_fall_back_when_stale(app):
+    from models import db, RenderedQuestion
+    from bank_sync import sync_questions
+    from question_render import refresh_rendered, get_question_payloads
+    from preguntas_loader_simple import get_question_html
+
+    bank = _bank()
+    sync_questions(db, bank)
+    refresh_rendered(db)
+
+    # Hash obsoleto → se renderiza al vuelo desde content
+    db.session.get(RenderedQuestion, 1).source_hash = 'old'
+    db.session.commit()
+    assert get_question_payloads([1])[1]['html'] == get_question_html(bank[1])
+
+    # Sin fila guardada también
+    sync_questions(db, {**bank, 4: dict(bank[1])})
+    assert get_question_payloads([4])[4]['html'] == get_question_html(bank[1])
+
+
+def test_render_cache_lru_and_metrics():
+    from render_cache import RenderCache
+
+    cache = RenderCache(max_entries=2, max_bytes=1000)
+    cache.put((1, 'h1'), 'uno')
+    cache.put((2, 'h2'), 'dos')
+    assert cache.get((1, 'h1')) == 'uno'      # 1 pasa a ser el más reciente
+    cache.put((3, 'h3'), 'tres')              # expulsa a 2
+    assert cache.get((2, 'h2')) is None
+    assert cache.get((1, 'h1')) == 'uno'
+    assert cache.get((1, 'h1-editada')) is None
+
+    cache.put((4, 'h4'), 'x' * 999)           # límite de bytes: quedan solo 4
+    assert len(cache) == 1
+    cache.put((5, 'h5'), 'x' * 2000)          # más grande que el budget: no se guarda
+    assert cache.get((5, 'h5')) is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 3)
+    assert stats['bytes'] == 999
+
+
+def test_fallback_renders_go_through_cache(app, teacher_auth):
+    from models import db
+    from bank_sync import sync_questions
+    from question_render import get_question_payloads
+    from render_cache import render_cache
+
+    render_cache.clear()
+    sync_questions(db, _bank())
+    hits = render_cache.hits
+
+    first = get_question_payloads([1])[1]['html']
+    assert get_question_payloads([1])[1]['html'] == first
+    assert render_cache.hits == hits + 1
+
+    resp = app.test_client().get('/api/health/render-cache', headers=teacher_auth)
+    assert resp.status_code == 200 and resp.get_json()['entries'] == 1
+
+
+def test_warm_payload_cache_skips_the_db_without_store(app, monkeypatch):
+    import question_render
+    from models import db
+    from bank_sync import sync_questions
+    from question_catalog import get_catalog
+    from render_cache import render_cache
+
+    monkeypatch.setattr(question_render, 'RENDERED_HTML_STORE', False)
+    render_cache.clear()
+    sync_questions(db, _bank())
+    catalog = get_catalog()
+    hashes = {qid: catalog.content_hash(qid) for qid in (1, 2)}
+    hits, misses = render_cache.hits, render_cache.misses
+
+    first = question_render.get_question_payloads([1, 2], content_hashes=hashes)
+    assert (render_cache.hits - hits, render_cache.misses - misses) == (0, 2)
+
+    from sqlalchemy import event
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        again = question_render.get_question_payloads([1, 2], content_hashes=hashes)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert again == first and statements == []
+    # Un lookup contado por pregunta pedida
+    assert (render_cache.hits - hits, render_cache.misses - misses) == (2, 2)
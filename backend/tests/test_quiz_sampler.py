@@ -0,0 +1,124 @@
+"""
+Tests del muestreo vectorizado de quizzes (quiz_sampler) y /api/quiz/generate.
+"""
+import json
+from collections import Counter
+
+import pytest
+
+
+def _seed(db):
+    from models import Question
+    qid = 0
+    for theme in ('Conjuntos', 'Lógica', 'Funciones'):
+        for difficulty in (1, 2, 3):
+            for week in (1, 2):
+                qid += 1
+                db.session.add(Question(
+                    question_id=qid, theme=theme, difficulty=difficulty,
+                    correct_answer='a', week=week, content_hash=f'h{qid}',
+                    content=json.dumps({'body_latex': f'Pregunta {qid}', 'opts': {}}),
+                ))
+    db.session.commit()
+
+
+def test_allocate_respects_shares_and_capacity():
+    from quiz_sampler import allocate
+
+    assert allocate(9, [10, 10, 10], [1, 1, 1]).tolist() == [3, 3, 3]
+    assert allocate(10, [2, 10, 10], [1, 1, 1]).tolist() == [2, 4, 4]
+    assert allocate(6, [10, 10, 10], [2, 1, 0]).tolist() == [4, 2, 0]
+    assert allocate(50, [3, 4], [1, 1]).tolist() == [3, 4]
+
+
+def test_stratified_versions_are_balanced_and_distinct(app):
+    from models import db
+    from question_catalog import get_catalog
+    from quiz_sampler import SamplingError, sample_quizzes
+
+    _seed(db)
+    catalog = get_catalog()
+    bits = catalog.select()
+
+    quizzes = sample_quizzes(catalog, bits, 6, n_quizzes=200, stratify='theme', seed=1)
+    assert quizzes.shape == (200, 6)
+    for quiz in quizzes.tolist():
+        assert len(set(quiz)) == 6
+        assert sorted(Counter(catalog.get(q)['theme'] for q in quiz).values()) == [2, 2, 2]
+    assert len({tuple(sorted(q)) for q in quizzes.tolist()}) > 150
+
+    quizzes = sample_quizzes(catalog, bits, 0, n_quizzes=5, stratify='difficulty',
+                             quotas={'1': 3, '3': 1})
+    for quiz in quizzes.tolist():
+        assert sorted(catalog.get(q)['difficulty'] for q in quiz) == [1, 1, 1, 3]
+
+    with pytest.raises(SamplingError):
+        sample_quizzes(catalog, bits, 0, stratify='week', quotas={'1': 10})
+    with pytest.raises(SamplingError):
+        sample_quizzes(catalog, bits, 5, stratify='color')
+
+
+def test_generate_endpoint_versions(app):
+    from flask_jwt_extended import create_access_token
+    from models import db
+
+    _seed(db)
+    client = app.test_client()
+    auth = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+    resp = client.post('/api/quiz/generate', headers=auth, json={
+        'week': 1, 'num_questions': 3, 'num_versions': 20,
+        'stratify': 'difficulty', 'seed': 7,
+    })
+    body = resp.get_json()
+    assert resp.status_code == 200 and len(body['versions']) == 20
+    assert body['questions'] == body['versions'][0]['questions']
+    for version in body['versions']:
+        assert sorted(q['difficulty'] for q in version['questions']) == [1, 2, 3]
+        assert all(q['week'] == 1 and q['question_text'] for q in version['questions'])
+
+    single = client.post('/api/quiz/generate', headers=auth, json={'num_questions': 4}).get_json()
+    assert single['total'] == 4 and 'versions' not in single
+
+    bad = client.post('/api/quiz/generate', headers=auth,
+                      json={'stratify': 'difficulty', 'quotas': {'9': 1}})
+    assert bad.status_code == 400
+
+    for params in ({'seed': 'abc'}, {'seed': -1}, {'seed': 1.5},
+                   {'stratify': 'week', 'quotas': {'1': 'x'}},
+                   {'stratify': 'week', 'quotas': {'1': -2}},
+                   {'stratify': 'week', 'quotas': [1, 2]},
+                   {'stratify': 'week', 'weights': {'1': 'heavy'}},
+                   {'stratify': 'week', 'weights': 3},
+                   {'stratify': ['week']},
+                   {'num_questions': 'ten'}, {'num_versions': None}):
+        bad = client.post('/api/quiz/generate', headers=auth, json=params)
+        assert bad.status_code == 400, params
+
+
+def test_generate_streams_ndjson(app, monkeypatch):
+    from flask_jwt_extended import create_access_token
+    from models import db
+    import quiz_routes
+
+    _seed(db)
+    calls = []
+    real = quiz_routes.get_question_payloads
+    def spy(ids, content_hashes=None):
+        calls.append(len(ids))
+        return real(ids, content_hashes)
+    monkeypatch.setattr(quiz_routes, 'get_question_payloads', spy)
+
+    client = app.test_client()
+    auth = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+    resp = client.post('/api/quiz/generate', headers=auth, json={
+        'num_questions': 6, 'num_versions': 2, 'stream': True, 'seed': 3,
+    })
+    lines = [json.loads(line) for line in resp.data.decode('utf-8').splitlines()]
+
+    assert resp.mimetype == 'application/x-ndjson'
+    assert lines[-1] == {'done': True, 'total': 12, 'versions': 2}
+    assert [r['version'] for r in lines[:-1]] == [0] * 6 + [1] * 6
+    assert all(r['question']['question_text'].startswith('Pregunta') for r in lines[:-1])
+    # El primer registro sale tras renderizar una sola pregunta
+    assert calls[:2] == [1, 2]
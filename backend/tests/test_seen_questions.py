@@ -0,0 +1,63 @@
+"""
+Tests del bitmap por usuario de preguntas ya vistas (seen_questions).
+"""
+
+
+def test_pack_roundtrip_and_merge(app):
+    from models import db, User
+    from seen_questions import mark_seen, pack, seen_bits, unpack
+
+    bits = (1 << 700) | (1 << 3) | 1
+    assert unpack(pack(bits)) == bits and unpack(pack(0)) == 0 and unpack(None) == 0
+    assert len(pack(bits)) < 700 // 8
+
+    user = User(student_number='1', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    mark_seen(user.id, [5, 9])
+    mark_seen(user.id, [9, 12])
+    db.session.commit()
+    assert seen_bits(user.id) == (1 << 5) | (1 << 9) | (1 << 12)
+
+
+def test_new_sessions_skip_questions_seen_before(student_client, add_questions):
+    add_questions(range(1, 5))
+    client, auth, _ = student_client
+
+    first = client.post('/api/quiz/start', json={'week': 1}, headers=auth).get_json()['session']['id']
+    for qid in (1, 2):
+        client.post('/api/quiz/answer', headers=auth,
+                    json={'session_id': first, 'question_id': qid, 'user_answer': 'a'})
+
+    second = client.post('/api/quiz/start', json={'week': 1}, headers=auth).get_json()['session']['id']
+    picked = {client.post('/api/quiz/next', json={'session_id': second}, headers=auth)
+                    .get_json()['question']['question_id'] for _ in range(10)}
+    assert picked <= {3, 4}
+
+    body = client.post('/api/quiz/question', json={'week': 1}, headers=auth).get_json()
+    assert body['available_count'] == 2 and body['question']['id'] in (3, 4)
+
+    # Con todas vistas vuelve a ofrecerlas en vez de quedarse sin preguntas
+    for qid in (3, 4):
+        client.post('/api/quiz/answer', headers=auth,
+                    json={'session_id': second, 'question_id': qid, 'user_answer': 'a'})
+    body = client.post('/api/quiz/question', json={'week': 1}, headers=auth).get_json()
+    assert body['available_count'] == 4
+
+
+def test_rebuild_from_answers(student_client, add_questions):
+    from models import db, Answer, QuizSession
+    from seen_questions import rebuild_seen, seen_bits
+
+    add_questions(range(1, 5))
+    _, _, user_id = student_client
+    session = QuizSession(user_id=user_id, week=1, status='completed')
+    db.session.add(session)
+    db.session.flush()
+    for order, qid in enumerate((2, 4, 2)):
+        db.session.add(Answer(session_id=session.id, question_id=qid, user_answer='a',
+                              is_correct=True, order_in_session=order))
+    db.session.commit()
+
+    assert rebuild_seen(db) == 1
+    assert seen_bits(user_id) == (1 << 2) | (1 << 4)
@@ -0,0 +1,212 @@
+"""
+Tests del estado de sesión cacheado de /api/quiz/answer y /next.
+"""
+import pytest
+
+
+@pytest.fixture()
+def client_and_auth(student_client, add_questions):
+    from models import db
+    from question_render import refresh_rendered
+
+    add_questions(range(1, 6))
+    refresh_rendered(db)
+    client, auth, _ = student_client
+    return client, auth
+
+
+def _count_sql(db, fn):
+    from sqlalchemy import event
+    statements = []
+    def record(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_answer_writes_once_and_next_reads_nothing(client_and_auth, monkeypatch):
+    import session_state
+    from models import db, Answer
+
+    monkeypatch.setattr(session_state, 'SESSION_STATE_VERIFY', False)
+    client, auth = client_and_auth
+    sid = client.post('/api/quiz/start', json={'week': 1, 'theme': 'Conjuntos'},
+                      headers=auth).get_json()['session']['id']
+
+    first = client.post('/api/quiz/next', json={'session_id': sid}, headers=auth).get_json()
+    qid = first['question']['question_id']
+
+    resp, statements = _count_sql(db, lambda: client.post(
+        '/api/quiz/answer', json={'session_id': sid, 'question_id': qid, 'user_answer': 'a'},
+        headers=auth))
+    assert resp.status_code == 201 and resp.get_json()['is_correct']
+    # Contador de la sesión + la respuesta (aparte, el bitmap de vistas del usuario)
+    assert [s.split()[0] for s in statements
+            if 'user_seen_questions' not in s and s.split()[0] not in ('SAVEPOINT', 'RELEASE')
+            ] == ['UPDATE', 'INSERT']
+
+    # Con los payloads ya en render_cache (como tras unos /next), /next no toca la BD
+    from question_catalog import get_catalog
+    from question_render import get_question_payloads
+    catalog = get_catalog()
+    get_question_payloads(catalog.question_ids,
+                          content_hashes={q: catalog.content_hash(q) for q in catalog.question_ids})
+    resp, statements = _count_sql(db, lambda: client.post(
+        '/api/quiz/next', json={'session_id': sid}, headers=auth))
+    body = resp.get_json()
+    assert body['question_number'] == 2 and body['question']['question_id'] != qid
+    assert statements == [], [s for s in statements]
+
+    assert [a.order_in_session for a in Answer.query.filter_by(session_id=sid)] == [0]
+
+
+def test_state_is_rebuilt_from_db_on_miss(client_and_auth):
+    from datetime import datetime, timedelta
+    import session_state
+    from models import db, Answer, QuizSession
+
+    client, auth = client_and_auth
+    session = QuizSession(user_id=1, week=1, theme='Conjuntos', status='in_progress',
+                          answer_count=2)
+    db.session.add(session)
+    db.session.flush()
+    # answered_at al revés del orden: manda order_in_session
+    now = datetime.utcnow()
+    for order, (qid, ok) in enumerate([(3, True), (1, False)]):
+        db.session.add(Answer(session_id=session.id, question_id=qid, user_answer='a',
+                              is_correct=ok, order_in_session=order,
+                              answered_at=now - timedelta(seconds=order)))
+    db.session.commit()
+
+    state = session_state.load_state(session.id, 1)
+    assert (state.asked, state.answered, state.correct) == ({1, 3}, 2, 1)
+    assert (state.last_qid, state.next_order, state.performance) == (1, 2, 0.5)
+    assert session_state.load_state(session.id, 2) is None
+    # El id llega como str desde el JSON: misma entrada del store
+    assert session_state.load_state(str(session.id), 1) is state
+    assert session_state.load_state('abc', 1) is None
+
+    # Otro worker agregó una respuesta (y subió answer_count): la
+    # verificación lo detecta
+    db.session.add(Answer(session_id=session.id, question_id=2, user_answer='b',
+                          is_correct=False, order_in_session=2))
+    session.answer_count = 3
+    db.session.commit()
+    body = client.post('/api/quiz/next', json={'session_id': session.id},
+                       headers=auth).get_json()
+    assert body['question_number'] == 4
+    assert body['question']['question_id'] in (4, 5)
+
+    session_state.forget_state(str(session.id))
+    assert session_state.get_store().get(session.id) is None
+
+
+def test_state_json_roundtrip():
+    from session_state import SessionState
+
+    state = SessionState(7, 3, week=2, theme='Lógica', difficulty=1)
+    state.record_answer(10, True)
+    state.record_answer(4, False)
+    copy = SessionState.from_json(state.to_json())
+    assert copy.user_id == '3' and copy.asked == {4, 10}
+    assert (copy.answered, copy.correct, copy.last_qid, copy.next_order) == (2, 1, 4, 2)
+
+
+def test_answer_can_include_the_next_question(client_and_auth):
+    client, auth = client_and_auth
+    sid = client.post('/api/quiz/start', json={'week': 1}, headers=auth).get_json()['session']['id']
+
+    asked = []
+    body = client.post('/api/quiz/next', json={'session_id': sid, 'total_questions': 3},
+                       headers=auth).get_json()
+    while not body['done']:
+        qid = body['question']['question_id']
+        asked.append(qid)
+        resp = client.post('/api/quiz/answer', headers=auth, json={
+            'session_id': sid, 'question_id': qid, 'user_answer': 'a',
+            'include_next': True, 'total_questions': 3,
+        }).get_json()
+        assert resp['is_correct']
+        body = resp['next']
+        if not body['done']:
+            assert body['question_number'] == len(asked) + 1
+            assert body['question']['question_text'].startswith('Pregunta')
+
+    assert len(set(asked)) == 3 and body == {'done': True, 'total_answered': 3}
+
+
+class _FakeRedis:
+    """Lo mínimo de redis.Redis para WATCH/MULTI; `before_exec` simula otro worker."""
+
+    def __init__(self):
+        self.data, self.versions, self.before_exec = {}, {}, None
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client, self.watched, self.queued = client, None, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched = (key, self.client.versions.get(key, 0))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def multi(self):
+        self.queued = []
+
+    def set(self, key, value, ex=None):
+        self.queued.append((key, value))
+
+    def execute(self):
+        import redis
+        if self.client.before_exec:
+            hook, self.client.before_exec = self.client.before_exec, None
+            hook()
+        key, version = self.watched
+        if self.client.versions.get(key, 0) != version:
+            raise redis.WatchError()
+        for key, value in self.queued:
+            self.client.set(key, value)
+
+
+def test_redis_answers_from_two_workers_are_not_lost():
+    pytest.importorskip('redis')
+    from session_state import RedisSessionStore, SessionState
+
+    store = RedisSessionStore.__new__(RedisSessionStore)
+    store.client, store.ttl = _FakeRedis(), 60
+    store.put(SessionState(1, 3))
+
+    # Los dos requests leyeron el estado vacío; el segundo escribe mientras
+    # el primero está entre WATCH y EXEC
+    first, second = store.get(1), store.get(1)
+    store.client.before_exec = lambda: store.record_answer(second, 7, False, order=1)
+    store.record_answer(first, 5, True, order=0)
+
+    saved = store.get(1)
+    assert saved.asked == {5, 7}
+    assert (saved.answered, saved.correct, saved.next_order) == (2, 1, 2)
@@ -0,0 +1,19 @@
+"""
+Tests del arranque lazy y del reporte de tiempos por fase.
+"""
+
+
+def test_startup_report_lists_phases(app, teacher_auth):
+    report = app.test_client().get('/api/health/startup', headers=teacher_auth).get_json()
+
+    assert report['mode'] == 'lazy'
+    names = [p['name'] for p in report['phases']]
+    assert names[:3] == ['imports', 'extensions', 'blueprints']
+    assert report['total_ms'] >= 0
+
+
+def test_module_level_app_is_created_on_demand():
+    import app as app_module
+
+    assert 'app' not in vars(app_module)
+    assert app_module.create_app is not None
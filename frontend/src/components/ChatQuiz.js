@@ -109,7 +109,7 @@ const ChatQuiz = () => {
     const handleDifficultySelect = async (difficulty) => {
         setIsLoading(true);
         try {
-            const countResponse = await api.post('/quiz/count', { week: quizState.week, themes: [quizState.theme], difficulty });
+            const countResponse = await api.get('/quiz/count', { params: { week: quizState.week, themes: quizState.theme, difficulty } });
             if (countResponse.data.count === 0) {
                 setTimeout(() => { addBotMessage('⚠️ No hay preguntas disponibles. ¿Qué prefieres?', [{ text: 'Cambiar dificultad', value: 'change_difficulty' }, { text: 'Cambiar tema', value: 'change_theme' }, { text: 'Reiniciar', value: 'restart' }]); setCurrentStep('handle_no_questions'); }, 400);
                 setIsLoading(false); return;
@@ -122,21 +122,24 @@ const ChatQuiz = () => {
         finally { setIsLoading(false); }
     };
 
+    // data: body de /quiz/next (o el campo `next` de /quiz/answer con include_next)
+    const showNextQuestion = (sessionId, data) => {
+        if (data.done) { showResults(sessionId); return; }
+        const { question, question_number, total } = data;
+        setQuizState(prev => ({ ...prev, currentQuestion: question, questionNumber: question_number, totalQuestions: total }));
+        addBotMessage(`**Pregunta ${question_number} de ${total}**`);
+        const letters = ['a', 'b', 'c', 'd'];
+        const opts = question.options && question.options.length > 0
+          ? question.options.map((txt, i) => ({ text: `${letters[i].toUpperCase()}) ${txt}`, value: letters[i] }))
+          : letters.map(l => ({ text: l.toUpperCase(), value: l }));
+        setTimeout(() => { addBotMessage(question.question_text, opts); setCurrentStep('answering'); }, 400);
+    };
+
     const fetchNextQuestion = async (sessionId, totalQuestions = 10) => {
         setIsLoading(true);
         try {
             const response = await api.post('/quiz/next', { session_id: sessionId, total_questions: totalQuestions });
-            if (response.data.done) { showResults(sessionId); }
-            else {
-                const { question, question_number, total } = response.data;
-                setQuizState(prev => ({ ...prev, currentQuestion: question, questionNumber: question_number, totalQuestions: total }));
-                addBotMessage(`**Pregunta ${question_number} de ${total}**`);
-                const letters = ['a', 'b', 'c', 'd'];
-                const opts = question.options && question.options.length > 0
-                  ? question.options.map((txt, i) => ({ text: `${letters[i].toUpperCase()}) ${txt}`, value: letters[i] }))
-                  : letters.map(l => ({ text: l.toUpperCase(), value: l }));
-                setTimeout(() => { addBotMessage(question.question_text, opts); setCurrentStep('answering'); }, 400);
-            }
+            showNextQuestion(sessionId, response.data);
         } catch { addBotMessage('Error obteniendo la siguiente pregunta.'); }
         finally { setIsLoading(false); }
     };
@@ -146,13 +149,16 @@ const ChatQuiz = () => {
         if (!currentQuestion || !sessionId) return;
         setIsLoading(true);
         try {
-            const answerResponse = await api.post('/quiz/answer', { session_id: sessionId, question_id: currentQuestion.question_id, user_answer: answer });
-            const { is_correct, correct_answer } = answerResponse.data;
+            const answerResponse = await api.post('/quiz/answer', { session_id: sessionId, question_id: currentQuestion.question_id, user_answer: answer, include_next: true, total_questions: totalQuestions });
+            const { is_correct, correct_answer, next } = answerResponse.data;
             setQuizState(prev => ({ ...prev, score: is_correct ? prev.score + 1 : prev.score, answers: [...prev.answers, { questionId: currentQuestion.question_id, answer, isCorrect: is_correct }] }));
             setTimeout(() => {
                 if (is_correct) addBotMessage('✅ ¡Correcto!');
                 else addBotMessage(`❌ Incorrecto. La respuesta era: **${correct_answer.toUpperCase()}**`);
-                setTimeout(() => { fetchNextQuestion(sessionId, totalQuestions); }, 1200);
+                setTimeout(() => {
+                    if (next && !next.error) { showNextQuestion(sessionId, next); setIsLoading(false); }
+                    else fetchNextQuestion(sessionId, totalQuestions);
+                }, 1200);
             }, 300);
         } catch { addBotMessage('Error al enviar respuesta.'); setIsLoading(false); }
     };
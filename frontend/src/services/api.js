@@ -52,12 +52,47 @@ export const quizAPI = {
   startSession: (data) => api.post('/quiz/start', data),
   getQuestion: (data) => api.post('/quiz/question', data),
   submitAnswer: (data) => api.post('/quiz/answer', data),
+  // { answers: [{ question_id, user_answer }], session_id?, week?, theme?, difficulty?, complete? }
+  submitAnswersBulk: (data) => api.post('/quiz/answers/bulk', data),
   completeSession: (sessionId) => api.post(`/quiz/session/${sessionId}/complete`),
   getSessions: () => api.get('/quiz/sessions'),
   getSessionDetails: (sessionId) => api.get(`/quiz/session/${sessionId}`),
   getThemes: (week) => api.get('/quiz/themes', { params: { week } }),
   getDifficulties: (week, themes) => api.get('/quiz/difficulties', { params: { week, themes } }),
-  countQuestions: (data) => api.post('/quiz/count', data),
+  countQuestions: ({ week, themes = [], difficulty } = {}) =>
+    api.get('/quiz/count', { params: { week, themes: themes.join(','), difficulty } }),
+  // /quiz/generate en NDJSON: llama onRecord({ version, question }) apenas llega
+  // cada pregunta; resuelve con el registro final { done, total, versions }.
+  streamQuiz: async (data, onRecord) => {
+    const token = sessionStorage.getItem('token') || localStorage.getItem('token');
+    const response = await fetch(`${API_URL}/quiz/generate`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'application/x-ndjson',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ ...data, stream: true }),
+    });
+    if (!response.ok) throw new Error((await response.json()).error || response.statusText);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const record = JSON.parse(line);
+        if (record.done) return record;
+        onRecord(record);
+      }
+      if (done) return null;
+    }
+  },
 };
 
 // Teacher Dashboard